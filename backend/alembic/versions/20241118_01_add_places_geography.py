@@ -0,0 +1,49 @@
+"""Add generated geography column for places"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "20241118_01"
+down_revision = "20241111_01"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS postgis")
+    # A stored generated column is filled for every existing row while the table is
+    # rewritten, and kept in sync with latitude/longitude on every later write.
+    op.execute(
+        """
+        ALTER TABLE places
+        ADD COLUMN IF NOT EXISTS location geography(Point, 4326)
+        GENERATED ALWAYS AS (
+            (ST_SetSRID(ST_MakePoint(longitude::double precision, latitude::double precision), 4326))
+            ::geography
+        ) STORED;
+        """
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_places_location_geog ON places USING GIST (location)"
+    )
+    # The geometry expression index never matched the geography predicates used by search.
+    op.execute("DROP INDEX IF EXISTS idx_places_location_gist")
+    op.execute("ANALYZE places")
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS idx_places_location_geog")
+    op.execute("ALTER TABLE places DROP COLUMN IF EXISTS location")
+    op.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_places_location_gist
+        ON places
+        USING GIST (
+            ST_SetSRID(
+                ST_MakePoint(longitude::double precision, latitude::double precision),
+                4326
+            )
+        );
+        """
+    )
@@ -0,0 +1,29 @@
+"""
+Track Mapbox geometry written back onto routes
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "20241118_02"
+down_revision: Union[str, None] = "20241118_01"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add route summary and geometry sync timestamp"""
+    op.add_column("routes", sa.Column("route_summary", sa.String(length=255), nullable=True))
+    op.add_column(
+        "routes",
+        sa.Column("geometry_synced_at", sa.DateTime(timezone=True), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    """Drop route geometry sync columns"""
+    op.drop_column("routes", "geometry_synced_at")
+    op.drop_column("routes", "route_summary")
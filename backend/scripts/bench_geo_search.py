@@ -0,0 +1,151 @@
+"""Benchmark nearby place search against a synthetic places corpus.
+
+Loads ``--rows`` synthetic places (default 1M) inside a transaction, times the
+legacy expression query (geometry built from Numeric casts, cast to geography
+per row) against the KNN query on the indexed ``location`` column, prints
+p50/p95 latencies and rolls everything back.
+
+Usage::
+
+    python scripts/bench_geo_search.py --database-url postgresql://... --rows 1000000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.services.places.geo_search import GeoSearchParams, GeoSearchService  # noqa: E402
+
+LEGACY_QUERY = """
+SELECT places.id, ST_DistanceSphere(
+    ST_SetSRID(ST_MakePoint(CAST(longitude AS FLOAT), CAST(latitude AS FLOAT)), 4326),
+    ST_SetSRID(ST_MakePoint(:lng, :lat), 4326)
+) AS distance
+FROM places
+WHERE ST_DWithin(
+    ST_SetSRID(ST_MakePoint(CAST(longitude AS FLOAT), CAST(latitude AS FLOAT)), 4326)::geography,
+    ST_SetSRID(ST_MakePoint(:lng, :lat), 4326)::geography,
+    :radius
+)
+ORDER BY distance
+LIMIT :limit
+"""
+
+# Rough bounding box around Seoul, Tokyo and Osaka so searches hit dense areas.
+BOUNDS = ((33.5, 38.0), (126.0, 140.5))
+
+
+async def _seed(conn: AsyncConnection, rows: int) -> None:
+    (lat_min, lat_max), (lng_min, lng_max) = BOUNDS
+    await conn.execute(
+        text(
+            """
+            INSERT INTO places (id, name, category, latitude, longitude, rating)
+            SELECT gen_random_uuid(),
+                   'bench-' || n,
+                   (ARRAY['attraction','restaurant','cafe','accommodation'])[1 + n % 4],
+                   :lat_min + random() * (:lat_max - :lat_min),
+                   :lng_min + random() * (:lng_max - :lng_min),
+                   round((3 + random() * 2)::numeric, 1)
+            FROM generate_series(1, :rows) AS n
+            """
+        ),
+        {"rows": rows, "lat_min": lat_min, "lat_max": lat_max, "lng_min": lng_min, "lng_max": lng_max},
+    )
+    await conn.execute(text("ANALYZE places"))
+
+
+async def _time(conn: AsyncConnection, statement, params_list: list[dict]) -> list[float]:
+    timings: list[float] = []
+    for params in params_list:
+        started = time.perf_counter()
+        await conn.execute(statement, params)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def _summary(label: str, timings: list[float]) -> str:
+    ordered = sorted(timings)
+    p95 = ordered[max(int(len(ordered) * 0.95) - 1, 0)]
+    return f"{label:<8} p50={statistics.median(ordered):8.2f}ms  p95={p95:8.2f}ms  n={len(ordered)}"
+
+
+async def run(database_url: str, rows: int, queries: int, radius_km: float, limit: int) -> None:
+    engine = create_async_engine(database_url.replace("postgresql://", "postgresql+asyncpg://"))
+    rng = random.Random(7)
+    (lat_min, lat_max), (lng_min, lng_max) = BOUNDS
+    anchors = [
+        (rng.uniform(lat_min, lat_max), rng.uniform(lng_min, lng_max)) for _ in range(queries)
+    ]
+
+    try:
+        async with engine.connect() as conn:
+            transaction = await conn.begin()
+            try:
+                started = time.perf_counter()
+                await _seed(conn, rows)
+                print(f"seeded {rows} places in {time.perf_counter() - started:.1f}s")
+
+                legacy = await _time(
+                    conn,
+                    text(LEGACY_QUERY),
+                    [
+                        {"lat": lat, "lng": lng, "radius": radius_km * 1000, "limit": limit}
+                        for lat, lng in anchors
+                    ],
+                )
+                service = GeoSearchService(None)  # type: ignore[arg-type]
+                knn_statements = [
+                    service._base_query(
+                        GeoSearchParams(latitude=lat, longitude=lng, radius_km=radius_km, limit=limit)
+                    )
+                    for lat, lng in anchors
+                ]
+                knn: list[float] = []
+                for statement in knn_statements:
+                    knn.extend(await _time(conn, statement, [{}]))
+
+                plan = await conn.execute(
+                    text(
+                        "EXPLAIN "
+                        + str(
+                            knn_statements[0].compile(
+                                dialect=postgresql.dialect(),
+                                compile_kwargs={"literal_binds": True},
+                            )
+                        )
+                    )
+                )
+                print(_summary("legacy", legacy))
+                print(_summary("knn", knn))
+                print("\n".join(row[0] for row in plan))
+            finally:
+                await transaction.rollback()
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--radius-km", type=float, default=5.0)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args.database_url, args.rows, args.queries, args.radius_km, args.limit))
+
+
+if __name__ == "__main__":
+    main()
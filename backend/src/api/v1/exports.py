@@ -2,26 +2,53 @@
 
 from __future__ import annotations
 
+from typing import AsyncIterator
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Path, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ...config.database import get_db
+from ...config.database import AsyncSessionLocal, get_db
 from ...core.security import get_current_user_id
 from ...schemas.base import ApiResponse
-from ...schemas.exports import MapExportResponse
-from ...schemas.pdf import PdfExportResponse
-from ...services.exports import MapExportError, MapExportNotFoundError, MapExportService
+from ...schemas.exports import MapDay, MapExportResponse, MapExportStreamChunk
+from ...schemas.pdf import PdfExportJobResponse, PdfExportResponse
+from ...services.exports import (
+    EXPORT_WRITERS,
+    ExportFormat,
+    MapExportError,
+    MapExportNotFoundError,
+    MapExportService,
+    export_file_name,
+    snapshot_plan,
+)
 from ...services.pdf.generator import (
     PdfGenerationError,
     PdfGeneratorService,
     PdfPlanNotFoundError,
 )
+from ...services.pdf.jobs import (
+    PdfExportJob,
+    PdfJobNotFoundError,
+    enqueue_pdf_export,
+    get_pdf_export_job,
+)
 
 
 router = APIRouter(prefix="/exports", tags=["Exports"])
 
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def _user_uuid(user_id: str) -> UUID:
+    try:
+        return UUID(user_id)
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid user session"
+        ) from exc
+
 
 @router.get("/map/{plan_id}", response_model=ApiResponse[MapExportResponse])
 async def get_map_export(
@@ -41,6 +68,100 @@ async def get_map_export(
     return ApiResponse(success=True, data=payload)
 
 
+@router.get("/map/{plan_id}/days/{day_number}", response_model=ApiResponse[MapDay])
+async def get_map_export_day(
+    plan_id: UUID,
+    day_number: int = Path(..., ge=1),
+    user_id: str = Depends(get_current_user_id),
+    session: AsyncSession = Depends(get_db),
+) -> ApiResponse[MapDay]:
+    """Return the map payload for a single day of a travel plan."""
+    service = MapExportService(session)
+    plan = await service.load_plan(plan_id, _user_uuid(user_id))
+    if plan is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Travel plan not found")
+    try:
+        day = await service.build_day(plan, day_number)
+    except MapExportNotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Day not found") from None
+
+    return ApiResponse(success=True, data=day)
+
+
+@router.get(
+    "/map/{plan_id}/stream",
+    response_class=StreamingResponse,
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}},
+)
+async def stream_map_export(
+    plan_id: UUID,
+    user_id: str = Depends(get_current_user_id),
+) -> StreamingResponse:
+    """Stream the map export as NDJSON: a plan header line, then one line per day as it is ready."""
+    # The stream outlives request-scoped dependencies, so it owns its session.
+    session = AsyncSessionLocal()
+    try:
+        service = MapExportService(session)
+        plan = await service.load_plan(plan_id, _user_uuid(user_id))
+        if plan is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Travel plan not found")
+        try:
+            header = service.build_header(plan)
+        except MapExportError as exc:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    except BaseException:
+        await session.close()
+        raise
+
+    async def body() -> AsyncIterator[str]:
+        try:
+            async for chunk in service.stream_export(plan, header):
+                yield chunk.model_dump_json() + "\n"
+        except MapExportError as exc:
+            error = MapExportStreamChunk(kind="error", version=header.version, error=str(exc))
+            yield error.model_dump_json() + "\n"
+        finally:
+            await session.close()
+
+    return StreamingResponse(
+        body(),
+        media_type=NDJSON_MEDIA_TYPE,
+        headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get(
+    "/files/{plan_id}/{export_format}",
+    response_class=StreamingResponse,
+    responses={
+        200: {"content": {writer.media_type.split(";")[0]: {} for writer in EXPORT_WRITERS.values()}}
+    },
+)
+async def download_plan_file(
+    plan_id: UUID,
+    export_format: ExportFormat,
+    user_id: str = Depends(get_current_user_id),
+    session: AsyncSession = Depends(get_db),
+) -> StreamingResponse:
+    """Stream the itinerary as an ICS calendar, GPX/KML track or standalone HTML page."""
+    plan = await MapExportService(session).load_plan(plan_id, _user_uuid(user_id))
+    if plan is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Travel plan not found")
+    # The snapshot is plain data, so streaming does not depend on the request session.
+    snapshot = snapshot_plan(plan)
+    writer = EXPORT_WRITERS[export_format]
+    file_name = export_file_name(snapshot, export_format)
+
+    return StreamingResponse(
+        writer.write(snapshot),
+        media_type=writer.media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="{file_name}"',
+            "Cache-Control": "no-store",
+        },
+    )
+
+
 @router.get("/pdf/{plan_id}", response_model=ApiResponse[PdfExportResponse])
 async def get_pdf_export(
     plan_id: UUID,
@@ -66,3 +187,51 @@ async def get_pdf_export(
         expires_at=result.expires_at,
     )
     return ApiResponse(success=True, data=response)
+
+
+def _job_payload(job: PdfExportJob) -> PdfExportJobResponse:
+    return PdfExportJobResponse(
+        job_id=job.job_id,
+        plan_id=UUID(job.plan_id),
+        status=job.status,
+        file_name=job.file_name,
+        download_url=job.download_url,
+        storage_path=job.storage_path,
+        expires_at=job.expires_at_datetime,
+        error=job.error,
+    )
+
+
+@router.post(
+    "/pdf/{plan_id}/jobs",
+    response_model=ApiResponse[PdfExportJobResponse],
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def create_pdf_export_job(
+    plan_id: UUID,
+    user_id: str = Depends(get_current_user_id),
+    session: AsyncSession = Depends(get_db),
+) -> ApiResponse[PdfExportJobResponse]:
+    """Queue PDF generation on the render workers and return the job to poll."""
+    try:
+        job = await enqueue_pdf_export(session, plan_id, _user_uuid(user_id))
+    except PdfPlanNotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Travel plan not found") from None
+    except PdfGenerationError as exc:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(exc)) from exc
+
+    return ApiResponse(success=True, data=_job_payload(job))
+
+
+@router.get("/pdf/jobs/{job_id}", response_model=ApiResponse[PdfExportJobResponse])
+async def get_pdf_export_job_status(
+    job_id: str,
+    user_id: str = Depends(get_current_user_id),
+) -> ApiResponse[PdfExportJobResponse]:
+    """Report queued, rendering, uploading, done (with download URL) or failed."""
+    try:
+        job = await get_pdf_export_job(job_id, _user_uuid(user_id))
+    except PdfJobNotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Export job not found") from None
+
+    return ApiResponse(success=True, data=_job_payload(job))
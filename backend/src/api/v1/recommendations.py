@@ -4,13 +4,17 @@ Recommendation API endpoints
 
 from __future__ import annotations
 
+import asyncio
+import logging
+from typing import AsyncIterator, Awaitable, Callable
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ...config.database import get_db
+from ...config.database import AsyncSessionLocal, get_db
 from ...core.security import get_current_user_id
 from ...models.travel_plan import TravelPlan
 from ...schemas.base import ApiResponse
@@ -19,12 +23,21 @@ from ...schemas.recommendations import (
     AccommodationRecommendationsResponse,
     FlightOptionSchema,
     FlightRecommendationsResponse,
+    RecommendationStreamChunk,
+)
+from ...services.recommendations import (
+    AccommodationRecommendationResult,
+    AccommodationRecommender,
+    FlightRecommendationResult,
+    FlightRecommender,
 )
-from ...services.recommendations import AccommodationRecommender, FlightRecommender
 
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/recommendations", tags=["Recommendations"])
 
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
 
 async def _get_plan_or_404(
     plan_id: UUID,
@@ -50,6 +63,85 @@ async def _get_plan_or_404(
     return plan
 
 
+def _flight_payload(
+    plan: TravelPlan,
+    result: FlightRecommendationResult,
+) -> FlightRecommendationsResponse:
+    return FlightRecommendationsResponse(
+        plan_id=plan.id,
+        origin_airport=result.origin_airport,
+        destination_airport=result.destination_airport,
+        options=[FlightOptionSchema.model_validate(option) for option in result.options],
+    )
+
+
+def _accommodation_payload(
+    plan: TravelPlan,
+    result: AccommodationRecommendationResult,
+) -> AccommodationRecommendationsResponse:
+    return AccommodationRecommendationsResponse(
+        plan_id=plan.id,
+        check_in=result.check_in,
+        check_out=result.check_out,
+        options=[
+            AccommodationOptionSchema.model_validate(option) for option in result.options
+        ],
+    )
+
+
+async def _flights_chunk(plan: TravelPlan) -> RecommendationStreamChunk:
+    # Each part owns its session so the two searches never serialise on one connection.
+    async with AsyncSessionLocal() as part_session:
+        result = await FlightRecommender(part_session).get_recommendations(plan)
+        return RecommendationStreamChunk(
+            part="flights",
+            success=True,
+            flights=_flight_payload(plan, result),
+        )
+
+
+async def _accommodations_chunk(plan: TravelPlan) -> RecommendationStreamChunk:
+    async with AsyncSessionLocal() as part_session:
+        result = await AccommodationRecommender(part_session).get_recommendations(plan)
+        return RecommendationStreamChunk(
+            part="accommodations",
+            success=True,
+            accommodations=_accommodation_payload(plan, result),
+        )
+
+
+async def _stream_recommendations(plan: TravelPlan) -> AsyncIterator[str]:
+    """Run all recommendation parts concurrently and yield NDJSON lines as they finish"""
+    producers: dict[str, Callable[[TravelPlan], Awaitable[RecommendationStreamChunk]]] = {
+        "flights": _flights_chunk,
+        "accommodations": _accommodations_chunk,
+    }
+    tasks = {
+        asyncio.create_task(producer(plan)): part for part, producer in producers.items()
+    }
+    try:
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                part = tasks[task]
+                exc = task.exception()
+                if exc is not None:
+                    logger.warning("Recommendation part %s failed for plan %s: %s", part, plan.id, exc)
+                    chunk = RecommendationStreamChunk(
+                        part=part,  # type: ignore[arg-type]
+                        success=False,
+                        error="추천 정보를 불러오지 못했습니다.",
+                    )
+                else:
+                    chunk = task.result()
+                yield chunk.model_dump_json() + "\n"
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
 @router.get(
     "/flights/{plan_id}",
     response_model=ApiResponse[FlightRecommendationsResponse],
@@ -63,13 +155,7 @@ async def get_flight_recommendations(
     plan = await _get_plan_or_404(plan_id, user_id, session)
     service = FlightRecommender(session)
     result = await service.get_recommendations(plan)
-    payload = FlightRecommendationsResponse(
-        plan_id=plan.id,
-        origin_airport=result.origin_airport,
-        destination_airport=result.destination_airport,
-        options=[FlightOptionSchema.model_validate(option) for option in result.options],
-    )
-    return ApiResponse(success=True, data=payload)
+    return ApiResponse(success=True, data=_flight_payload(plan, result))
 
 
 @router.get(
@@ -85,12 +171,23 @@ async def get_accommodation_recommendations(
     plan = await _get_plan_or_404(plan_id, user_id, session)
     service = AccommodationRecommender(session)
     result = await service.get_recommendations(plan)
-    payload = AccommodationRecommendationsResponse(
-        plan_id=plan.id,
-        check_in=result.check_in,
-        check_out=result.check_out,
-        options=[
-            AccommodationOptionSchema.model_validate(option) for option in result.options
-        ],
+    return ApiResponse(success=True, data=_accommodation_payload(plan, result))
+
+
+@router.get(
+    "/{plan_id}",
+    response_class=StreamingResponse,
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}},
+)
+async def stream_recommendations(
+    plan_id: UUID,
+    user_id: str = Depends(get_current_user_id),
+    session: AsyncSession = Depends(get_db),
+) -> StreamingResponse:
+    """Stream flight and accommodation recommendations as NDJSON, one line per part"""
+    plan = await _get_plan_or_404(plan_id, user_id, session)
+    return StreamingResponse(
+        _stream_recommendations(plan),
+        media_type=NDJSON_MEDIA_TYPE,
+        headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"},
     )
-    return ApiResponse(success=True, data=payload)
@@ -40,11 +40,30 @@ class Settings(BaseSettings):
     AMADEUS_API_SECRET: str = ""
     BOOKING_COM_AFFILIATE_ID: str = ""
     AGODA_API_KEY: str = ""
+    GOOGLE_PLACES_MAX_CONCURRENCY: int = 4
+    GOOGLE_PLACES_ENRICHMENT_TIMEOUT: float = 8.0  # seconds, whole enrichment fan-out
+    GOOGLE_PLACES_RESULTS_PER_QUERY: int = 3
+    PLACES_LOCAL_SEARCH_RADIUS_KM: float = 15.0  # local place store search around the city centre
+    PLACES_CATEGORY_QUOTA: int = 5  # stored places per category before Google is skipped
+    PLACES_SPATIAL_INDEX_CITIES: Union[List[str], str] = []  # cities served from in-memory index
+    PLACES_SPATIAL_INDEX_REFRESH_SECONDS: int = 60  # incremental refresh from places.updated_at
+    PLACES_SPATIAL_INDEX_REBUILD_SECONDS: int = 60 * 60 * 6  # full rebuild drops deleted places
 
     # Task Queue
     REDIS_URL: str = "redis://localhost:6379/0"
     REDIS_TTL_PLACES: int = 60 * 15  # 15 minutes
     REDIS_TTL_FLIGHTS: int = 60 * 5  # 5 minutes
+    REDIS_TTL_PLACE_SEARCH: int = 60 * 60 * 6  # 6 hours
+    REDIS_TTL_DIRECTIONS: int = 60 * 60 * 24 * 30  # 30 days
+    REDIS_TTL_MAP_EXPORT: int = 60 * 60 * 24 * 7  # 7 days per plan version
+    REDIS_TTL_PDF_ARTIFACT: int = 60 * 60 * 24 * 30  # 30 days; keep in line with bucket retention
+    REDIS_TTL_STATIC_MAP: int = 60 * 60 * 24 * 30  # 30 days; keys are content addresses
+    DIRECTIONS_LOCAL_CACHE_SIZE: int = 2048  # in-process LRU entries in front of Redis
+    RECOMMENDATION_PREFETCH_ENABLED: bool = True
+    RECOMMENDATION_PREFETCH_QUEUE: str = "low-priority"
+    RECOMMENDATION_PREFETCH_MAX_QUEUE_DEPTH: int = 200  # skip prefetch beyond this backlog
+    RECOMMENDATION_PREFETCH_DEDUP_TTL: int = 60 * 30  # 30 minutes
+    BACKGROUND_ENQUEUE_TIMEOUT: float = 5.0  # seconds a post-commit enqueue may spend on the broker
     RATE_LIMIT_DEFAULT: str = "100/minute"
     RATE_LIMIT_AUTH: str = "5/minute"
 
@@ -75,11 +94,66 @@ class Settings(BaseSettings):
             return [method.strip() for method in v.split(",")]
         return v
 
+    @field_validator("PLACES_SPATIAL_INDEX_CITIES", mode="before")
+    @classmethod
+    def parse_spatial_index_cities(cls, v):
+        """쉼표로 구분된 문자열을 리스트로 변환"""
+        if isinstance(v, str):
+            return [city.strip() for city in v.split(",") if city.strip()]
+        return v
+
+    # Map Export
+    MAPBOX_DIRECTIONS_CONCURRENCY: int = 8  # in-flight directions requests per export
+    MAPBOX_DIRECTIONS_RATE_PER_SECOND: float = 5.0  # Directions API default: 300 requests/minute
+    MAPBOX_DIRECTIONS_BURST: int = 10
+    MAP_EXPORT_DEADLINE_SECONDS: float = 10.0  # legs still pending fall back to straight lines
+    MAP_EXPORT_DIRECTIONS_MODE: str = "day"  # "day": one request per day/profile chain, "leg": per leg
+    ROUTE_GEOMETRY_WRITE_BACK: bool = True  # persist Mapbox geometry onto routes on export
+    ROUTE_GEOMETRY_MAX_AGE_DAYS: int = 30  # stored geometry older than this is re-fetched
+    MAP_EXPORT_PRECOMPUTE_ENABLED: bool = True  # build and store map payloads after plan generation
+    MAP_EXPORT_PRECOMPUTE_QUEUE: str = "low-priority"
+    MAP_EXPORT_POLYLINE_TOLERANCE_METERS: float = 3.0  # Douglas–Peucker tolerance for exported routes
+    MAP_EXPORT_POLYLINE_ZOOMS: Union[List[int], str] = [10, 13]  # coarser per-zoom variants (1px tolerance)
+
+    @field_validator("MAP_EXPORT_POLYLINE_ZOOMS", mode="before")
+    @classmethod
+    def parse_polyline_zooms(cls, v):
+        """쉼표로 구분된 문자열을 리스트로 변환"""
+        if isinstance(v, str):
+            return [int(zoom.strip()) for zoom in v.split(",") if zoom.strip()]
+        return v
+
     # PDF Export
-    PDF_POOL_SIZE: int = 2
+    PDF_POOL_SIZE: int = 2  # maximum browsers per process
+    PDF_POOL_MIN_SIZE: int = 1  # browsers kept warm while idle
+    PDF_POOL_ACQUIRE_TIMEOUT: float = 30.0  # seconds a render may wait for a browser
+    PDF_POOL_IDLE_TIMEOUT: float = 300.0  # close browsers idle this long above the minimum
+    PDF_POOL_HEALTH_INTERVAL: float = 30.0  # seconds between liveness checks
+    PDF_BROWSER_MAX_RENDERS: int = 200  # recycle a browser after this many renders
+    PDF_BROWSER_MAX_MEMORY_MB: int = 768  # recycle once the browser process tree exceeds this
     PDF_RENDER_TIMEOUT: int = 60  # seconds
+    PDF_BLOCK_EXTERNAL_REQUESTS: bool = True  # serve assets/ locally, abort every other request
+    PDF_RENDER_WAIT_UNTIL: str = "load"  # "networkidle" only if templates fetch remote resources
+    PDF_FRAGMENT_CACHE_MB: int = 64  # rendered day fragments (incl. map images) kept per process
+    PDF_HTML_THREAD_MIN_DAYS: int = 3  # render HTML on a worker thread when this many days are stale
+    PDF_RENDER_MODE: str = "single"  # "single" document or "paged" (cover/days/bookings merged)
+    PDF_PAGED_CONCURRENCY: int = 2  # parts printed at once in paged mode; keep <= PDF_POOL_SIZE
+    PDF_DAY_PDF_CACHE_MB: int = 128  # rendered day PDFs kept per process in paged mode
+    PDF_STATIC_MAP_CONCURRENCY: int = 4  # simultaneous Mapbox Static requests per process
+    PDF_STATIC_MAP_CACHE: str = "redis"  # "redis", "disk" or "none"
+    PDF_STATIC_MAP_CACHE_DIR: str = "/tmp/traveltailor/static-maps"
+    PDF_STATIC_MAP_FORMAT: str = "jpeg"  # "png" embeds Mapbox output as is; "jpeg"/"webp" need Pillow
+    PDF_STATIC_MAP_QUALITY: int = 80
+    PDF_STATIC_MAP_MAX_WIDTH: int = 1600  # px; A4 content width at ~220 dpi
+    PDF_STORAGE_BACKEND: str = "supabase"  # "supabase" or "local" (filesystem, for development)
+    PDF_LOCAL_STORAGE_DIR: str = "/tmp/traveltailor/pdfs"
+    PDF_STORAGE_TIMEOUT: float = 60.0  # seconds per Storage API request
+    PDF_STORAGE_MAX_CONNECTIONS: int = 10  # pooled connections to the Storage API
     PDF_BUCKET_NAME: str = "travel-plan-pdfs"
     PDF_SIGNED_URL_TTL: int = 3600  # seconds
+    PDF_RENDER_QUEUE: str = "pdf-render"  # consumed by dedicated render workers
+    PDF_JOB_TTL: int = 60 * 60 * 24  # job status retention
+    PDF_RENDER_CLAIM_TTL: int = 60 * 10  # one in-flight render per plan version; matches task_time_limit
     PDF_BRAND_NAME: str = "TravelTailor"
     PDF_INCLUDE_PREVIEW: bool = True
     PDF_TEMPLATE_LOCALE: str = "ko-KR"
@@ -15,6 +15,7 @@ connection management, serialisation and cache key conventions from callers.
 from __future__ import annotations
 
 import asyncio
+import hashlib
 import json
 import logging
 from dataclasses import dataclass
@@ -29,6 +30,14 @@ logger = logging.getLogger(__name__)
 _redis_pool: Redis | None = None
 _redis_lock = asyncio.Lock()
 
+# Delete a claim only while ``owner`` still holds it (GET + DEL as one atomic step).
+_RELEASE_IF_OWNER = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
 
 def _build_namespaced_key(namespace: str, identifier: str) -> str:
     """Construct a stable cache key with service namespace."""
@@ -89,6 +98,11 @@ class CacheTTL:
 
     places: int = settings.REDIS_TTL_PLACES
     flights: int = settings.REDIS_TTL_FLIGHTS
+    place_searches: int = settings.REDIS_TTL_PLACE_SEARCH
+    directions: int = settings.REDIS_TTL_DIRECTIONS
+    map_exports: int = settings.REDIS_TTL_MAP_EXPORT
+    pdf_artifacts: int = settings.REDIS_TTL_PDF_ARTIFACT
+    static_maps: int = settings.REDIS_TTL_STATIC_MAP
 
 
 ttl_config = CacheTTL()
@@ -146,6 +160,108 @@ async def invalidate_place_cache(place_id: str | None = None) -> int:
     return await _invalidate("places", place_id)
 
 
+def _place_search_identifier(query: str, language: str, place_type: str | None) -> str:
+    normalised = " ".join(query.casefold().split())
+    raw = f"{language}|{place_type or '*'}|{normalised}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+async def get_cached_place_search(
+    query: str,
+    *,
+    language: str,
+    place_type: str | None,
+) -> list[dict[str, Any]] | None:
+    """Return cached Places text-search results for a normalised query."""
+    data = await _get_json("place_searches", _place_search_identifier(query, language, place_type))
+    if data is None:
+        return None
+    return list(data.get("results") or [])
+
+
+async def cache_place_search(
+    query: str,
+    results: list[dict[str, Any]],
+    *,
+    language: str,
+    place_type: str | None,
+    ttl: int | None = None,
+) -> None:
+    """Store Places text-search results keyed by normalised query, language and type."""
+    await _set_json(
+        "place_searches",
+        _place_search_identifier(query, language, place_type),
+        {"results": results},
+        ttl=ttl or ttl_config.place_searches,
+    )
+
+
+async def get_cached_directions(key: str) -> dict[str, Any] | None:
+    """Return a cached directions payload (polyline, distance, duration, steps)."""
+    return await _get_json("directions", key)
+
+
+async def cache_directions(key: str, payload: dict[str, Any], *, ttl: int | None = None) -> None:
+    """Store a directions payload; routes between fixed points rarely change."""
+    await _set_json("directions", key, payload, ttl=ttl or ttl_config.directions)
+
+
+def _map_export_day_identifier(plan_id: str, version: str, day_number: int) -> str:
+    return f"{plan_id}:{version}:day:{day_number}"
+
+
+async def get_cached_map_export_day(plan_id: str, version: str, day_number: int) -> dict[str, Any] | None:
+    """Return a precomputed map export day for one plan version."""
+    return await _get_json("map_exports", _map_export_day_identifier(plan_id, version, day_number))
+
+
+async def cache_map_export_day(
+    plan_id: str,
+    version: str,
+    day_number: int,
+    payload: dict[str, Any],
+    *,
+    ttl: int | None = None,
+) -> None:
+    """Store a map export day; edits produce a new version so entries are never rewritten."""
+    await _set_json(
+        "map_exports",
+        _map_export_day_identifier(plan_id, version, day_number),
+        payload,
+        ttl=ttl or ttl_config.map_exports,
+    )
+
+
+async def get_cached_pdf_artifact(key: str) -> dict[str, Any] | None:
+    """Return the storage record of a PDF rendered from identical content."""
+    return await _get_json("pdf_artifacts", key)
+
+
+async def cache_pdf_artifact(key: str, payload: dict[str, Any], *, ttl: int | None = None) -> None:
+    """Remember where the PDF for an artifact key was uploaded."""
+    await _set_json("pdf_artifacts", key, payload, ttl=ttl or ttl_config.pdf_artifacts)
+
+
+async def get_cached_static_map(key: str) -> dict[str, Any] | None:
+    """Return a processed static map image (base64 payload and media type)."""
+    return await _get_json("static_maps", key)
+
+
+async def cache_static_map(key: str, payload: dict[str, Any], *, ttl: int | None = None) -> None:
+    """Store a processed static map image under its content address."""
+    await _set_json("static_maps", key, payload, ttl=ttl or ttl_config.static_maps)
+
+
+async def get_cached_pdf_job(job_id: str) -> dict[str, Any] | None:
+    """Return the state of a background PDF export job."""
+    return await _get_json("pdf_jobs", job_id)
+
+
+async def cache_pdf_job(job_id: str, payload: dict[str, Any], *, ttl: int | None = None) -> None:
+    """Persist the state of a background PDF export job."""
+    await _set_json("pdf_jobs", job_id, payload, ttl=ttl or settings.PDF_JOB_TTL)
+
+
 async def get_cached_flight_quote(key: str) -> CachedFlightQuote | None:
     """Return cached flight quote, if present."""
     data = await _get_json("flight_quotes", key)
@@ -169,6 +285,46 @@ async def invalidate_flight_cache(identifier: str | None = None) -> int:
     return await _invalidate("flight_quotes", identifier)
 
 
+async def acquire_idempotency_key(namespace: str, identifier: str, *, ttl: int) -> bool:
+    """Claim ``namespace:identifier`` for ``ttl`` seconds; False if already claimed."""
+    client = await get_redis_client()
+    key = _build_namespaced_key(f"idempotency:{namespace}", identifier)
+    return bool(await client.set(key, "1", ex=ttl, nx=True))
+
+
+async def claim_idempotency_key(namespace: str, identifier: str, owner: str, *, ttl: int) -> str:
+    """Claim ``namespace:identifier`` for ``owner`` unless held; return the current holder."""
+    client = await get_redis_client()
+    key = _build_namespaced_key(f"idempotency:{namespace}", identifier)
+    if await client.set(key, owner, ex=ttl, nx=True):
+        return owner
+    holder = await client.get(key)
+    if holder is None:
+        # Expired between the two calls; try once more.
+        await client.set(key, owner, ex=ttl, nx=True)
+        holder = await client.get(key)
+    return holder or owner
+
+
+async def release_idempotency_key(
+    namespace: str,
+    identifier: str,
+    *,
+    owner: str | None = None,
+) -> None:
+    """Release a previously claimed idempotency key so the work can be retried.
+
+    With ``owner`` the key is only deleted while that owner still holds it, so a
+    holder whose claim expired cannot drop the claim of whoever took over.
+    """
+    client = await get_redis_client()
+    key = _build_namespaced_key(f"idempotency:{namespace}", identifier)
+    if owner is None:
+        await client.delete(key)
+    else:
+        await client.eval(_RELEASE_IF_OWNER, 1, key, owner)
+
+
 async def cached_operation(
     namespace: Literal["places", "flight_quotes"],
     identifier: str,
@@ -4,12 +4,17 @@ Geospatial helper utilities.
 
 from __future__ import annotations
 
+import heapq
 import math
-from typing import Iterable, Sequence, Tuple
+from typing import Callable, Iterable, Sequence, Tuple
 
 
 Coordinate = tuple[float, float]
 
+_EARTH_RADIUS_METERS = 6_371_000
+# Web Mercator ground resolution at the equator for zoom 0 with 256px tiles.
+_METERS_PER_PIXEL_Z0 = 156_543.03392
+
 
 def encode_polyline(coordinates: Sequence[Coordinate]) -> str:
     """Encode coordinates into a Google/Mapbox compatible polyline string."""
@@ -46,6 +51,34 @@ def _encode_value(value: int) -> str:
     return encoded
 
 
+def decode_polyline(encoded: str) -> list[Coordinate]:
+    """Decode a Google/Mapbox polyline string (precision 5) into coordinates."""
+    coordinates: list[Coordinate] = []
+    index = 0
+    lat = 0
+    lng = 0
+    length = len(encoded)
+
+    while index < length:
+        deltas: list[int] = []
+        for _ in range(2):
+            shift = 0
+            result = 0
+            while True:
+                byte = ord(encoded[index]) - 63
+                index += 1
+                result |= (byte & 0x1F) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lng += deltas[1]
+        coordinates.append((lat / 1e5, lng / 1e5))
+
+    return coordinates
+
+
 def haversine_distance_meters(
     src: Coordinate,
     dest: Coordinate,
@@ -82,3 +115,170 @@ def calculate_bounds(coordinates: Iterable[Coordinate]) -> tuple[Coordinate, Coo
     sw = (min(latitudes), min(longitudes))
     ne = (max(latitudes), max(longitudes))
     return sw, ne
+
+
+def _project(coordinates: Sequence[Coordinate]) -> tuple[list[float], list[float]]:
+    """Project to local planar metres (equirectangular around the mean latitude)."""
+    mean_lat = math.radians(sum(lat for lat, _ in coordinates) / len(coordinates))
+    scale = math.pi / 180 * _EARTH_RADIUS_METERS
+    x_scale = scale * math.cos(mean_lat)
+    xs = [lng * x_scale for _, lng in coordinates]
+    ys = [lat * scale for lat, _ in coordinates]
+    return xs, ys
+
+
+def _segment_distance_sq(
+    px: float, py: float, ax: float, ay: float, bx: float, by: float
+) -> float:
+    dx = bx - ax
+    dy = by - ay
+    length_sq = dx * dx + dy * dy
+    if length_sq == 0.0:
+        return (px - ax) ** 2 + (py - ay) ** 2
+    t = max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / length_sq))
+    return (px - ax - t * dx) ** 2 + (py - ay - t * dy) ** 2
+
+
+def simplify_douglas_peucker(coordinates: Sequence[Coordinate], tolerance_m: float) -> list[Coordinate]:
+    """Drop vertices closer than ``tolerance_m`` metres to the simplified line.
+
+    Iterative Ramer–Douglas–Peucker on a local planar projection; endpoints are
+    always kept and the output never deviates from the input by more than the
+    tolerance.
+    """
+    points = list(coordinates)
+    if len(points) <= 2 or tolerance_m <= 0:
+        return points
+
+    xs, ys = _project(points)
+    tolerance_sq = tolerance_m * tolerance_m
+    keep = bytearray(len(points))
+    keep[0] = keep[-1] = 1
+    stack = [(0, len(points) - 1)]
+    while stack:
+        start, end = stack.pop()
+        ax, ay, bx, by = xs[start], ys[start], xs[end], ys[end]
+        max_sq = -1.0
+        index = -1
+        for i in range(start + 1, end):
+            dist_sq = _segment_distance_sq(xs[i], ys[i], ax, ay, bx, by)
+            if dist_sq > max_sq:
+                max_sq, index = dist_sq, i
+        if index != -1 and max_sq > tolerance_sq:
+            keep[index] = 1
+            stack.append((start, index))
+            stack.append((index, end))
+    return [point for point, kept in zip(points, keep, strict=True) if kept]
+
+
+def simplify_visvalingam(coordinates: Sequence[Coordinate], min_area_m2: float) -> list[Coordinate]:
+    """Repeatedly remove the vertex forming the smallest triangle below ``min_area_m2``.
+
+    Visvalingam–Whyatt keeps the overall shape better than Douglas–Peucker on
+    noisy GPS-like traces; a heap with lazy invalidation keeps it O(n log n).
+    """
+    points = list(coordinates)
+    count = len(points)
+    if count <= 2 or min_area_m2 <= 0:
+        return points
+
+    xs, ys = _project(points)
+    prev = list(range(-1, count - 1))
+    nxt = list(range(1, count + 1))
+    removed = bytearray(count)
+
+    def area(i: int) -> float:
+        a, b = prev[i], nxt[i]
+        return abs((xs[a] - xs[i]) * (ys[b] - ys[i]) - (xs[b] - xs[i]) * (ys[a] - ys[i])) / 2
+
+    areas = [math.inf] * count
+    heap: list[tuple[float, int]] = []
+    for i in range(1, count - 1):
+        areas[i] = area(i)
+        heap.append((areas[i], i))
+    heapq.heapify(heap)
+
+    while heap:
+        value, i = heapq.heappop(heap)
+        if removed[i] or value != areas[i]:
+            continue
+        if value >= min_area_m2:
+            break
+        removed[i] = 1
+        a, b = prev[i], nxt[i]
+        nxt[a], prev[b] = b, a
+        for j in (a, b):
+            if 0 < j < count - 1:
+                # A neighbour's area never drops below the one just removed.
+                areas[j] = max(area(j), value)
+                heapq.heappush(heap, (areas[j], j))
+    return [point for point, gone in zip(points, removed, strict=True) if not gone]
+
+
+def meters_per_pixel(latitude: float, zoom: float) -> float:
+    """Web Mercator ground resolution for 256px tiles at ``zoom``."""
+    return _METERS_PER_PIXEL_Z0 * math.cos(math.radians(latitude)) / (2**zoom)
+
+
+def simplify_for_zoom(
+    coordinates: Sequence[Coordinate],
+    zoom: float,
+    *,
+    pixel_tolerance: float = 1.0,
+) -> list[Coordinate]:
+    """Simplify so no vertex is dropped that would move the line by more than ``pixel_tolerance`` px."""
+    if len(coordinates) <= 2:
+        return list(coordinates)
+    latitude = sum(lat for lat, _ in coordinates) / len(coordinates)
+    return simplify_douglas_peucker(coordinates, meters_per_pixel(latitude, zoom) * pixel_tolerance)
+
+
+def encode_zoom_variants(
+    coordinates: Sequence[Coordinate],
+    zooms: Iterable[int],
+    *,
+    pixel_tolerance: float = 1.0,
+) -> dict[int, str]:
+    """Encoded polylines simplified for each zoom level, coarsest first.
+
+    Consecutive levels that simplify to the same vertex count share nothing new
+    and are omitted, so callers fall back to the next finer geometry.
+    """
+    variants: dict[int, str] = {}
+    last_count = -1
+    for zoom in sorted(set(zooms)):
+        simplified = simplify_for_zoom(coordinates, zoom, pixel_tolerance=pixel_tolerance)
+        if len(simplified) == last_count:
+            continue
+        last_count = len(simplified)
+        variants[zoom] = encode_polyline(simplified)
+    return variants
+
+
+def fit_encoded_polyline(
+    coordinates: Sequence[Coordinate],
+    max_length: int,
+    *,
+    initial_tolerance_m: float = 1.0,
+    length: Callable[[str], int] = len,
+) -> str | None:
+    """Encode ``coordinates``, simplifying progressively until ``length(encoded) <= max_length``.
+
+    The Douglas–Peucker tolerance doubles from ``initial_tolerance_m``; ``None``
+    is returned when even the two endpoints do not fit.
+    """
+    encoded = encode_polyline(coordinates)
+    if length(encoded) <= max_length:
+        return encoded
+    if len(coordinates) <= 2:
+        return None
+
+    tolerance = initial_tolerance_m
+    while True:
+        simplified = simplify_douglas_peucker(coordinates, tolerance)
+        encoded = encode_polyline(simplified)
+        if length(encoded) <= max_length:
+            return encoded
+        if len(simplified) <= 2:
+            return None
+        tolerance *= 2
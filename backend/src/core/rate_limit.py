@@ -0,0 +1,43 @@
+"""
+Async token bucket for outbound API quotas.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+
+class TokenBucket:
+    """Token bucket that makes callers wait for their turn instead of failing.
+
+    Tokens are reserved synchronously (no await between reading and updating the
+    balance), so the bucket is safe to share between tasks and is not tied to a
+    particular event loop. A negative balance represents callers already queued.
+    """
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self._rate = rate
+        self._capacity = max(capacity, 1.0)
+        self._tokens = self._capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        """Wait until a token is available and consume it."""
+        self._refill()
+        self._tokens -= 1
+        if self._tokens >= 0:
+            return
+        try:
+            await asyncio.sleep(-self._tokens / self._rate)
+        except asyncio.CancelledError:
+            # Give the reservation back so cancelled callers do not slow down the rest.
+            self._tokens += 1
+            raise
@@ -6,7 +6,7 @@ Redis 브로커/백엔드를 사용하며 AI 파이프라인 작업을 큐잉할
 from __future__ import annotations
 
 import asyncio
-from typing import Any, Callable, Optional
+from typing import Any, Awaitable, Callable, Optional
 
 from celery import Celery
 from celery.app.task import Task
@@ -39,11 +39,20 @@ celery_app.conf.update(
     worker_max_tasks_per_child=100,
 )
 
+# 워커가 기동 시 등록해야 하는 task 모듈
+_PACKAGE_ROOT = __name__.rsplit(".core.tasks", 1)[0]
+celery_app.conf.imports = (
+    f"{_PACKAGE_ROOT}.services.recommendations.prefetch",
+    f"{_PACKAGE_ROOT}.services.exports.precompute",
+    f"{_PACKAGE_ROOT}.services.pdf.jobs",
+)
+
 # 큐 라우팅 설정
 celery_app.conf.task_queues = (
     Queue("default", routing_key="default.#"),
     Queue("ai-tasks", routing_key="ai.#"),
     Queue("low-priority", routing_key="low.#"),
+    Queue("pdf-render", routing_key="pdf.#"),
 )
 
 
@@ -128,12 +137,47 @@ def enqueue_task(task_name: str, *args: Any, **kwargs: Any) -> AsyncResult:
     return celery_app.send_task(task_name, args=args, kwargs=kwargs)
 
 
+# 실행 중인 백그라운드 task 참조 (가비지 컬렉션으로 사라지지 않도록 보관)
+_background_tasks: set[asyncio.Task[Any]] = set()
+
+
+def run_in_background(coro: Awaitable[Any], *, timeout: float, name: str) -> asyncio.Task[Any]:
+    """
+    응답을 기다리게 하지 않도록 코루틴을 백그라운드 task로 실행합니다.
+    브로커가 느리거나 내려가 있으면 kombu의 연결 재시도가 길어지므로 `timeout`초에서 끊고,
+    시간 초과나 예외는 로그로만 남깁니다.
+    """
+
+    async def _run() -> None:
+        try:
+            await asyncio.wait_for(coro, timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Background task %s timed out after %.1fs", name, timeout)
+        except Exception as exc:  # pragma: no cover - callers already swallow their own errors
+            logger.warning("Background task %s failed: %s", name, exc)
+
+    task = asyncio.create_task(_run(), name=name)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
+def get_queue_depth(queue: str) -> int:
+    """
+    브로커에 쌓여 있는 대기 메시지 수를 반환합니다.
+    Redis 브로커는 큐 이름과 같은 리스트 키에 메시지를 적재합니다.
+    """
+    with celery_app.connection_for_write() as connection:
+        client = connection.default_channel.client
+        return int(client.llen(queue))
+
+
 def start_worker(argv: Optional[list[str]] = None) -> None:
     """
     개발 환경에서 Celery 워커를 실행하기 위한 헬퍼.
     예: `uv run python -m backend.src.core.tasks worker`
     """
-    arguments = argv or ["worker", "--loglevel=INFO", "--queues=default,ai-tasks"]
+    arguments = argv or ["worker", "--loglevel=INFO", "--queues=default,ai-tasks,low-priority"]
     celery_app.worker_main(arguments)
 
 
@@ -6,14 +6,17 @@ Provides a thin async client for requesting routes between coordinates.
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Any, Sequence
 from urllib.parse import quote
 
 import httpx
 
 from ..config import settings
-from ..core.geo_utils import encode_polyline
+from ..core.geo_utils import fit_encoded_polyline
+
+MAX_DIRECTIONS_COORDINATES = 25
+MAX_STATIC_URL_LENGTH = 8192
 
 
 class MapboxError(Exception):
@@ -29,6 +32,17 @@ class MapboxStep:
     duration_seconds: float
 
 
+@dataclass(slots=True)
+class MapboxLeg:
+    """Portion of a multi-waypoint route between two consecutive coordinates."""
+
+    distance_meters: float
+    duration_seconds: float
+    coordinates: list[tuple[float, float]]
+    summary: str | None
+    steps: list[MapboxStep]
+
+
 @dataclass(slots=True)
 class MapboxRoute:
     """Simplified directions payload."""
@@ -38,6 +52,7 @@ class MapboxRoute:
     coordinates: list[tuple[float, float]]
     summary: str | None
     steps: list[MapboxStep]
+    legs: list[MapboxLeg] = field(default_factory=list)
 
 
 class MapboxClient:
@@ -67,13 +82,17 @@ class MapboxClient:
         """Request a directions route for the supplied coordinates.
 
         Args:
-            coordinates: Sequence of (latitude, longitude) tuples.
+            coordinates: Sequence of (latitude, longitude) tuples, at most 25.
             profile: Mapbox routing profile (driving, walking, cycling).
             language: Response language.
             steps: Whether to request step-by-step instructions.
         """
         if len(coordinates) < 2:
             raise ValueError("At least two coordinates are required to request a route.")
+        if len(coordinates) > MAX_DIRECTIONS_COORDINATES:
+            raise ValueError(
+                f"Mapbox accepts at most {MAX_DIRECTIONS_COORDINATES} coordinates per request."
+            )
 
         coordinate_path = ";".join(f"{lon:.6f},{lat:.6f}" for lat, lon in coordinates)
         params: dict[str, Any] = {
@@ -108,18 +127,35 @@ class MapboxClient:
         coordinates_ll = [(float(latlon[1]), float(latlon[0])) for latlon in geo_coordinates]
 
         steps_payload: list[MapboxStep] = []
-        if steps and primary.get("legs"):
-            for leg in primary["legs"]:
-                for step in leg.get("steps", []):
-                    maneuver = step.get("maneuver") or {}
-                    instruction = maneuver.get("instruction") or ""
-                    steps_payload.append(
-                        MapboxStep(
-                            instruction=instruction,
-                            distance_meters=float(step.get("distance") or 0),
-                            duration_seconds=float(step.get("duration") or 0),
-                        )
+        legs_payload: list[MapboxLeg] = []
+        for leg in primary.get("legs") or []:
+            leg_steps: list[MapboxStep] = []
+            leg_coordinates: list[tuple[float, float]] = []
+            for step in leg.get("steps", []) if steps else []:
+                maneuver = step.get("maneuver") or {}
+                instruction = maneuver.get("instruction") or ""
+                leg_steps.append(
+                    MapboxStep(
+                        instruction=instruction,
+                        distance_meters=float(step.get("distance") or 0),
+                        duration_seconds=float(step.get("duration") or 0),
                     )
+                )
+                # Step geometries chain end-to-start; drop the shared joint point.
+                for lon, lat in (step.get("geometry") or {}).get("coordinates") or []:
+                    point = (float(lat), float(lon))
+                    if not leg_coordinates or leg_coordinates[-1] != point:
+                        leg_coordinates.append(point)
+            steps_payload.extend(leg_steps)
+            legs_payload.append(
+                MapboxLeg(
+                    distance_meters=float(leg.get("distance") or 0),
+                    duration_seconds=float(leg.get("duration") or 0),
+                    coordinates=leg_coordinates,
+                    summary=leg.get("summary"),
+                    steps=leg_steps,
+                )
+            )
 
         return MapboxRoute(
             distance_meters=float(primary.get("distance") or 0),
@@ -127,6 +163,7 @@ class MapboxClient:
             coordinates=coordinates_ll,
             summary=primary.get("summary"),
             steps=steps_payload,
+            legs=legs_payload,
         )
 
 
@@ -165,21 +202,28 @@ class MapboxStaticClient:
         width: int = 1280,
         height: int = 720,
     ) -> bytes:
-        """Return a rendered static map image for the supplied markers/path."""
+        """Return a rendered static map image for the supplied markers/path.
+
+        The path is simplified as far as needed to keep the request URL under
+        ``MAX_STATIC_URL_LENGTH``; it is dropped if even its endpoints do not fit.
+        """
         overlays: list[str] = []
         for index, (lat, lon) in enumerate(markers, start=1):
             overlays.append(
                 quote(f"pin-s-{index}+285A98({lon:.5f},{lat:.5f})", safe="(),+")
             )
         if path:
-            polyline = encode_polyline(path)
-            overlays.append(quote(f"path-4+1B9AAA({polyline})", safe="(),+"))
+            path_overlay = quote("path-4+1B9AAA()", safe="(),+")
+            fixed = len(self._static_url(style, [*overlays, path_overlay], width, height))
+            polyline = fit_encoded_polyline(
+                path,
+                MAX_STATIC_URL_LENGTH - fixed,
+                length=lambda encoded: len(quote(encoded, safe="(),+")),
+            )
+            if polyline is not None:
+                overlays.append(quote(f"path-4+1B9AAA({polyline})", safe="(),+"))
 
-        overlay_segment = ",".join(overlays) if overlays else ""
-        endpoint = f"/mapbox/{style}/static/"
-        if overlay_segment:
-            endpoint += f"{overlay_segment}/"
-        endpoint += f"auto/{width}x{height}@2x"
+        endpoint = self._static_endpoint(style, overlays, width, height)
 
         params: dict[str, Any] = {
             "access_token": self._token,
@@ -194,6 +238,17 @@ class MapboxStaticClient:
             raise MapboxError(f"Mapbox static image network error: {exc}") from exc
         return response.content
 
+    @staticmethod
+    def _static_endpoint(style: str, overlays: Sequence[str], width: int, height: int) -> str:
+        endpoint = f"/mapbox/{style}/static/"
+        if overlays:
+            endpoint += f"{','.join(overlays)}/"
+        return endpoint + f"auto/{width}x{height}@2x"
+
+    def _static_url(self, style: str, overlays: Sequence[str], width: int, height: int) -> str:
+        endpoint = self._static_endpoint(style, overlays, width, height)
+        return f"{self._BASE_URL}{endpoint}?access_token={self._token}"
+
 
 _mapbox_static_client: MapboxStaticClient | None = None
 
@@ -31,6 +31,7 @@ from .core.csrf import CsrfTokenResponse, get_csrf_token_endpoint
 from .metrics.ai_pipeline import record_api_request, register_metrics
 from .middleware.security_headers import add_security_headers_to_app
 from .services.pdf import shutdown_pdf_renderer
+from .services.pdf.storage import close_pdf_storage
 
 logger = logging.getLogger(__name__)
 
@@ -77,6 +78,7 @@ async def lifespan(app: FastAPI):
             logger.warning("Failed to shut down PostHog cleanly: %s", exc)
 
     await shutdown_pdf_renderer()
+    await close_pdf_storage()
     await close_redis_client()
     await close_db()
 
@@ -76,6 +76,108 @@ api_request_errors_total = Counter(
     registry=registry,
 )
 
+places_spatial_index_places = Gauge(
+    "places_spatial_index_places",
+    "Number of places held in the in-memory spatial index",
+    ["city"],
+    registry=registry,
+)
+
+places_spatial_index_bytes = Gauge(
+    "places_spatial_index_bytes",
+    "Approximate memory used by the in-memory spatial index",
+    ["city"],
+    registry=registry,
+)
+
+directions_cache_requests_total = Counter(
+    "directions_cache_requests_total",
+    "Mapbox directions lookups by cache outcome",
+    ["result"],
+    registry=registry,
+)
+
+directions_cache_hit_ratio = Gauge(
+    "directions_cache_hit_ratio",
+    "Share of Mapbox directions lookups served from cache since process start",
+    registry=registry,
+)
+
+pdf_artifact_cache_total = Counter(
+    "pdf_artifact_cache_total",
+    "PDF export lookups by artifact cache result",
+    ["result"],
+    registry=registry,
+)
+
+pdf_render_seconds = Histogram(
+    "pdf_render_seconds",
+    "Chromium render time of itinerary PDFs",
+    registry=registry,
+    buckets=(0.5, 1, 2, 4, 8, 16, 32),
+)
+
+pdf_upload_bytes = Histogram(
+    "pdf_upload_bytes",
+    "Size of itinerary PDFs uploaded to storage",
+    registry=registry,
+    buckets=(100_000, 250_000, 500_000, 1_000_000, 2_500_000, 5_000_000, 10_000_000, 25_000_000),
+)
+
+pdf_pool_browsers = Gauge(
+    "pdf_pool_browsers",
+    "Chromium browsers in the PDF pool by state",
+    ["state"],
+    registry=registry,
+)
+
+pdf_pool_waiters = Gauge(
+    "pdf_pool_waiters",
+    "Renders waiting for a browser from the PDF pool",
+    registry=registry,
+)
+
+pdf_pool_acquire_seconds = Histogram(
+    "pdf_pool_acquire_seconds",
+    "Time spent waiting for a browser from the PDF pool",
+    registry=registry,
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 2, 5, 10, 30),
+)
+
+pdf_pool_acquire_timeouts_total = Counter(
+    "pdf_pool_acquire_timeouts_total",
+    "Renders rejected because no browser became available in time",
+    registry=registry,
+)
+
+pdf_browser_recycles_total = Counter(
+    "pdf_browser_recycles_total",
+    "Browsers closed by the PDF pool",
+    ["reason"],
+    registry=registry,
+)
+
+pdf_static_map_total = Counter(
+    "pdf_static_map_total",
+    "Static map images for PDF day pages by source",
+    ["result"],
+    registry=registry,
+)
+
+pdf_static_map_bytes = Histogram(
+    "pdf_static_map_bytes",
+    "Size of static map images embedded into PDF HTML",
+    registry=registry,
+    buckets=(25_000, 50_000, 100_000, 250_000, 500_000, 1_000_000, 2_500_000),
+)
+
+pdf_day_pdf_cache_total = Counter(
+    "pdf_day_pdf_cache_total",
+    "Day parts of paginated PDFs by day PDF cache result",
+    ["result"],
+    registry=registry,
+)
+
 # FastAPI router for /metrics endpoint
 metrics_router = APIRouter()
 
@@ -137,6 +239,71 @@ def record_api_request(
         ).inc()
 
 
+def update_spatial_index_size(city: str, places: int, memory_bytes: int) -> None:
+    """Update size gauges for a city's in-memory spatial index."""
+    places_spatial_index_places.labels(city=city).set(places)
+    places_spatial_index_bytes.labels(city=city).set(memory_bytes)
+
+
+_directions_lookups = {"hits": 0, "total": 0}
+
+
+def record_directions_cache(result: str) -> None:
+    """Count a directions lookup (``local``, ``redis`` or ``miss``) and update the hit ratio."""
+    directions_cache_requests_total.labels(result=result).inc()
+    _directions_lookups["total"] += 1
+    if result != "miss":
+        _directions_lookups["hits"] += 1
+    directions_cache_hit_ratio.set(_directions_lookups["hits"] / _directions_lookups["total"])
+
+
+def record_pdf_artifact_cache(result: str) -> None:
+    """Count a PDF export served from an existing artifact (``hit``) or rendered (``miss``)."""
+    pdf_artifact_cache_total.labels(result=result).inc()
+
+
+def observe_pdf_render(seconds: float) -> None:
+    """Record the Chromium render time of one PDF."""
+    pdf_render_seconds.observe(seconds)
+
+
+def observe_pdf_upload(size_bytes: int) -> None:
+    """Record the size of an uploaded PDF."""
+    pdf_upload_bytes.observe(size_bytes)
+
+
+def update_pdf_pool_size(idle: int, busy: int, waiters: int) -> None:
+    """Publish the current PDF browser pool occupancy and queue depth."""
+    pdf_pool_browsers.labels(state="idle").set(idle)
+    pdf_pool_browsers.labels(state="busy").set(busy)
+    pdf_pool_waiters.set(waiters)
+
+
+def observe_pdf_pool_acquire(seconds: float, *, timed_out: bool) -> None:
+    """Record how long a render waited for a browser."""
+    pdf_pool_acquire_seconds.observe(seconds)
+    if timed_out:
+        pdf_pool_acquire_timeouts_total.inc()
+
+
+def record_pdf_browser_recycle(reason: str) -> None:
+    """Count a browser closed for ``dead``, ``renders``, ``memory`` or ``idle``."""
+    pdf_browser_recycles_total.labels(reason=reason).inc()
+
+
+def record_pdf_static_map(result: str, size_bytes: int | None = None) -> None:
+    """Count a static map served from cache (``hit``), fetched (``miss``) or failed (``error``)."""
+    pdf_static_map_total.labels(result=result).inc()
+    if size_bytes is not None:
+        pdf_static_map_bytes.observe(size_bytes)
+
+
+def record_pdf_day_pdf_cache(hits: int, misses: int) -> None:
+    """Count day parts of a paginated PDF reused from cache (``hit``) or printed (``miss``)."""
+    pdf_day_pdf_cache_total.labels(result="hit").inc(hits)
+    pdf_day_pdf_cache_total.labels(result="miss").inc(misses)
+
+
 def register_metrics(app: FastAPI) -> None:
     """Attach the metrics router to a FastAPI application."""
     app.include_router(metrics_router)
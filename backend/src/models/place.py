@@ -14,12 +14,21 @@ from sqlalchemy import (
     DateTime,
     Numeric,
     CheckConstraint,
+    Computed,
     Index,
 )
 from sqlalchemy.dialects.postgresql import UUID, ARRAY, JSONB
+from sqlalchemy.orm import deferred
 from sqlalchemy.sql import func
 
 from ..config.database import Base
+from .types import Geography
+
+# Generated by PostgreSQL from latitude/longitude so the two can never drift apart.
+LOCATION_EXPRESSION = (
+    "(ST_SetSRID(ST_MakePoint(longitude::double precision, latitude::double precision), 4326))"
+    "::geography"
+)
 
 
 class Place(Base):
@@ -37,6 +46,7 @@ class Place(Base):
         Index("ix_places_external_id", "external_id"),
         Index("ix_places_city", "city"),
         Index("ix_places_category", "category"),
+        Index("idx_places_location_geog", "location", postgresql_using="gist"),
     )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
@@ -50,6 +60,9 @@ class Place(Base):
     country = Column(String(100), nullable=True)
     latitude = Column(Numeric(10, 8), nullable=False)
     longitude = Column(Numeric(11, 8), nullable=False)
+    location = deferred(
+        Column(Geography("Point", 4326), Computed(LOCATION_EXPRESSION, persisted=True))
+    )
     rating = Column(Numeric(2, 1), nullable=True)
     price_level = Column(Integer, nullable=True)
     phone = Column(String(50), nullable=True)
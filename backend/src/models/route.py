@@ -56,6 +56,9 @@ class Route(Base):
     estimated_cost = Column(Integer, nullable=True)
     route_polyline = Column(Text, nullable=True)
     instructions = Column(JSONB, nullable=True)
+    route_summary = Column(String(255), nullable=True)
+    # Set when polyline/distance/duration/instructions were written back from Mapbox
+    geometry_synced_at = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(
         DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False
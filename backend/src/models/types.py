@@ -0,0 +1,20 @@
+"""
+Custom column types shared by the models
+"""
+
+from __future__ import annotations
+
+from sqlalchemy.types import UserDefinedType
+
+
+class Geography(UserDefinedType):
+    """PostGIS ``geography`` column (values are exchanged as EWKB hex strings)"""
+
+    cache_ok = True
+
+    def __init__(self, geometry_type: str = "Point", srid: int = 4326) -> None:
+        self.geometry_type = geometry_type
+        self.srid = srid
+
+    def get_col_spec(self, **_kw) -> str:
+        return f"geography({self.geometry_type},{self.srid})"
@@ -5,6 +5,7 @@ Schemas for map export responses.
 from __future__ import annotations
 
 from datetime import date
+from typing import Literal
 from uuid import UUID
 
 from pydantic import BaseModel, Field
@@ -50,6 +51,8 @@ class MapRoute(BaseModel):
     distance_meters: int | None = Field(default=None, ge=0)
     duration_minutes: int | None = Field(default=None, ge=0)
     polyline: str
+    # Coarser encodings keyed by the lowest zoom they are drawn at; use `polyline` above them.
+    polyline_zooms: dict[int, str] = Field(default_factory=dict)
     summary: str | None = None
     steps: list[MapRouteStep] = Field(default_factory=list)
 
@@ -91,3 +94,20 @@ class MapExportResponse(BaseModel):
     plan: MapExportPlan
     bounds: MapBounds
     days: list[MapDay]
+
+
+class MapExportStreamChunk(BaseModel):
+    """Single NDJSON line emitted by the streamed map export.
+
+    The first line (``kind="plan"``) carries the plan summary, overall bounds and
+    the day numbers to expect; each ``day`` line follows as soon as that day is
+    ready, not necessarily in day order.
+    """
+
+    kind: Literal["plan", "day", "error"]
+    version: str
+    plan: MapExportPlan | None = None
+    bounds: MapBounds | None = None
+    day_numbers: list[int] = Field(default_factory=list)
+    day: MapDay | None = None
+    error: str | None = None
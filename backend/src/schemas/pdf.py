@@ -5,8 +5,13 @@ Schemas for PDF export responses.
 from __future__ import annotations
 
 from datetime import datetime
+from typing import Literal
+from uuid import UUID
+
 from pydantic import BaseModel
 
+PdfExportJobStatus = Literal["queued", "rendering", "uploading", "done", "failed"]
+
 
 class PdfExportResponse(BaseModel):
     """Metadata returned to the client after generating a PDF export."""
@@ -15,3 +20,16 @@ class PdfExportResponse(BaseModel):
     download_url: str
     storage_path: str
     expires_at: datetime | None = None
+
+
+class PdfExportJobResponse(BaseModel):
+    """State of a background PDF export; download fields are set once ``status`` is ``done``."""
+
+    job_id: str
+    plan_id: UUID
+    status: PdfExportJobStatus
+    file_name: str | None = None
+    download_url: str | None = None
+    storage_path: str | None = None
+    expires_at: datetime | None = None
+    error: str | None = None
@@ -5,7 +5,7 @@ Recommendation response schemas
 from __future__ import annotations
 
 from datetime import date, datetime
-from typing import Any
+from typing import Any, Literal
 from uuid import UUID
 
 from pydantic import AnyUrl, BaseModel, Field
@@ -83,3 +83,13 @@ class AccommodationRecommendationsResponse(BaseModel):
     check_in: date | None = None
     check_out: date | None = None
     options: list[AccommodationOptionSchema] = Field(default_factory=list)
+
+
+class RecommendationStreamChunk(BaseModel):
+    """Single NDJSON line emitted by the combined recommendations stream"""
+
+    part: Literal["flights", "accommodations"]
+    success: bool
+    flights: FlightRecommendationsResponse | None = None
+    accommodations: AccommodationRecommendationsResponse | None = None
+    error: str | None = None
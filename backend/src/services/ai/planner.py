@@ -12,6 +12,7 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ...config.settings import settings
+from ...core.tasks import run_in_background
 from ...metrics.ai_pipeline import observe_request
 from ...models.daily_itinerary import DailyItinerary
 from ...models.itinerary_place import ItineraryPlace
@@ -23,6 +24,8 @@ from ...schemas.place import ItineraryPlaceSummary, PlaceCreate
 from ...schemas.travel_plan import BudgetBreakdown, TravelPlanCreate, TravelPlanResponse
 from ...schemas.itinerary import DailyItineraryResponse, RouteResponse
 from ..places.recommender import PlacesRecommender
+from ..exports.precompute import schedule_map_export_precompute
+from ..recommendations.prefetch import schedule_recommendation_prefetch
 from .budget_allocator import BudgetAllocator, BudgetAllocationResult
 from .cache import AIResponseCache, cache
 from .preference_analyzer import AnalyzedPreferences, PreferenceAnalyzer
@@ -47,7 +50,7 @@ class TravelPlanner:
         self.preference_analyzer = PreferenceAnalyzer()
         self.budget_allocator = BudgetAllocator()
         self.timeline_generator = TimelineGenerator()
-        self.recommender = PlacesRecommender()
+        self.recommender = PlacesRecommender(session)
 
     async def _load_user_preference(self, user_id: UUID) -> UserPreference | None:
         result = await self.session.execute(
@@ -278,6 +281,19 @@ class TravelPlanner:
                 plan.user_id,
                 plan.generation_time_seconds,
             )
+
+        # Broker calls can stall on connect retries; keep them off the response path.
+        timeout = settings.BACKGROUND_ENQUEUE_TIMEOUT
+        run_in_background(
+            schedule_recommendation_prefetch(plan.id),
+            timeout=timeout,
+            name=f"recommendation-prefetch:{plan.id}",
+        )
+        run_in_background(
+            schedule_map_export_precompute(plan.id),
+            timeout=timeout,
+            name=f"map-export-precompute:{plan.id}",
+        )
         return plan
 
     async def build_response(self, plan: TravelPlan) -> TravelPlanResponse:
@@ -1,5 +1,15 @@
 """Exports services package."""
 
+from .formats import EXPORT_WRITERS, ExportFormat, PlanSnapshot, export_file_name, snapshot_plan
 from .map_exporter import MapExportService, MapExportError, MapExportNotFoundError
 
-__all__ = ["MapExportService", "MapExportError", "MapExportNotFoundError"]
+__all__ = [
+    "EXPORT_WRITERS",
+    "ExportFormat",
+    "MapExportService",
+    "MapExportError",
+    "MapExportNotFoundError",
+    "PlanSnapshot",
+    "export_file_name",
+    "snapshot_plan",
+]
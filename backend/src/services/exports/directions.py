@@ -0,0 +1,178 @@
+"""
+Cached access to Mapbox directions
+
+Routes between the same coordinates rarely change, and seeded places are shared
+across plans, so directions are cached under a key built from the routing
+profile, language and coordinates rounded to 5 decimals (~1 m). Payloads keep
+the encoded polyline, distance, duration and steps; they are held in a
+process-local LRU in front of a long-lived Redis entry.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Any, Sequence
+
+from ...config.settings import settings
+from ...core.cache import cache_directions, get_cached_directions
+from ...core.geo_utils import Coordinate, decode_polyline, encode_polyline
+from ...core.rate_limit import TokenBucket
+from ...integrations.mapbox import MapboxClient, MapboxLeg, MapboxRoute, MapboxStep
+from ...metrics.ai_pipeline import record_directions_cache
+
+logger = logging.getLogger(__name__)
+
+
+def directions_cache_key(
+    coordinates: Sequence[Coordinate],
+    profile: str,
+    language: str,
+    steps: bool,
+) -> str:
+    """Stable key for a directions request; coordinates are rounded to 5 decimals."""
+    path = ";".join(f"{lat:.5f},{lng:.5f}" for lat, lng in coordinates)
+    raw = f"{profile}|{language}|{int(steps)}|{path}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _steps_to_payload(steps: Sequence[MapboxStep]) -> list[dict[str, Any]]:
+    return [
+        {
+            "instruction": step.instruction,
+            "distance_meters": step.distance_meters,
+            "duration_seconds": step.duration_seconds,
+        }
+        for step in steps
+    ]
+
+
+def route_to_payload(route: MapboxRoute) -> dict[str, Any]:
+    return {
+        "polyline": encode_polyline(route.coordinates),
+        "distance_meters": route.distance_meters,
+        "duration_seconds": route.duration_seconds,
+        "summary": route.summary,
+        "steps": _steps_to_payload(route.steps),
+        "legs": [
+            {
+                "polyline": encode_polyline(leg.coordinates),
+                "distance_meters": leg.distance_meters,
+                "duration_seconds": leg.duration_seconds,
+                "summary": leg.summary,
+                "steps": _steps_to_payload(leg.steps),
+            }
+            for leg in route.legs
+        ],
+    }
+
+
+def route_from_payload(payload: dict[str, Any]) -> MapboxRoute:
+    return MapboxRoute(
+        distance_meters=float(payload["distance_meters"]),
+        duration_seconds=float(payload["duration_seconds"]),
+        coordinates=decode_polyline(payload["polyline"]),
+        summary=payload.get("summary"),
+        steps=[MapboxStep(**step) for step in payload.get("steps") or []],
+        legs=[
+            MapboxLeg(
+                distance_meters=float(leg["distance_meters"]),
+                duration_seconds=float(leg["duration_seconds"]),
+                coordinates=decode_polyline(leg["polyline"]),
+                summary=leg.get("summary"),
+                steps=[MapboxStep(**step) for step in leg.get("steps") or []],
+            )
+            for leg in payload.get("legs") or []
+        ],
+    )
+
+
+class _LRU:
+    """Minimal ordered-dict LRU; access happens on the event loop thread only."""
+
+    def __init__(self, maxsize: int) -> None:
+        self._maxsize = maxsize
+        self._items: OrderedDict[str, MapboxRoute] = OrderedDict()
+
+    def get(self, key: str) -> MapboxRoute | None:
+        route = self._items.get(key)
+        if route is not None:
+            self._items.move_to_end(key)
+        return route
+
+    def put(self, key: str, route: MapboxRoute) -> None:
+        self._items[key] = route
+        self._items.move_to_end(key)
+        while len(self._items) > self._maxsize:
+            self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        self._items.clear()
+
+
+_local_cache = _LRU(settings.DIRECTIONS_LOCAL_CACHE_SIZE)
+
+# Mapbox quotas are per access token, so every export in the process shares one bucket.
+_rate_limiter = TokenBucket(
+    settings.MAPBOX_DIRECTIONS_RATE_PER_SECOND,
+    settings.MAPBOX_DIRECTIONS_BURST,
+)
+
+
+class CachedDirectionsClient:
+    """Drop-in wrapper around :class:`MapboxClient` that caches ``get_directions``."""
+
+    def __init__(
+        self,
+        client: MapboxClient,
+        *,
+        local_cache: _LRU | None = None,
+        rate_limiter: TokenBucket | None = None,
+        remote_cache: bool = True,
+    ) -> None:
+        self._client = client
+        self._local = local_cache if local_cache is not None else _local_cache
+        self._rate_limiter = rate_limiter if rate_limiter is not None else _rate_limiter
+        self._remote_cache = remote_cache
+
+    async def get_directions(
+        self,
+        coordinates: Sequence[Coordinate],
+        profile: str = "driving",
+        *,
+        language: str = "ko",
+        steps: bool = True,
+    ) -> MapboxRoute:
+        key = directions_cache_key(coordinates, profile, language, steps)
+
+        route = self._local.get(key)
+        if route is not None:
+            record_directions_cache("local")
+            return route
+
+        payload = None
+        if self._remote_cache:
+            try:
+                payload = await get_cached_directions(key)
+            except Exception as exc:
+                logger.debug("Directions cache unavailable: %s", exc)
+        if payload is not None:
+            route = route_from_payload(payload)
+            self._local.put(key, route)
+            record_directions_cache("redis")
+            return route
+
+        record_directions_cache("miss")
+        # Only upstream calls count against the quota; cache hits never wait.
+        await self._rate_limiter.acquire()
+        route = await self._client.get_directions(
+            coordinates, profile=profile, language=language, steps=steps
+        )
+        self._local.put(key, route)
+        if self._remote_cache:
+            try:
+                await cache_directions(key, route_to_payload(route))
+            except Exception as exc:
+                logger.debug("Failed to store directions in cache: %s", exc)
+        return route
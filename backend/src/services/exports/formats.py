@@ -0,0 +1,330 @@
+"""
+Browser-free itinerary exports: ICS calendar, GPX, KML and standalone HTML
+
+All formats are produced from one ``PlanSnapshot``, a plain-data copy of a
+loaded plan, so nothing touches the database while a response streams. Every
+writer is a generator of text chunks (roughly one per event, waypoint, route
+or day) meant to be passed straight to a ``StreamingResponse``:
+
+* ICS: one ``VEVENT`` per visit that has a ``visit_time``; times are floating
+  local times, shown at the destination's wall-clock time on any device
+* GPX/KML: a waypoint per visit and a track per day built from the stored
+  route polylines, falling back to straight lines between stops
+* HTML: a single self-contained document (inline CSS, no external assets)
+
+None of this launches Chromium or calls Mapbox, so an export costs a few
+milliseconds instead of a full PDF render.
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Iterator, Literal
+from xml.sax.saxutils import escape
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+from ...core.geo_utils import Coordinate, decode_polyline
+from ...models.place import Place
+from ...models.route import Route
+from ...models.travel_plan import TravelPlan
+from .route_geometry import is_geometry_fresh
+
+ExportFormat = Literal["ics", "gpx", "kml", "html"]
+
+DEFAULT_VISIT_MINUTES = 60
+_ICS_LINE_OCTETS = 75
+_PRODUCT_ID = "-//TravelTailor//Itinerary Export//KO"
+
+_env = Environment(
+    loader=FileSystemLoader(Path(__file__).resolve().parent / "templates"),
+    autoescape=select_autoescape(["html"]),
+    auto_reload=False,
+)
+_html_template = _env.get_template("itinerary.html")
+
+
+@dataclass(frozen=True, slots=True)
+class VisitSnapshot:
+    id: str
+    order: int
+    name: str
+    category: str | None
+    address: str | None
+    description: str | None
+    coordinate: Coordinate | None
+    visit_time: dt.time | None
+    duration_minutes: int | None
+
+
+@dataclass(frozen=True, slots=True)
+class RouteSnapshot:
+    from_name: str
+    to_name: str
+    transport_mode: str
+    coordinates: tuple[Coordinate, ...]
+    distance_meters: int | None
+    duration_minutes: int | None
+
+
+@dataclass(frozen=True, slots=True)
+class DaySnapshot:
+    day_number: int
+    date: dt.date
+    theme: str | None
+    visits: tuple[VisitSnapshot, ...]
+    routes: tuple[RouteSnapshot, ...]
+
+
+@dataclass(frozen=True, slots=True)
+class PlanSnapshot:
+    """Everything the exports need, detached from the ORM session"""
+
+    id: str
+    title: str
+    destination: str
+    country: str
+    start_date: dt.date
+    end_date: dt.date
+    days: tuple[DaySnapshot, ...]
+    generated_at: dt.datetime = field(default_factory=lambda: dt.datetime.now(dt.timezone.utc))
+
+
+def _coordinate(place: Place | None) -> Coordinate | None:
+    if place is None or place.latitude is None or place.longitude is None:
+        return None
+    return (float(place.latitude), float(place.longitude))
+
+
+def _route_coordinates(route: Route) -> tuple[Coordinate, ...]:
+    if is_geometry_fresh(route):
+        return tuple(decode_polyline(route.route_polyline))
+    endpoints = [_coordinate(route.from_place), _coordinate(route.to_place)]
+    return tuple(point for point in endpoints if point is not None)
+
+
+def snapshot_plan(plan: TravelPlan) -> PlanSnapshot:
+    """Copy a plan loaded with days, visits, places and routes into plain data."""
+    days = []
+    for daily in sorted(plan.daily_itineraries, key=lambda item: item.day_number):
+        visits = tuple(
+            VisitSnapshot(
+                id=str(visit.id),
+                order=visit.visit_order,
+                name=visit.place.name if visit.place else "장소",
+                category=visit.place.category if visit.place else None,
+                address=visit.place.address if visit.place else None,
+                description=(visit.place.description if visit.place else None)
+                or visit.ai_recommendation_reason,
+                coordinate=_coordinate(visit.place),
+                visit_time=visit.visit_time,
+                duration_minutes=visit.duration_minutes,
+            )
+            for visit in sorted(daily.itinerary_places, key=lambda item: item.visit_order)
+        )
+        routes = tuple(
+            RouteSnapshot(
+                from_name=route.from_place.name if route.from_place else "출발",
+                to_name=route.to_place.name if route.to_place else "도착",
+                transport_mode=route.transport_mode,
+                coordinates=_route_coordinates(route),
+                distance_meters=route.distance_meters,
+                duration_minutes=route.duration_minutes,
+            )
+            for route in sorted(daily.routes, key=lambda item: item.from_order)
+        )
+        days.append(
+            DaySnapshot(
+                day_number=daily.day_number,
+                date=daily.date,
+                theme=daily.theme,
+                visits=visits,
+                routes=routes,
+            )
+        )
+    return PlanSnapshot(
+        id=str(plan.id),
+        title=plan.title,
+        destination=plan.destination,
+        country=plan.country,
+        start_date=plan.start_date,
+        end_date=plan.end_date,
+        days=tuple(days),
+    )
+
+
+# ----------------------------------------------------------------------------
+# ICS (RFC 5545)
+# ----------------------------------------------------------------------------
+
+
+def _ics_text(value: str) -> str:
+    return (
+        value.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def _ics_line(name: str, value: str) -> str:
+    """Content line folded at 75 octets without splitting UTF-8 sequences."""
+    line = f"{name}:{value}"
+    encoded = line.encode("utf-8")
+    if len(encoded) <= _ICS_LINE_OCTETS:
+        return line + "\r\n"
+    parts: list[str] = []
+    current, size, limit = [], 0, _ICS_LINE_OCTETS
+    for char in line:
+        width = len(char.encode("utf-8"))
+        if size + width > limit:
+            parts.append("".join(current))
+            current, size, limit = [], 0, _ICS_LINE_OCTETS - 1  # continuation lines start with a space
+        current.append(char)
+        size += width
+    parts.append("".join(current))
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def _ics_local(value: dt.datetime) -> str:
+    return value.strftime("%Y%m%dT%H%M%S")
+
+
+def iter_ics(snapshot: PlanSnapshot) -> Iterator[str]:
+    stamp = snapshot.generated_at.astimezone(dt.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    yield (
+        _ics_line("BEGIN", "VCALENDAR")
+        + _ics_line("VERSION", "2.0")
+        + _ics_line("PRODID", _PRODUCT_ID)
+        + _ics_line("CALSCALE", "GREGORIAN")
+        + _ics_line("X-WR-CALNAME", _ics_text(snapshot.title))
+    )
+    for day in snapshot.days:
+        for visit in day.visits:
+            if visit.visit_time is None:
+                continue
+            start = dt.datetime.combine(day.date, visit.visit_time)
+            end = start + dt.timedelta(minutes=visit.duration_minutes or DEFAULT_VISIT_MINUTES)
+            lines = [
+                _ics_line("BEGIN", "VEVENT"),
+                _ics_line("UID", f"{visit.id}@traveltailor.app"),
+                _ics_line("DTSTAMP", stamp),
+                _ics_line("DTSTART", _ics_local(start)),
+                _ics_line("DTEND", _ics_local(end)),
+                _ics_line("SUMMARY", _ics_text(visit.name)),
+            ]
+            if visit.address:
+                lines.append(_ics_line("LOCATION", _ics_text(visit.address)))
+            if visit.coordinate:
+                lines.append(_ics_line("GEO", f"{visit.coordinate[0]:.6f};{visit.coordinate[1]:.6f}"))
+            description = f"Day {day.day_number}" + (f" · {day.theme}" if day.theme else "")
+            if visit.description:
+                description += f"\n{visit.description}"
+            lines.append(_ics_line("DESCRIPTION", _ics_text(description)))
+            if visit.category:
+                lines.append(_ics_line("CATEGORIES", _ics_text(visit.category)))
+            lines.append(_ics_line("END", "VEVENT"))
+            yield "".join(lines)
+    yield _ics_line("END", "VCALENDAR")
+
+
+# ----------------------------------------------------------------------------
+# GPX 1.1 and KML 2.2
+# ----------------------------------------------------------------------------
+
+
+def _day_label(day: DaySnapshot) -> str:
+    return f"Day {day.day_number} · {day.date.isoformat()}" + (f" · {day.theme}" if day.theme else "")
+
+
+def iter_gpx(snapshot: PlanSnapshot) -> Iterator[str]:
+    yield (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<gpx version="1.1" creator="TravelTailor" xmlns="http://www.topografix.com/GPX/1/1">\n'
+        f"  <metadata><name>{escape(snapshot.title)}</name></metadata>\n"
+    )
+    for day in snapshot.days:
+        for visit in day.visits:
+            if visit.coordinate is None:
+                continue
+            lat, lng = visit.coordinate
+            yield (
+                f'  <wpt lat="{lat:.6f}" lon="{lng:.6f}"><name>{escape(visit.name)}</name>'
+                f"<desc>{escape(_day_label(day))} #{visit.order}</desc></wpt>\n"
+            )
+    for day in snapshot.days:
+        segments = [route for route in day.routes if len(route.coordinates) > 1]
+        if not segments:
+            continue
+        chunk = [f"  <trk><name>{escape(_day_label(day))}</name>\n"]
+        for route in segments:
+            chunk.append("    <trkseg>")
+            chunk.extend(f'<trkpt lat="{lat:.6f}" lon="{lng:.6f}"/>' for lat, lng in route.coordinates)
+            chunk.append("</trkseg>\n")
+        chunk.append("  </trk>\n")
+        yield "".join(chunk)
+    yield "</gpx>\n"
+
+
+def iter_kml(snapshot: PlanSnapshot) -> Iterator[str]:
+    yield (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<kml xmlns="http://www.opengis.net/kml/2.2"><Document>\n'
+        f"  <name>{escape(snapshot.title)}</name>\n"
+    )
+    for day in snapshot.days:
+        chunk = [f"  <Folder><name>{escape(_day_label(day))}</name>\n"]
+        for visit in day.visits:
+            if visit.coordinate is None:
+                continue
+            lat, lng = visit.coordinate
+            chunk.append(
+                f"    <Placemark><name>{escape(f'#{visit.order} {visit.name}')}</name>"
+                f"<Point><coordinates>{lng:.6f},{lat:.6f}</coordinates></Point></Placemark>\n"
+            )
+        for route in day.routes:
+            if len(route.coordinates) < 2:
+                continue
+            coordinates = " ".join(f"{lng:.6f},{lat:.6f}" for lat, lng in route.coordinates)
+            chunk.append(
+                f"    <Placemark><name>{escape(f'{route.from_name} → {route.to_name}')}</name>"
+                f"<LineString><tessellate>1</tessellate><coordinates>{coordinates}</coordinates>"
+                "</LineString></Placemark>\n"
+            )
+        chunk.append("  </Folder>\n")
+        yield "".join(chunk)
+    yield "</Document></kml>\n"
+
+
+# ----------------------------------------------------------------------------
+# HTML
+# ----------------------------------------------------------------------------
+
+
+def iter_html(snapshot: PlanSnapshot) -> Iterator[str]:
+    # Jinja's generate() yields template chunks as they are produced.
+    return _html_template.generate(plan=snapshot)
+
+
+@dataclass(frozen=True, slots=True)
+class ExportWriter:
+    media_type: str
+    extension: str
+    write: Callable[[PlanSnapshot], Iterator[str]]
+
+
+EXPORT_WRITERS: dict[str, ExportWriter] = {
+    "ics": ExportWriter("text/calendar; charset=utf-8", "ics", iter_ics),
+    "gpx": ExportWriter("application/gpx+xml", "gpx", iter_gpx),
+    "kml": ExportWriter("application/vnd.google-earth.kml+xml", "kml", iter_kml),
+    "html": ExportWriter("text/html; charset=utf-8", "html", iter_html),
+}
+
+
+def export_file_name(snapshot: PlanSnapshot, export_format: ExportFormat) -> str:
+    extension = EXPORT_WRITERS[export_format].extension
+    return f"traveltailor-{snapshot.start_date.isoformat()}-{snapshot.id[:8]}.{extension}"
+
@@ -4,9 +4,12 @@ Utilities for constructing map export payloads.
 
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import logging
 import math
 from collections import Counter
-from typing import Sequence, cast
+from typing import AsyncIterator, Sequence, cast
 from uuid import UUID
 from urllib.parse import quote
 
@@ -14,14 +17,23 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
+from ...config.settings import settings
+from ...core.cache import cache_map_export_day, get_cached_map_export_day
 from ...core.geo_utils import (
+    Coordinate,
     calculate_bounds,
+    decode_polyline,
     encode_polyline,
+    encode_zoom_variants,
     haversine_distance_meters,
+    simplify_douglas_peucker,
 )
 from ...integrations.mapbox import (
+    MAX_DIRECTIONS_COORDINATES,
     MapboxClient,
     MapboxError,
+    MapboxLeg,
+    MapboxRoute,
     get_mapbox_client,
 )
 from ...models.daily_itinerary import DailyItinerary
@@ -36,12 +48,21 @@ from ...schemas.exports import (
     MapExportLinks,
     MapExportPlan,
     MapExportResponse,
+    MapExportStreamChunk,
     MapLink,
     MapMarker,
     MapRoute,
     MapRouteStep,
 )
 from ...schemas.itinerary import TransportMode
+from .directions import CachedDirectionsClient
+from .route_geometry import is_geometry_fresh, stored_steps, write_back_geometry
+
+logger = logging.getLogger(__name__)
+
+# Bump when the stored MapDay payload changes shape (e.g. polyline_zooms), so days
+# precomputed by an earlier deploy are not served.
+MAP_EXPORT_SCHEMA_VERSION = 2
 
 
 class MapExportError(Exception):
@@ -77,56 +98,265 @@ KakaoTravelModes = {
 }
 
 
+def _profile(route: Route) -> str:
+    return TransportProfile.get(route.transport_mode, "driving")
+
+
+def _coordinate(place) -> tuple[float, float]:
+    return (float(place.latitude), float(place.longitude))
+
+
+def _compact_geometry(coordinates: Sequence[Coordinate]) -> tuple[str, dict[int, str]]:
+    """Simplified polyline plus coarser per-zoom variants for the export payload.
+
+    Full-resolution geometry stays on the route row; clients only need what is
+    visible at map zoom levels.
+    """
+    simplified = simplify_douglas_peucker(coordinates, settings.MAP_EXPORT_POLYLINE_TOLERANCE_METERS)
+    polyline = encode_polyline(simplified)
+    variants = {
+        zoom: encoded
+        for zoom, encoded in encode_zoom_variants(simplified, settings.MAP_EXPORT_POLYLINE_ZOOMS).items()
+        if encoded != polyline
+    }
+    return polyline, variants
+
+
+def _leg_route(leg: MapboxLeg, route: Route) -> MapboxRoute:
+    """Wrap one leg of a multi-waypoint response as a standalone route."""
+    coordinates = leg.coordinates or [_coordinate(route.from_place), _coordinate(route.to_place)]
+    return MapboxRoute(
+        distance_meters=leg.distance_meters,
+        duration_seconds=leg.duration_seconds,
+        coordinates=coordinates,
+        summary=leg.summary,
+        steps=leg.steps,
+    )
+
+
+def plan_version(plan: TravelPlan) -> str:
+    """Fingerprint of the plan content a map export is derived from.
+
+    Route geometry, distance and duration are outputs of the export (written back
+    from Mapbox), so only the legs' endpoints, order and transport mode count.
+    The payload schema version and the settings that shape the output are
+    included so a deploy or settings change does not serve stale stored days.
+    """
+    digest = hashlib.sha1()
+
+    def feed(*values: object) -> None:
+        digest.update("|".join("" if value is None else str(value) for value in values).encode())
+        digest.update(b"\n")
+
+    feed(
+        "schema",
+        MAP_EXPORT_SCHEMA_VERSION,
+        settings.MAP_EXPORT_DIRECTIONS_MODE,
+        settings.MAP_EXPORT_POLYLINE_TOLERANCE_METERS,
+        ",".join(str(zoom) for zoom in settings.MAP_EXPORT_POLYLINE_ZOOMS),
+    )
+    feed(plan.id, plan.title, plan.destination, plan.start_date, plan.end_date)
+    for daily in sorted(plan.daily_itineraries, key=lambda d: d.day_number):
+        feed("day", daily.day_number, daily.date, daily.theme)
+        for visit in sorted(daily.itinerary_places, key=lambda item: item.visit_order):
+            place = visit.place
+            feed(
+                "visit",
+                visit.id,
+                visit.place_id,
+                visit.visit_order,
+                visit.visit_time,
+                place.name,
+                place.latitude,
+                place.longitude,
+                place.category,
+                place.address,
+            )
+        for route in sorted(daily.routes, key=lambda item: item.from_order):
+            feed(
+                "route",
+                route.id,
+                route.from_place_id,
+                route.to_place_id,
+                route.from_order,
+                route.to_order,
+                route.transport_mode,
+            )
+    return digest.hexdigest()[:16]
+
+
 class MapExportService:
     """Build map export responses for travel plans."""
 
-    def __init__(self, session: AsyncSession, mapbox_client: MapboxClient | None = None) -> None:
+    def __init__(
+        self,
+        session: AsyncSession,
+        mapbox_client: MapboxClient | None = None,
+        *,
+        remote_cache: bool = True,
+    ) -> None:
         self._session = session
-        if mapbox_client is not None:
-            self._mapbox = mapbox_client
-        else:
+        self._remote_cache = remote_cache
+        if mapbox_client is None:
             try:
-                self._mapbox = get_mapbox_client()
+                mapbox_client = get_mapbox_client()
             except Exception:
-                self._mapbox = None
+                mapbox_client = None
+        self._mapbox = CachedDirectionsClient(mapbox_client) if mapbox_client is not None else None
+        self._geometry_written = False
+        # Shared by every day of one export so per-day fetches keep the overall cap.
+        self._semaphore = asyncio.Semaphore(max(1, settings.MAPBOX_DIRECTIONS_CONCURRENCY))
 
     async def build_map_export(self, plan_id: UUID, user_id: UUID) -> MapExportResponse:
-        plan = await self._load_plan(plan_id, user_id)
+        plan = await self.load_plan(plan_id, user_id)
         if plan is None:
             raise MapExportNotFoundError("Travel plan not found.")
 
-        all_coordinates: list[tuple[float, float]] = []
-        day_payloads: list[MapDay] = []
-
-        for daily in sorted(plan.daily_itineraries, key=lambda d: d.day_number):
-            day = await self._build_day_payload(daily)
-            day_payloads.append(day)
-            for marker in day.markers:
-                all_coordinates.append((marker.latitude, marker.longitude))
-
+        header = self.build_header(plan)
+        days = [day async for day in self.iter_days(plan)]
+        days.sort(key=lambda day: day.day_number)
+        return MapExportResponse(plan=header.plan, bounds=header.bounds, days=days)
+
+    async def build_day(self, plan: TravelPlan, day_number: int) -> MapDay:
+        """Return one day of the export, served from the stored payload when possible."""
+        if not any(daily.day_number == day_number for daily in plan.daily_itineraries):
+            raise MapExportNotFoundError("Day not found in travel plan.")
+        # Drain the iterator so geometry write-back is committed.
+        days = [day async for day in self.iter_days(plan, [day_number])]
+        return days[0]
+
+    def build_header(self, plan: TravelPlan) -> MapExportStreamChunk:
+        """Plan summary and overall bounds, available before any directions are fetched."""
+        all_coordinates = [
+            _coordinate(visit.place)
+            for daily in plan.daily_itineraries
+            for visit in daily.itinerary_places
+        ]
         if not all_coordinates:
             raise MapExportError("Travel plan does not contain any locations to map.")
 
         sw, ne = calculate_bounds(all_coordinates)
-        bounds = MapBounds(
-            southwest=MapCoordinate(latitude=sw[0], longitude=sw[1]),
-            northeast=MapCoordinate(latitude=ne[0], longitude=ne[1]),
+        return MapExportStreamChunk(
+            kind="plan",
+            version=plan_version(plan),
+            plan=MapExportPlan(
+                id=plan.id,
+                title=plan.title,
+                destination=plan.destination,
+                start_date=plan.start_date,
+                end_date=plan.end_date,
+            ),
+            bounds=MapBounds(
+                southwest=MapCoordinate(latitude=sw[0], longitude=sw[1]),
+                northeast=MapCoordinate(latitude=ne[0], longitude=ne[1]),
+            ),
+            day_numbers=sorted(daily.day_number for daily in plan.daily_itineraries),
         )
 
-        plan_summary = MapExportPlan(
-            id=plan.id,
-            title=plan.title,
-            destination=plan.destination,
-            start_date=plan.start_date,
-            end_date=plan.end_date,
+    async def stream_export(
+        self,
+        plan: TravelPlan,
+        header: MapExportStreamChunk,
+    ) -> AsyncIterator[MapExportStreamChunk]:
+        """Yield the header, then each day as soon as it is stored or built."""
+        yield header
+        async for day in self.iter_days(plan):
+            yield MapExportStreamChunk(kind="day", version=header.version, day=day)
+
+    async def iter_days(
+        self,
+        plan: TravelPlan,
+        day_numbers: Sequence[int] | None = None,
+    ) -> AsyncIterator[MapDay]:
+        """Yield map days as they become ready.
+
+        Days already stored for the current plan version are yielded first; the
+        remaining days fetch directions concurrently and are yielded in completion
+        order. Days whose every leg resolved to real geometry are stored under the
+        plan version so later requests skip Mapbox entirely.
+        """
+        version = plan_version(plan)
+        dailies = sorted(
+            (
+                daily
+                for daily in plan.daily_itineraries
+                if day_numbers is None or daily.day_number in day_numbers
+            ),
+            key=lambda d: d.day_number,
         )
 
-        return MapExportResponse(plan=plan_summary, bounds=bounds, days=day_payloads)
-
-    async def _load_plan(self, plan_id: UUID, user_id: UUID) -> TravelPlan | None:
+        stored = await self._load_stored_days(plan.id, version, dailies)
+        pending: list[DailyItinerary] = []
+        for daily in dailies:
+            day = stored.get(daily.day_number)
+            if day is None:
+                pending.append(daily)
+            else:
+                yield day
+        if not pending:
+            return
+
+        tasks = {asyncio.create_task(self._fetch_directions([daily.routes])): daily for daily in pending}
+        try:
+            waiting = set(tasks)
+            while waiting:
+                done, waiting = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=lambda item: tasks[item].day_number):
+                    daily = tasks[task]
+                    directions = task.result() if task.exception() is None else {}
+                    complete = all(
+                        route.id in directions or is_geometry_fresh(route) for route in daily.routes
+                    )
+                    day = self._build_day_payload(daily, directions)
+                    if complete:
+                        await self._store_day(plan.id, version, day)
+                    yield day
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+        if self._geometry_written:
+            await self._session.commit()
+            self._geometry_written = False
+
+    async def _load_stored_days(
+        self,
+        plan_id: UUID,
+        version: str,
+        dailies: Sequence[DailyItinerary],
+    ) -> dict[int, MapDay]:
+        if not self._remote_cache or not dailies:
+            return {}
+        results = await asyncio.gather(
+            *(get_cached_map_export_day(str(plan_id), version, daily.day_number) for daily in dailies),
+            return_exceptions=True,
+        )
+        stored: dict[int, MapDay] = {}
+        for daily, result in zip(dailies, results, strict=True):
+            if isinstance(result, BaseException):
+                logger.debug("Stored map export lookup failed for plan %s: %s", plan_id, result)
+                continue
+            if result is not None:
+                try:
+                    stored[daily.day_number] = MapDay.model_validate(result)
+                except ValueError:
+                    logger.warning("Discarding malformed stored map export day for plan %s", plan_id)
+        return stored
+
+    async def _store_day(self, plan_id: UUID, version: str, day: MapDay) -> None:
+        if not self._remote_cache:
+            return
+        try:
+            await cache_map_export_day(str(plan_id), version, day.day_number, day.model_dump(mode="json"))
+        except Exception as exc:  # pragma: no cover - redis availability is environment specific
+            logger.debug("Failed to store map export day for plan %s: %s", plan_id, exc)
+
+    async def load_plan(self, plan_id: UUID, user_id: UUID | None = None) -> TravelPlan | None:
+        """Load a plan with everything the export needs; ``user_id=None`` skips the owner check."""
         stmt = (
             select(TravelPlan)
-            .where(TravelPlan.id == plan_id, TravelPlan.user_id == user_id)
+            .where(TravelPlan.id == plan_id)
             .options(
                 selectinload(TravelPlan.daily_itineraries)
                 .selectinload(DailyItinerary.itinerary_places)
@@ -139,12 +369,100 @@ class MapExportService:
                 .selectinload(Route.to_place),
             )
         )
+        if user_id is not None:
+            stmt = stmt.where(TravelPlan.user_id == user_id)
         result = await self._session.execute(stmt)
         return result.scalars().unique().one_or_none()
 
-    async def _build_day_payload(self, daily: DailyItinerary) -> MapDay:
+    def _direction_requests(self, day_routes: Sequence[Route]) -> list[list[Route]]:
+        """Group a day's legs into chains served by one directions request each.
+
+        In ``day`` mode consecutive legs sharing a routing profile and a common stop
+        form one chain of at most 24 legs (25 coordinates); ``leg`` mode keeps the
+        legacy one-request-per-leg behaviour.
+        """
+        ordered = sorted(
+            (route for route in day_routes if not is_geometry_fresh(route)),
+            key=lambda item: item.from_order,
+        )
+        if settings.MAP_EXPORT_DIRECTIONS_MODE != "day":
+            return [[route] for route in ordered]
+
+        max_legs = MAX_DIRECTIONS_COORDINATES - 1
+        chains: list[list[Route]] = []
+        for route in ordered:
+            chain = chains[-1] if chains else None
+            if (
+                chain is not None
+                and len(chain) < max_legs
+                and chain[-1].to_place_id == route.from_place_id
+                and _profile(chain[-1]) == _profile(route)
+            ):
+                chain.append(route)
+            else:
+                chains.append([route])
+        return chains
+
+    async def _fetch_directions(self, routes_by_day: Sequence[Sequence[Route]]) -> dict[UUID, MapboxRoute]:
+        """Fetch directions for every leg concurrently within the export deadline.
+
+        Legs with fresh stored geometry are skipped. Legs that fail or are still
+        pending when ``MAP_EXPORT_DEADLINE_SECONDS`` elapses are left out of the
+        result and fall back to straight-line estimates.
+        """
+        if self._mapbox is None:
+            return {}
+        chains = [chain for day in routes_by_day for chain in self._direction_requests(day)]
+        if not chains:
+            return {}
+
+        async def request(chain: Sequence[Route]) -> MapboxRoute:
+            coordinates = [_coordinate(chain[0].from_place)]
+            coordinates.extend(_coordinate(route.to_place) for route in chain)
+            async with self._semaphore:
+                return await self._mapbox.get_directions(coordinates, profile=_profile(chain[0]))
+
+        async def fetch(chain: Sequence[Route]) -> dict[UUID, MapboxRoute]:
+            try:
+                mapbox_route = await request(chain)
+                if len(chain) == 1:
+                    return {chain[0].id: mapbox_route}
+                if len(mapbox_route.legs) == len(chain):
+                    return {
+                        route.id: _leg_route(leg, route)
+                        for route, leg in zip(chain, mapbox_route.legs, strict=True)
+                    }
+            except (MapboxError, ValueError):
+                if len(chain) == 1:
+                    return {}
+            # One unroutable stop fails the whole chain; retry its legs one by one.
+            results = await asyncio.gather(*(fetch([route]) for route in chain))
+            return {route_id: route for result in results for route_id, route in result.items()}
+
+        tasks = [asyncio.create_task(fetch(chain)) for chain in chains]
+        done, pending = await asyncio.wait(tasks, timeout=settings.MAP_EXPORT_DEADLINE_SECONDS)
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.warning(
+                "Map export deadline reached; %d of %d direction requests use straight-line fallback",
+                len(pending),
+                len(tasks),
+            )
+
+        directions: dict[UUID, MapboxRoute] = {}
+        for task in done:
+            if task.exception() is None:
+                directions.update(task.result())
+        return directions
+
+    def _build_day_payload(
+        self,
+        daily: DailyItinerary,
+        directions: dict[UUID, MapboxRoute],
+    ) -> MapDay:
         markers = self._build_markers(daily)
-        routes, day_summary = await self._build_routes(daily, markers)
+        routes, day_summary = self._build_routes(daily, markers, directions)
         export_links = self._build_export_links(markers, routes)
         return MapDay(
             day_number=daily.day_number,
@@ -175,10 +493,11 @@ class MapExportService:
             )
         return markers
 
-    async def _build_routes(
+    def _build_routes(
         self,
         daily: DailyItinerary,
         markers: Sequence[MapMarker],
+        directions: dict[UUID, MapboxRoute],
     ) -> tuple[list[MapRoute], MapDaySummary]:
         marker_lookup = {marker.place_id: marker for marker in markers}
         routes: list[MapRoute] = []
@@ -186,7 +505,7 @@ class MapExportService:
         total_duration = 0
 
         for route in sorted(daily.routes, key=lambda item: item.from_order):
-            payload = await self._build_route_payload(route, marker_lookup)
+            payload = self._build_route_payload(route, directions.get(route.id))
             routes.append(payload)
             if payload.distance_meters is not None:
                 total_distance += payload.distance_meters
@@ -202,43 +521,42 @@ class MapExportService:
 
         return routes, MapDaySummary(total_distance_meters=total_distance, total_duration_minutes=total_duration)
 
-    async def _build_route_payload(
+    def _build_route_payload(
         self,
         route: Route,
-        markers: dict[UUID, MapMarker],
+        mapbox_route: MapboxRoute | None,
     ) -> MapRoute:
+        if mapbox_route is None and is_geometry_fresh(route):
+            return self._stored_route_payload(route)
+
         start = route.from_place
         end = route.to_place
         start_coord = (float(start.latitude), float(start.longitude))
         end_coord = (float(end.latitude), float(end.longitude))
 
         polyline = encode_polyline((start_coord, end_coord))
+        polyline_zooms: dict[int, str] = {}
         steps: list[MapRouteStep] = []
         distance = route.distance_meters
         duration = route.duration_minutes
         summary: str | None = None
 
-        if self._mapbox is not None:
-            profile = TransportProfile.get(route.transport_mode, "driving")
-            try:
-                mapbox_route = await self._mapbox.get_directions(
-                    (start_coord, end_coord),
-                    profile=profile,
+        if mapbox_route is not None:
+            polyline, polyline_zooms = _compact_geometry(mapbox_route.coordinates)
+            steps = [
+                MapRouteStep(
+                    instruction=step.instruction,
+                    distance_meters=step.distance_meters,
+                    duration_seconds=step.duration_seconds,
                 )
-                polyline = encode_polyline(mapbox_route.coordinates)
-                steps = [
-                    MapRouteStep(
-                        instruction=step.instruction,
-                        distance_meters=step.distance_meters,
-                        duration_seconds=step.duration_seconds,
-                    )
-                    for step in mapbox_route.steps
-                ]
-                distance = int(round(mapbox_route.distance_meters))
-                duration = int(math.ceil(mapbox_route.duration_seconds / 60)) or 1
-                summary = mapbox_route.summary
-            except (MapboxError, ValueError):
-                pass
+                for step in mapbox_route.steps
+            ]
+            distance = int(round(mapbox_route.distance_meters))
+            duration = int(math.ceil(mapbox_route.duration_seconds / 60)) or 1
+            summary = mapbox_route.summary
+            if settings.ROUTE_GEOMETRY_WRITE_BACK:
+                write_back_geometry(route, mapbox_route)
+                self._geometry_written = True
 
         if distance is None:
             distance = int(
@@ -262,10 +580,35 @@ class MapExportService:
             distance_meters=distance,
             duration_minutes=duration,
             polyline=polyline,
+            polyline_zooms=polyline_zooms,
             summary=summary,
             steps=steps,
         )
 
+    def _stored_route_payload(self, route: Route) -> MapRoute:
+        polyline, polyline_zooms = _compact_geometry(decode_polyline(route.route_polyline))
+        return MapRoute(
+            id=route.id,
+            from_place_id=route.from_place_id,
+            to_place_id=route.to_place_id,
+            from_order=route.from_order,
+            to_order=route.to_order,
+            transport_mode=cast("TransportMode", route.transport_mode),
+            distance_meters=route.distance_meters,
+            duration_minutes=route.duration_minutes,
+            polyline=polyline,
+            polyline_zooms=polyline_zooms,
+            summary=route.route_summary,
+            steps=[
+                MapRouteStep(
+                    instruction=step["instruction"],
+                    distance_meters=float(step.get("distance_meters") or 0),
+                    duration_seconds=float(step.get("duration_seconds") or 0),
+                )
+                for step in stored_steps(route)
+            ],
+        )
+
     def _build_export_links(
         self,
         markers: Sequence[MapMarker],
@@ -0,0 +1,81 @@
+"""
+Background precomputation of map export payloads
+
+After a plan is generated a low-priority Celery job builds every day of its map
+export and stores the days under the current plan version, so the first map
+view is served from Redis instead of waiting on Mapbox. Days that fell back to
+straight lines are not stored and are retried on the next request.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from uuid import UUID
+
+from ...config.database import AsyncSessionLocal, engine
+from ...config.settings import settings
+from ...core.cache import close_redis_client
+from ...core.tasks import register_task
+from ...integrations.mapbox import MapboxClient
+from .map_exporter import MapExportService
+
+logger = logging.getLogger(__name__)
+
+PRECOMPUTE_TASK_NAME = "exports.map_precompute"
+
+
+async def precompute_map_export(plan_id: str) -> int:
+    """Celery entry point: build and store every day of a plan's map export.
+
+    Returns the number of days built. Stored days of the same plan version are
+    read back rather than rebuilt, so repeated runs are cheap.
+    """
+    # The process-wide client is bound to another event loop; use a private one.
+    try:
+        mapbox: MapboxClient | None = MapboxClient()
+    except ValueError:
+        mapbox = None
+    try:
+        async with AsyncSessionLocal() as session:
+            service = MapExportService(session, mapbox_client=mapbox)
+            plan = await service.load_plan(UUID(plan_id))
+            if plan is None:
+                logger.info("Skipping map export precompute for missing plan %s", plan_id)
+                return 0
+            return len([day async for day in service.iter_days(plan)])
+    finally:
+        if mapbox is not None:
+            await mapbox.close()
+        # Each Celery invocation runs on a fresh event loop; drop loop-bound connections.
+        await engine.dispose()
+        await close_redis_client()
+
+
+precompute_task = register_task(
+    precompute_map_export,
+    name=PRECOMPUTE_TASK_NAME,
+    queue=settings.MAP_EXPORT_PRECOMPUTE_QUEUE,
+    max_retries=1,
+    retry_backoff=60,
+)
+
+
+async def schedule_map_export_precompute(plan_id: UUID) -> bool:
+    """Enqueue map export precomputation for a freshly generated plan.
+
+    Never raises: precomputation is an optimisation and must not fail plan creation.
+    """
+    if not settings.MAP_EXPORT_PRECOMPUTE_ENABLED:
+        return False
+    try:
+        await asyncio.to_thread(
+            precompute_task.apply_async,
+            args=(str(plan_id),),
+            queue=settings.MAP_EXPORT_PRECOMPUTE_QUEUE,
+            retry=False,
+        )
+    except Exception as exc:  # pragma: no cover - broker availability is environment specific
+        logger.warning("Failed to enqueue map export precompute for plan %s: %s", plan_id, exc)
+        return False
+    return True
@@ -0,0 +1,78 @@
+"""
+Persisted route geometry
+
+The first map export writes the Mapbox result (polyline, distance, duration,
+steps, summary) back onto each ``Route``. Later map exports and PDF renders use
+the stored copy instead of calling Mapbox again. The copy is considered stale
+once it is older than ``ROUTE_GEOMETRY_MAX_AGE_DAYS`` or when either endpoint
+place was updated after it was stored.
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import math
+from typing import Any, Sequence
+
+from ...config.settings import settings
+from ...core.geo_utils import Coordinate, decode_polyline, encode_polyline
+from ...integrations.mapbox import MapboxRoute
+from ...models.route import Route
+
+
+def is_geometry_fresh(route: Route, *, now: dt.datetime | None = None) -> bool:
+    """Return True when the route carries Mapbox geometry that may be reused."""
+    synced_at = route.geometry_synced_at
+    if not route.route_polyline or synced_at is None:
+        return False
+
+    now = now or dt.datetime.now(dt.timezone.utc)
+    if now - synced_at > dt.timedelta(days=settings.ROUTE_GEOMETRY_MAX_AGE_DAYS):
+        return False
+
+    # A moved endpoint invalidates the stored path.
+    for place in (route.from_place, route.to_place):
+        updated_at = getattr(place, "updated_at", None)
+        if updated_at is not None and updated_at > synced_at:
+            return False
+    return True
+
+
+def stored_steps(route: Route) -> list[dict[str, Any]]:
+    """Return stored step dicts, skipping malformed entries."""
+    return [
+        item
+        for item in route.instructions or []
+        if isinstance(item, dict) and item.get("instruction") is not None
+    ]
+
+
+def stored_day_path(routes: Sequence[Route]) -> list[Coordinate] | None:
+    """Concatenate fresh stored polylines of ordered routes, or None if any is missing."""
+    if not routes:
+        return None
+    path: list[Coordinate] = []
+    for route in routes:
+        if not is_geometry_fresh(route):
+            return None
+        points = decode_polyline(route.route_polyline)
+        # Consecutive legs share their joint coordinate.
+        path.extend(points[1:] if path and points and points[0] == path[-1] else points)
+    return path
+
+
+def write_back_geometry(route: Route, mapbox_route: MapboxRoute) -> None:
+    """Copy a Mapbox directions result onto the route; the caller commits."""
+    route.route_polyline = encode_polyline(mapbox_route.coordinates)
+    route.distance_meters = int(round(mapbox_route.distance_meters))
+    route.duration_minutes = int(math.ceil(mapbox_route.duration_seconds / 60)) or 1
+    route.instructions = [
+        {
+            "instruction": step.instruction,
+            "distance_meters": step.distance_meters,
+            "duration_seconds": step.duration_seconds,
+        }
+        for step in mapbox_route.steps
+    ]
+    route.route_summary = mapbox_route.summary[:255] if mapbox_route.summary else None
+    route.geometry_synced_at = dt.datetime.now(dt.timezone.utc)
@@ -5,122 +5,48 @@ PDF rendering infrastructure backed by Playwright (Chromium / Puppeteer compatib
 from __future__ import annotations
 
 import asyncio
-from contextlib import asynccontextmanager
-from typing import AsyncIterator
-
-from playwright.async_api import (
-    Browser,
-    BrowserContext,
-    Page,
-    Playwright,
-    async_playwright,
-)
+from pathlib import Path
 
 from ...config.settings import settings
+from .offline import serve_local_assets
+from .pool import BrowserPool, PdfBrowserStartupError, PdfPoolTimeoutError, PdfRenderError
 
+__all__ = [
+    "BrowserPool",
+    "PdfBrowserStartupError",
+    "PdfPoolTimeoutError",
+    "PdfRenderError",
+    "PdfRenderer",
+    "get_pdf_renderer",
+    "shutdown_pdf_renderer",
+]
 
-class PdfRenderError(RuntimeError):
-    """Base error for PDF rendering operations."""
-
-
-class PdfBrowserStartupError(PdfRenderError):
-    """Raised when the headless browser could not be launched."""
-
-
-class _BrowserPool:
-    """Simple async pool that reuses Chromium browser instances."""
-
-    def __init__(self, size: int, launch_timeout: int) -> None:
-        self._size = max(1, size)
-        self._launch_timeout = launch_timeout * 1000  # Playwright expects milliseconds
-        self._playwright: Playwright | None = None
-        self._queue: asyncio.Queue[Browser] | None = None
-        self._start_lock = asyncio.Lock()
-        self._is_started = False
-
-    async def _ensure_started(self) -> None:
-        if self._is_started:
-            return
-        async with self._start_lock:
-            if self._is_started:
-                return
-            try:
-                self._playwright = await async_playwright().start()
-                self._queue = asyncio.Queue(maxsize=self._size)
-                for _ in range(self._size):
-                    browser = await self._playwright.chromium.launch(
-                        headless=True,
-                        timeout=self._launch_timeout,
-                        args=[
-                            "--no-sandbox",
-                            "--disable-setuid-sandbox",
-                            "--disable-dev-shm-usage",
-                            "--disable-gpu",
-                        ],
-                    )
-                    await self._queue.put(browser)
-                self._is_started = True
-            except Exception as exc:  # pragma: no cover - startup is environment specific
-                raise PdfBrowserStartupError("Failed to start headless browser for PDF rendering.") from exc
-
-    async def acquire(self) -> Browser:
-        await self._ensure_started()
-        if self._queue is None:
-            raise PdfBrowserStartupError("Browser pool not initialized.")
-        return await self._queue.get()
-
-    async def release(self, browser: Browser) -> None:
-        if self._queue is None:
-            # Pool was not initialized; close browser defensively.
-            await browser.close()
-            return
-        await self._queue.put(browser)
-
-    async def shutdown(self) -> None:
-        if not self._is_started:
-            return
-        if self._queue is not None:
-            while not self._queue.empty():
-                browser = await self._queue.get()
-                await browser.close()
-        if self._playwright is not None:
-            await self._playwright.stop()
-        self._is_started = False
-        self._queue = None
-        self._playwright = None
-
-    @asynccontextmanager
-    async def page(self) -> AsyncIterator[Page]:
-        browser = await self.acquire()
-        context: BrowserContext | None = None
-        try:
-            context = await browser.new_context(locale=settings.PDF_TEMPLATE_LOCALE or "en-US")
-            page = await context.new_page()
-            yield page
-        finally:
-            if context is not None:
-                await context.close()
-            await self.release(browser)
+_STYLES_PATH = Path(__file__).resolve().parent / "templates" / "styles.css"
 
 
 class PdfRenderer:
     """Render HTML content into PDF bytes."""
 
-    def __init__(self, pool: _BrowserPool) -> None:
+    def __init__(self, pool: BrowserPool) -> None:
         self._pool = pool
 
     async def render(  # noqa: PLR0913 - explicit parameters aid clarity
         self,
         html: str,
         *,
-        wait_until: str = "networkidle",
+        wait_until: str | None = None,
         prefer_css_page_size: bool = True,
         landscape: bool = False,
         format: str = "A4",
     ) -> bytes:
+        """Print ``html`` to PDF.
+
+        ``wait_until`` defaults to ``PDF_RENDER_WAIT_UNTIL``; ``load`` is enough when
+        external requests are blocked because nothing else can arrive later.
+        """
         try:
             async with self._pool.page() as page:
-                await page.set_content(html, wait_until=wait_until)
+                await page.set_content(html, wait_until=wait_until or settings.PDF_RENDER_WAIT_UNTIL)
                 pdf = await page.pdf(
                     format=format,
                     print_background=True,
@@ -133,12 +59,22 @@ class PdfRenderer:
                         "right": "15mm",
                     },
                 )
+        except PdfRenderError:
+            raise
         except Exception as exc:  # pragma: no cover - rendering depends on runtime browser
             raise PdfRenderError("Failed to render PDF from HTML content.") from exc
         return pdf
 
 
-_pool: _BrowserPool | None = None
+def _warmup_html() -> str | None:
+    """Empty document carrying the itinerary stylesheet, loaded into each warm page."""
+    if not _STYLES_PATH.exists():
+        return None
+    styles = _STYLES_PATH.read_text(encoding="utf-8")
+    return f"<!DOCTYPE html><html><head><style>{styles}</style></head><body></body></html>"
+
+
+_pool: BrowserPool | None = None
 _renderer: PdfRenderer | None = None
 _pool_lock = asyncio.Lock()
 
@@ -150,9 +86,19 @@ async def get_pdf_renderer() -> PdfRenderer:
         return _renderer
     async with _pool_lock:
         if _renderer is None:
-            timeout = max(5, settings.PDF_RENDER_TIMEOUT)
-            pool_size = max(1, settings.PDF_POOL_SIZE)
-            _pool = _BrowserPool(size=pool_size, launch_timeout=timeout)
+            _pool = BrowserPool(
+                min_size=settings.PDF_POOL_MIN_SIZE,
+                max_size=settings.PDF_POOL_SIZE,
+                launch_timeout=max(5, settings.PDF_RENDER_TIMEOUT),
+                acquire_timeout=settings.PDF_POOL_ACQUIRE_TIMEOUT,
+                max_renders=settings.PDF_BROWSER_MAX_RENDERS,
+                max_memory_mb=settings.PDF_BROWSER_MAX_MEMORY_MB,
+                idle_timeout=settings.PDF_POOL_IDLE_TIMEOUT,
+                health_interval=settings.PDF_POOL_HEALTH_INTERVAL,
+                locale=settings.PDF_TEMPLATE_LOCALE or "en-US",
+                warmup_html=_warmup_html(),
+                route_handler=serve_local_assets if settings.PDF_BLOCK_EXTERNAL_REQUESTS else None,
+            )
             _renderer = PdfRenderer(_pool)
     return _renderer
 
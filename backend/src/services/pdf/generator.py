@@ -5,30 +5,61 @@ Generate branded travel itinerary PDFs from persisted plan data.
 from __future__ import annotations
 
 import asyncio
-import base64
 import datetime as dt
+import hashlib
+import json
+import logging
 import re
-from dataclasses import dataclass
+import time
+from dataclasses import asdict, dataclass
 from enum import Enum
-from pathlib import Path
-from typing import Any, Sequence
+from typing import Any, Awaitable, Callable, Sequence
 from uuid import UUID
 
-from jinja2 import Environment, FileSystemLoader, select_autoescape
+from markupsafe import Markup
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from ...config.settings import settings
-from ...integrations.mapbox import MapboxError, MapboxStaticClient, get_mapbox_static_client
+from ...core.cache import cache_pdf_artifact, get_cached_pdf_artifact
+from ...integrations.mapbox import MapboxStaticClient
+from ...metrics.ai_pipeline import (
+    observe_pdf_render,
+    observe_pdf_upload,
+    record_pdf_artifact_cache,
+    record_pdf_day_pdf_cache,
+)
 from ...models.accommodation_option import AccommodationOption
 from ...models.daily_itinerary import DailyItinerary
 from ...models.flight_option import FlightOption
 from ...models.itinerary_place import ItineraryPlace
 from ...models.route import Route
 from ...models.travel_plan import TravelPlan
-from ...services.pdf import PdfRenderError, get_pdf_renderer
-from .storage import PdfStorageError, SupabasePdfStorage
+from ...services.exports.route_geometry import stored_day_path
+from ...services.pdf import PdfRenderer, PdfRenderError, get_pdf_renderer
+from .html import (
+    TEMPLATE_VERSION,
+    day_fragment_key,
+    day_fragments,
+    render_bookings,
+    render_cover,
+    render_day,
+    render_document,
+    render_part,
+)
+from .offline import find_external_references
+from .paged import day_pdfs, merge_pdfs
+from .static_maps import (
+    ImageVariant,
+    StaticMapFetcher,
+    StaticMapRequest,
+    build_static_map_cache,
+    get_static_map_fetcher,
+)
+from .storage import PdfStorage, PdfStorageError, StoredPdf, get_pdf_storage
+
+logger = logging.getLogger(__name__)
 
 
 class PdfGenerationError(RuntimeError):
@@ -49,28 +80,27 @@ class PdfGenerationResult:
     expires_at: dt.datetime | None
 
 
-TEMPLATES_DIR = Path(__file__).resolve().parent / "templates"
-ASSETS_DIR = Path(__file__).resolve().parent / "assets"
-
-_env = Environment(
-    loader=FileSystemLoader(TEMPLATES_DIR),
-    autoescape=select_autoescape(["html"]),
-    enable_async=False,
-)
-_template = _env.get_template("itinerary.html")
-_styles = (TEMPLATES_DIR / "styles.css").read_text(encoding="utf-8")
-
-
-def _load_logo_data_uri() -> str | None:
-    logo_path = ASSETS_DIR / "logo.svg"
-    if not logo_path.exists():
-        return None
-    payload = logo_path.read_bytes()
-    encoded = base64.b64encode(payload).decode("ascii")
-    return f"data:image/svg+xml;base64,{encoded}"
-
-
-_logo_data_uri = _load_logo_data_uri()
+def artifact_key(plan_context: dict[str, Any]) -> str:
+    """Content address of a rendered PDF: serialized plan, template version and branding.
+
+    Map images are not part of the context yet; their inputs (markers and path)
+    and the image processing settings are, so the key is computed before any
+    static map is fetched. The render mode is included because single-document
+    and paginated PDFs paginate differently.
+    """
+    payload = json.dumps(
+        {
+            "plan": plan_context,
+            "template": TEMPLATE_VERSION,
+            "brand": settings.PDF_BRAND_NAME,
+            "maps": asdict(ImageVariant.from_settings()),
+            "render_mode": settings.PDF_RENDER_MODE.lower(),
+        },
+        sort_keys=True,
+        default=str,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
 
 
 def _slugify(value: str) -> str:
@@ -127,37 +157,89 @@ class PdfGeneratorService:
         self,
         session: AsyncSession,
         *,
-        storage: SupabasePdfStorage | None = None,
+        storage: PdfStorage | None = None,
         mapbox: MapboxStaticClient | None = None,
+        static_maps: StaticMapFetcher | None = None,
     ) -> None:
         self._session = session
-        self._storage = storage or SupabasePdfStorage()
-        self._mapbox: MapboxStaticClient | None
-        if mapbox is not None:
-            self._mapbox = mapbox
+        self._storage = storage or get_pdf_storage()
+        # Day numbers whose static map could not be fetched during the current render.
+        self._maps_missing: set[int] = set()
+        self._static_maps: StaticMapFetcher | None
+        if static_maps is not None:
+            self._static_maps = static_maps
+        elif mapbox is not None:
+            self._static_maps = StaticMapFetcher(mapbox, cache=build_static_map_cache())
         else:
             try:
-                self._mapbox = get_mapbox_static_client()
+                self._static_maps = get_static_map_fetcher()
             except Exception:
-                self._mapbox = None
+                self._static_maps = None
 
-    async def generate(self, plan_id: UUID, user_id: UUID) -> PdfGenerationResult:
-        plan = await self._load_plan(plan_id, user_id)
+    async def generate(
+        self,
+        plan_id: UUID,
+        user_id: UUID,
+        *,
+        on_stage: Callable[[str], Awaitable[None]] | None = None,
+    ) -> PdfGenerationResult:
+        """Render (or reuse) the itinerary PDF; ``on_stage`` is told "rendering" and "uploading"."""
+        plan = await self.load_plan(plan_id, user_id)
         if plan is None:
             raise PdfPlanNotFoundError("Travel plan not found or access denied.")
 
-        html = await self._render_html(plan)
+        plan_context = self._serialize_plan(plan)
+        key = artifact_key(plan_context)
+        file_name = self.build_file_name(plan)
+
+        cached = await self.cached_artifact(key)
+        if cached is not None:
+            record_pdf_artifact_cache("hit")
+            return PdfGenerationResult(
+                file_name=file_name,
+                download_url=cached.url,
+                storage_path=cached.path,
+                expires_at=cached.expires_at,
+            )
+        record_pdf_artifact_cache("miss")
+
+        self._maps_missing = set()
+        if on_stage is not None:
+            await on_stage("rendering")
         renderer = await get_pdf_renderer()
+        paged = settings.PDF_RENDER_MODE.lower() == "paged"
+        html = None if paged else await self._render_html(plan_context)
+        started = time.perf_counter()
         try:
-            pdf_bytes = await renderer.render(html)
+            if paged:
+                pdf_bytes = await self._render_paged(plan_context, renderer)
+            else:
+                pdf_bytes = await renderer.render(html)
         except PdfRenderError as exc:
             raise PdfGenerationError(str(exc)) from exc
+        observe_pdf_render(time.perf_counter() - started)
 
-        file_name = self._build_file_name(plan)
+        if on_stage is not None:
+            await on_stage("uploading")
         try:
-            stored = await self._storage.upload_pdf(plan.id, file_name, pdf_bytes)
+            # Content-addressed paths keep earlier artifacts valid while they are still cached.
+            stored = await self._storage.upload_pdf(plan.id, file_name, pdf_bytes, version=key[:16])
         except PdfStorageError as exc:
             raise PdfGenerationError(str(exc)) from exc
+        observe_pdf_upload(len(pdf_bytes))
+
+        if self._maps_missing:
+            # The key only covers map inputs; caching would serve the map-less PDF until expiry.
+            logger.info(
+                "Not caching PDF for plan %s: static maps missing for days %s",
+                plan.id,
+                sorted(self._maps_missing),
+            )
+        else:
+            try:
+                await cache_pdf_artifact(key, {"path": stored.path, "size": len(pdf_bytes)})
+            except Exception as exc:  # pragma: no cover - redis availability is environment specific
+                logger.warning("Failed to record PDF artifact for plan %s: %s", plan.id, exc)
 
         return PdfGenerationResult(
             file_name=file_name,
@@ -166,7 +248,27 @@ class PdfGeneratorService:
             expires_at=stored.expires_at,
         )
 
-    async def _load_plan(self, plan_id: UUID, user_id: UUID) -> TravelPlan | None:
+    def artifact_key_for(self, plan: TravelPlan) -> str:
+        """Artifact key of a loaded plan, without fetching maps or rendering."""
+        return artifact_key(self._serialize_plan(plan))
+
+    async def cached_artifact(self, key: str) -> StoredPdf | None:
+        """Signed URL for an already uploaded artifact, or ``None`` to render afresh."""
+        try:
+            record = await get_cached_pdf_artifact(key)
+        except Exception as exc:  # pragma: no cover - redis availability is environment specific
+            logger.warning("PDF artifact lookup failed: %s", exc)
+            return None
+        if not record or not record.get("path"):
+            return None
+        try:
+            return await self._storage.signed_url(record["path"])
+        except PdfStorageError as exc:
+            # The object may have been removed from the bucket; render it again.
+            logger.info("Cached PDF artifact %s is not retrievable: %s", record["path"], exc)
+            return None
+
+    async def load_plan(self, plan_id: UUID, user_id: UUID) -> TravelPlan | None:
         stmt = (
             select(TravelPlan)
             .where(TravelPlan.id == plan_id, TravelPlan.user_id == user_id)
@@ -187,24 +289,106 @@ class PdfGeneratorService:
         result = await self._session.execute(stmt)
         return result.scalars().unique().one_or_none()
 
-    async def _render_html(self, plan: TravelPlan) -> str:
-        context = {
-            "plan": await self._serialize_plan(plan),
-            "brand": {
-                "name": settings.PDF_BRAND_NAME,
-                "logo_data_uri": _logo_data_uri,
-            },
-            "styles": _styles,
-            "generated_at": dt.datetime.now(dt.timezone.utc),
-        }
-        return _template.render(**context)
+    def _day_keys(self, days: Sequence[dict[str, Any]]) -> list[str]:
+        salt = json.dumps(asdict(self._static_maps.variant)) if self._static_maps else ""
+        return [day_fragment_key(day, salt=salt) for day in days]
+
+    async def _day_fragments(self, days: Sequence[dict[str, Any]], keys: Sequence[str]) -> list[Markup]:
+        """Rendered day sections, from the fragment cache where the day is unchanged."""
+        fragments: list[Markup | None] = [day_fragments.get(key) for key in keys]
+        stale = [index for index, fragment in enumerate(fragments) if fragment is None]
+        # Only days without a cached fragment need their static map.
+        await self._attach_map_images([days[index] for index in stale])
 
-    async def _serialize_plan(self, plan: TravelPlan) -> dict[str, Any]:
-        day_coroutines = [
+        def render_stale() -> None:
+            for index in stale:
+                fragments[index] = render_day(days[index])
+
+        if len(stale) >= settings.PDF_HTML_THREAD_MIN_DAYS:
+            await asyncio.to_thread(render_stale)
+        else:
+            render_stale()
+        for index in stale:
+            if days[index]["day_number"] not in self._maps_missing:
+                day_fragments.put(keys[index], fragments[index])  # type: ignore[arg-type]
+        return fragments  # type: ignore[return-value]
+
+    def _check_offline(self, html: str) -> None:
+        if settings.PDF_BLOCK_EXTERNAL_REQUESTS:
+            external = find_external_references(html)
+            if external:
+                # Blocked at render time anyway; surface it so the template gets fixed.
+                logger.warning("PDF HTML references external resources that will not load: %s", external[:5])
+
+    async def _render_html(self, plan_context: dict[str, Any]) -> str:
+        days = plan_context["days"]
+        fragments = await self._day_fragments(days, self._day_keys(days))
+
+        def assemble() -> str:
+            return render_document(
+                plan_context,
+                fragments,
+                brand_name=settings.PDF_BRAND_NAME,
+                generated_at=dt.datetime.now(dt.timezone.utc),
+            )
+
+        if len(days) >= settings.PDF_HTML_THREAD_MIN_DAYS:
+            html = await asyncio.to_thread(assemble)
+        else:
+            html = assemble()
+        self._check_offline(html)
+        return html
+
+    async def _render_paged(self, plan_context: dict[str, Any], renderer: PdfRenderer) -> bytes:
+        """Print cover, days and bookings as separate PDFs and merge them.
+
+        Day PDFs are cached under their fragment key, so only edited days reach
+        Chromium again; the cover carries the generation time and is always printed.
+        """
+        brand_name = settings.PDF_BRAND_NAME
+        days = plan_context["days"]
+        keys = self._day_keys(days)
+        day_parts: list[bytes | None] = [day_pdfs.get(key) for key in keys]
+        missing = [index for index, part in enumerate(day_parts) if part is None]
+        record_pdf_day_pdf_cache(hits=len(days) - len(missing), misses=len(missing))
+        fragments = await self._day_fragments(
+            [days[index] for index in missing], [keys[index] for index in missing]
+        )
+
+        documents = [
+            render_part(
+                render_cover(plan_context, brand_name=brand_name, generated_at=dt.datetime.now(dt.timezone.utc)),
+                brand_name=brand_name,
+            ),
+            render_part(render_bookings(plan_context, brand_name=brand_name), brand_name=brand_name),
+            *(render_part(fragment, brand_name=brand_name) for fragment in fragments),
+        ]
+        for document in documents:
+            self._check_offline(document)
+
+        # Wait here rather than in the pool so long trips do not hit the acquire timeout.
+        semaphore = asyncio.Semaphore(max(1, settings.PDF_PAGED_CONCURRENCY))
+
+        async def render(document: str) -> bytes:
+            async with semaphore:
+                return await renderer.render(document)
+
+        cover, bookings, *rendered = await asyncio.gather(*(render(document) for document in documents))
+        for index, part in zip(missing, rendered, strict=True):
+            day_parts[index] = part
+            if days[index]["day_number"] not in self._maps_missing:
+                day_pdfs.put(keys[index], part)
+        return await asyncio.to_thread(
+            merge_pdfs,
+            [cover, *day_parts, bookings],  # type: ignore[list-item]
+            title=plan_context["title"],
+        )
+
+    def _serialize_plan(self, plan: TravelPlan) -> dict[str, Any]:
+        days = [
             self._serialize_day(daily)
             for daily in sorted(plan.daily_itineraries, key=lambda item: item.day_number)
         ]
-        days = await asyncio.gather(*day_coroutines) if day_coroutines else []
         return {
             "id": str(plan.id),
             "title": plan.title,
@@ -226,38 +410,63 @@ class PdfGeneratorService:
             ],
         }
 
-    async def _serialize_day(self, daily: DailyItinerary) -> dict[str, Any]:
+    def _serialize_day(self, daily: DailyItinerary) -> dict[str, Any]:
         markers = sorted(daily.itinerary_places, key=lambda item: item.visit_order)
         routes = sorted(daily.routes, key=lambda item: item.from_order)
-        map_image = None
-        if markers and self._mapbox is not None:
-            try:
-                coordinates = []
-                for place in markers:
-                    # Skip places without valid coordinates (custom places, missing geocoding, etc.)
-                    if not place.place or place.place.latitude is None or place.place.longitude is None:
-                        continue
-                    coordinates.append((float(place.place.latitude), float(place.place.longitude)))
-
-                if coordinates:
-                    # Draw route using marker order so the map remains informative even without stored polylines.
-                    path: Sequence[tuple[float, float]] | None = coordinates if len(coordinates) > 1 else None
-                    image_bytes = await self._mapbox.get_static_map(markers=coordinates, path=path)
-                    if image_bytes:
-                        map_image = f"data:image/png;base64,{base64.b64encode(image_bytes).decode('ascii')}"
-            except (MapboxError, ValueError, RuntimeError, TypeError, AttributeError):
-                map_image = None
-
         return {
             "day_number": daily.day_number,
             "date": daily.date,
             "theme": daily.theme,
             "notes": daily.notes,
-            "map_image": map_image,
+            "map_request": self._map_request(markers, routes),
+            "map_image": None,
             "places": [self._serialize_place(place) for place in markers],
             "routes": [self._serialize_route(route) for route in routes],
         }
 
+    def _map_request(
+        self,
+        markers: Sequence[ItineraryPlace],
+        routes: Sequence[Route],
+    ) -> dict[str, Any] | None:
+        """Inputs of the day's static map; part of the artifact key, fetched only on a miss."""
+        coordinates = []
+        for place in markers:
+            # Skip places without valid coordinates (custom places, missing geocoding, etc.)
+            if not place.place or place.place.latitude is None or place.place.longitude is None:
+                continue
+            coordinates.append((float(place.place.latitude), float(place.place.longitude)))
+        if not coordinates:
+            return None
+
+        # Prefer geometry written back by the map export; otherwise draw the route in
+        # marker order so the map remains informative even without stored polylines.
+        # The static client simplifies long paths to fit the URL limit.
+        path: Sequence[tuple[float, float]] | None = stored_day_path(routes)
+        if path is None:
+            path = coordinates if len(coordinates) > 1 else None
+        return {"markers": coordinates, "path": list(path) if path else None}
+
+    async def _attach_map_images(self, days: Sequence[dict[str, Any]]) -> None:
+        """Embed static maps; days whose fetch failed are added to ``_maps_missing``."""
+        if self._static_maps is None:
+            return
+        static_maps = self._static_maps
+
+        async def fetch(day: dict[str, Any]) -> None:
+            request = day.get("map_request")
+            if not request:
+                return
+            image = await static_maps.fetch(StaticMapRequest.from_day(request))
+            if image is None:
+                self._maps_missing.add(day["day_number"])
+            else:
+                self._maps_missing.discard(day["day_number"])
+                day["map_image"] = image.data_uri
+
+        # The fetcher bounds concurrent Mapbox requests; cached days resolve immediately.
+        await asyncio.gather(*(fetch(day) for day in days))
+
     def _serialize_place(self, visit: ItineraryPlace) -> dict[str, Any]:
         place = visit.place
         return {
@@ -325,7 +534,7 @@ class PdfGeneratorService:
             "booking_url": option.booking_url,
         }
 
-    def _build_file_name(self, plan: TravelPlan) -> str:
+    def build_file_name(self, plan: TravelPlan) -> str:
         slug = _slugify(f"{plan.destination}-{plan.title}")
         start = plan.start_date.strftime("%Y%m%d")
         end = plan.end_date.strftime("%Y%m%d")
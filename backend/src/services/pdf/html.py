@@ -0,0 +1,188 @@
+"""
+HTML assembly for itinerary PDFs
+
+Templates are compiled once per process. A document is stitched together from
+three kinds of pieces:
+
+* static fragments (the ``<style>`` block and the brand logo), built once per
+  brand and inserted as markup
+* per-day fragments rendered from ``partials/day.html`` and kept in a
+  byte-bounded LRU keyed by the day's content hash, so re-exporting a plan
+  after editing one day renders (and fetches the map for) only that day
+* the document shell (cover, budget, bookings), rendered on every export
+
+For paginated rendering (``PDF_RENDER_MODE=paged``) the cover, each day and the
+bookings are instead wrapped in ``part.html`` and printed as separate PDFs.
+
+Rendering is synchronous; callers move large renders off the event loop with
+``asyncio.to_thread``.
+"""
+
+from __future__ import annotations
+
+import base64
+import datetime as dt
+import hashlib
+import json
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Generic, Sequence, TypeVar
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from markupsafe import Markup
+
+from ...config.settings import settings
+
+TEMPLATES_DIR = Path(__file__).resolve().parent / "templates"
+ASSETS_DIR = Path(__file__).resolve().parent / "assets"
+
+_env = Environment(
+    loader=FileSystemLoader(TEMPLATES_DIR),
+    autoescape=select_autoescape(["html"]),
+    enable_async=False,
+    auto_reload=False,  # templates ship with the code; skip the mtime check per lookup
+)
+_document_template = _env.get_template("itinerary.html")
+_day_template = _env.get_template("partials/day.html")
+_cover_template = _env.get_template("partials/cover.html")
+_bookings_template = _env.get_template("partials/bookings.html")
+_part_template = _env.get_template("part.html")
+
+_Fragment = TypeVar("_Fragment", Markup, bytes)
+
+
+def _template_version() -> str:
+    """Digest of every template and asset file; any edit invalidates cached PDFs."""
+    digest = hashlib.sha256()
+    for directory in (TEMPLATES_DIR, ASSETS_DIR):
+        if not directory.exists():
+            continue
+        for path in sorted(directory.rglob("*")):
+            if path.is_file() and "__pycache__" not in path.parts:
+                digest.update(path.relative_to(directory).as_posix().encode())
+                digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+TEMPLATE_VERSION = _template_version()
+
+
+@dataclass(frozen=True, slots=True)
+class StaticFragments:
+    """Markup shared by every document of a brand"""
+
+    styles: Markup
+    logo: Markup | None
+
+
+@lru_cache(maxsize=4)
+def static_fragments(brand_name: str) -> StaticFragments:
+    """Build the stylesheet block and logo tag once per brand."""
+    styles = (TEMPLATES_DIR / "styles.css").read_text(encoding="utf-8")
+    logo: Markup | None = None
+    logo_path = ASSETS_DIR / "logo.svg"
+    if logo_path.exists():
+        encoded = base64.b64encode(logo_path.read_bytes()).decode("ascii")
+        logo = Markup('<img src="data:image/svg+xml;base64,{}" alt="{} 로고" class="brand-logo" />').format(
+            encoded, brand_name
+        )
+    # CSS is trusted and must not be entity-escaped inside <style>.
+    return StaticFragments(styles=Markup(f"<style>\n{styles}\n</style>"), logo=logo)
+
+
+def day_fragment_key(day: dict[str, Any], *, salt: str = "") -> str:
+    """Content hash of a serialized day; the map image is represented by its inputs."""
+    payload = json.dumps(
+        {key: value for key, value in day.items() if key != "map_image"},
+        sort_keys=True,
+        default=str,
+        ensure_ascii=False,
+    )
+    digest = hashlib.sha256()
+    for part in (TEMPLATE_VERSION, salt, payload):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class FragmentCache(Generic[_Fragment]):
+    """LRU of rendered fragments (markup or PDF bytes) bounded by total size"""
+
+    def __init__(self, max_bytes: int) -> None:
+        self._max_bytes = max_bytes
+        self._size = 0
+        self._items: OrderedDict[str, _Fragment] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: str) -> _Fragment | None:
+        fragment = self._items.get(key)
+        if fragment is not None:
+            self._items.move_to_end(key)
+        return fragment
+
+    def put(self, key: str, fragment: _Fragment) -> None:
+        if len(fragment) > self._max_bytes:
+            return
+        previous = self._items.pop(key, None)
+        if previous is not None:
+            self._size -= len(previous)
+        self._items[key] = fragment
+        self._size += len(fragment)
+        while self._size > self._max_bytes:
+            _, evicted = self._items.popitem(last=False)
+            self._size -= len(evicted)
+
+    def clear(self) -> None:
+        self._items.clear()
+        self._size = 0
+
+
+day_fragments: FragmentCache[Markup] = FragmentCache(settings.PDF_FRAGMENT_CACHE_MB * 1024 * 1024)
+
+
+def render_day(day: dict[str, Any]) -> Markup:
+    return Markup(_day_template.render(day=day))
+
+
+def render_document(
+    plan: dict[str, Any],
+    fragments: Sequence[Markup],
+    *,
+    brand_name: str,
+    generated_at: dt.datetime,
+) -> str:
+    return _document_template.render(
+        plan=plan,
+        brand={"name": brand_name},
+        static=static_fragments(brand_name),
+        day_fragments=fragments,
+        generated_at=generated_at,
+    )
+
+
+def render_cover(plan: dict[str, Any], *, brand_name: str, generated_at: dt.datetime) -> Markup:
+    return Markup(
+        _cover_template.render(
+            plan=plan,
+            brand={"name": brand_name},
+            static=static_fragments(brand_name),
+            generated_at=generated_at,
+        )
+    )
+
+
+def render_bookings(plan: dict[str, Any], *, brand_name: str) -> Markup:
+    return Markup(_bookings_template.render(plan=plan, brand={"name": brand_name}))
+
+
+def render_part(content: Markup, *, brand_name: str) -> str:
+    """Standalone document for one section of a paginated PDF."""
+    return _part_template.render(
+        content=content,
+        brand={"name": brand_name},
+        static=static_fragments(brand_name),
+    )
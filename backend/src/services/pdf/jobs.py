@@ -0,0 +1,232 @@
+"""
+Background PDF export jobs
+
+``POST /exports/pdf/{plan_id}/jobs`` records a job in Redis and enqueues it on
+``PDF_RENDER_QUEUE`` instead of rendering inside the HTTP request. Dedicated
+render workers consume that queue and advance the job through
+``queued -> rendering -> uploading -> done`` (or ``failed``).
+
+Only one render per plan version is in flight: the artifact key of the plan is
+claimed for ``PDF_RENDER_CLAIM_TTL`` and concurrent requests for the same
+content receive the job that already holds the claim. Plans whose PDF is
+already in the artifact cache complete immediately without touching the queue.
+
+Render workers keep one event loop per process so the Chromium pool, Redis and
+database connections survive between jobs::
+
+    celery -A src.core.tasks.celery_app worker -Q pdf-render --concurrency 2
+"""
+
+from __future__ import annotations
+
+import asyncio
+import datetime as dt
+import logging
+import uuid
+from dataclasses import asdict, dataclass
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...config.database import AsyncSessionLocal
+from ...config.settings import settings
+from ...core.cache import (
+    cache_pdf_job,
+    claim_idempotency_key,
+    get_cached_pdf_job,
+    release_idempotency_key,
+)
+from ...core.tasks import register_task
+from ...schemas.pdf import PdfExportJobStatus
+from .generator import PdfGenerationError, PdfGeneratorService, PdfPlanNotFoundError
+from .storage import PdfStorage, PdfStorageError, get_pdf_storage
+
+logger = logging.getLogger(__name__)
+
+RENDER_TASK_NAME = "pdf.render"
+_CLAIM_NAMESPACE = "pdf-render"
+# Re-sign download URLs that would expire before the client can use them.
+_URL_REFRESH_MARGIN = dt.timedelta(minutes=5)
+
+
+class PdfJobNotFoundError(PdfGenerationError):
+    """Raised when a job does not exist or belongs to another user."""
+
+
+@dataclass(slots=True)
+class PdfExportJob:
+    """Job state persisted in Redis"""
+
+    job_id: str
+    plan_id: str
+    user_id: str
+    artifact_key: str
+    status: PdfExportJobStatus = "queued"
+    file_name: str | None = None
+    download_url: str | None = None
+    storage_path: str | None = None
+    expires_at: str | None = None
+    error: str | None = None
+
+    @classmethod
+    def from_payload(cls, payload: dict[str, Any]) -> "PdfExportJob":
+        return cls(**payload)
+
+    @property
+    def expires_at_datetime(self) -> dt.datetime | None:
+        return dt.datetime.fromisoformat(self.expires_at) if self.expires_at else None
+
+
+async def _save(job: PdfExportJob) -> None:
+    await cache_pdf_job(job.job_id, asdict(job))
+
+
+async def _load(job_id: str) -> PdfExportJob | None:
+    payload = await get_cached_pdf_job(job_id)
+    return PdfExportJob.from_payload(payload) if payload else None
+
+
+async def render_pdf_job(job_id: str) -> str:
+    """Render one queued job and record its progress; returns the final status."""
+    job = await _load(job_id)
+    if job is None:
+        logger.info("Skipping PDF render for expired job %s", job_id)
+        return "failed"
+
+    async def on_stage(stage: str) -> None:
+        job.status = stage  # type: ignore[assignment]
+        await _save(job)
+
+    try:
+        await on_stage("rendering")
+        async with AsyncSessionLocal() as session:
+            result = await PdfGeneratorService(session).generate(
+                UUID(job.plan_id),
+                UUID(job.user_id),
+                on_stage=on_stage,
+            )
+        job.status = "done"
+        job.file_name = result.file_name
+        job.download_url = result.download_url
+        job.storage_path = result.storage_path
+        job.expires_at = result.expires_at.isoformat() if result.expires_at else None
+    except Exception as exc:
+        # Failures are reported through the job; Celery retries would only repeat them.
+        logger.warning("PDF render job %s for plan %s failed: %s", job_id, job.plan_id, exc)
+        job.status = "failed"
+        job.error = str(exc) if isinstance(exc, PdfGenerationError) else "PDF 생성에 실패했습니다."
+    finally:
+        # A render that outlived PDF_RENDER_CLAIM_TTL must not drop a newer job's claim.
+        await release_idempotency_key(_CLAIM_NAMESPACE, job.artifact_key, owner=job.job_id)
+    await _save(job)
+    return job.status
+
+
+_worker_loop: asyncio.AbstractEventLoop | None = None
+
+
+def _run_render_job(job_id: str) -> str:
+    """Celery entry point: run on the worker's long-lived loop to keep browsers warm."""
+    global _worker_loop
+    if _worker_loop is None or _worker_loop.is_closed():
+        _worker_loop = asyncio.new_event_loop()
+    return _worker_loop.run_until_complete(render_pdf_job(job_id))
+
+
+render_task = register_task(
+    _run_render_job,
+    name=RENDER_TASK_NAME,
+    queue=settings.PDF_RENDER_QUEUE,
+    max_retries=0,
+)
+
+
+async def enqueue_pdf_export(session: AsyncSession, plan_id: UUID, user_id: UUID) -> PdfExportJob:
+    """Create (or join) the background job rendering the current version of a plan."""
+    service = PdfGeneratorService(session)
+    plan = await service.load_plan(plan_id, user_id)
+    if plan is None:
+        raise PdfPlanNotFoundError("Travel plan not found or access denied.")
+
+    key = service.artifact_key_for(plan)
+    job = PdfExportJob(
+        job_id=uuid.uuid4().hex,
+        plan_id=str(plan.id),
+        user_id=str(user_id),
+        artifact_key=key,
+        file_name=service.build_file_name(plan),
+    )
+
+    cached = await service.cached_artifact(key)
+    if cached is not None:
+        job.status = "done"
+        job.download_url = cached.url
+        job.storage_path = cached.path
+        job.expires_at = cached.expires_at.isoformat() if cached.expires_at else None
+        await _save(job)
+        return job
+
+    # Saved before claiming so a holder without a job record is stale, not just unsaved.
+    await _save(job)
+    for _ in range(2):
+        holder = await claim_idempotency_key(
+            _CLAIM_NAMESPACE, key, job.job_id, ttl=settings.PDF_RENDER_CLAIM_TTL
+        )
+        if holder == job.job_id:
+            break
+        existing = await _load(holder)
+        if existing is not None:
+            # The key covers the plan id, so the holder renders this very plan version.
+            return existing
+        # The holder's job record expired before its claim: drop the stale claim and retry.
+        await release_idempotency_key(_CLAIM_NAMESPACE, key, owner=holder)
+    else:
+        job.status = "failed"
+        job.error = "PDF 생성 작업을 등록하지 못했습니다."
+        await _save(job)
+        raise PdfGenerationError(job.error)
+
+    try:
+        await asyncio.to_thread(
+            render_task.apply_async,
+            args=(job.job_id,),
+            queue=settings.PDF_RENDER_QUEUE,
+            retry=False,
+        )
+    except Exception as exc:  # pragma: no cover - broker availability is environment specific
+        await release_idempotency_key(_CLAIM_NAMESPACE, key, owner=job.job_id)
+        job.status = "failed"
+        job.error = "PDF 생성 작업을 등록하지 못했습니다."
+        await _save(job)
+        raise PdfGenerationError(job.error) from exc
+    return job
+
+
+async def get_pdf_export_job(
+    job_id: str,
+    user_id: UUID,
+    *,
+    storage: PdfStorage | None = None,
+) -> PdfExportJob:
+    """Return a job owned by ``user_id``, re-signing the download URL when it is about to expire."""
+    job = await _load(job_id)
+    if job is None or job.user_id != str(user_id):
+        raise PdfJobNotFoundError("PDF export job not found.")
+
+    expires_at = job.expires_at_datetime
+    if (
+        job.status == "done"
+        and job.storage_path
+        and expires_at is not None
+        and expires_at - _URL_REFRESH_MARGIN <= dt.datetime.now(dt.timezone.utc)
+    ):
+        try:
+            stored = await (storage or get_pdf_storage()).signed_url(job.storage_path)
+        except PdfStorageError as exc:
+            logger.warning("Failed to refresh PDF URL for job %s: %s", job_id, exc)
+        else:
+            job.download_url = stored.url
+            job.expires_at = stored.expires_at.isoformat() if stored.expires_at else None
+            await _save(job)
+    return job
@@ -0,0 +1,58 @@
+"""
+Network isolation for PDF rendering
+
+Itinerary HTML is self-contained: the stylesheet is inlined, fonts come from
+the system and the logo and static maps are base64 data URIs. With nothing
+left to fetch, pages can be printed as soon as ``load`` fires instead of
+waiting out Chromium's 500 ms ``networkidle`` window.
+
+``serve_local_assets`` is installed as a route handler on every pooled context
+so that guarantee holds at runtime: files under ``assets/`` are served from
+``LOCAL_ASSET_ORIGIN`` without touching the network and every other request is
+aborted. ``find_external_references`` lets tests assert templates stay clean.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+from pathlib import Path
+
+from playwright.async_api import Route
+
+logger = logging.getLogger(__name__)
+
+ASSETS_DIR = Path(__file__).resolve().parent / "assets"
+LOCAL_ASSET_ORIGIN = "https://pdf-assets.local/"
+
+_INLINE_SCHEMES = ("data:", "about:", "blob:")
+_EXTERNAL_REFERENCE = re.compile(
+    r"""(?:\b(?:src|href|srcset|poster)\s*=\s*["']?|url\(\s*["']?|@import\s+(?:url\(\s*)?["']?)"""
+    r"""(?P<url>(?:https?:)?//[^"'\s)>]+)""",
+    re.IGNORECASE,
+)
+
+
+def find_external_references(html: str) -> list[str]:
+    """URLs in resource-loading positions that would hit the network."""
+    return [
+        match.group("url")
+        for match in _EXTERNAL_REFERENCE.finditer(html)
+        if not match.group("url").startswith(LOCAL_ASSET_ORIGIN)
+    ]
+
+
+async def serve_local_assets(route: Route) -> None:
+    """Fulfil local asset requests from disk and abort everything else."""
+    url = route.request.url
+    if url.startswith(_INLINE_SCHEMES):
+        await route.continue_()
+        return
+    if url.startswith(LOCAL_ASSET_ORIGIN):
+        name = url[len(LOCAL_ASSET_ORIGIN):].split("?", 1)[0].split("#", 1)[0]
+        path = (ASSETS_DIR / name).resolve()
+        if path.is_file() and ASSETS_DIR in path.parents:
+            await route.fulfill(path=str(path))
+            return
+    logger.warning("Blocked network request during PDF render: %s", url)
+    await route.abort("blockedbyclient")
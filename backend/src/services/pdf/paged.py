@@ -0,0 +1,43 @@
+"""
+Paginated PDF rendering helpers
+
+In ``PDF_RENDER_MODE=paged`` the generator prints the cover, every day and the
+bookings as separate small documents instead of one large page, and merges the
+resulting PDFs with PyPDF2. Each Chromium render stays small, parts render
+concurrently on separate pool browsers (bounded by ``PDF_PAGED_CONCURRENCY``),
+and day PDFs are kept in a byte-bounded LRU keyed by the same content hash as
+the day's HTML fragment, so an edited day is the only one printed again.
+
+Every part starts on a new page; the single-document mode lets a short day
+share a page with the next one.
+"""
+
+from __future__ import annotations
+
+import io
+from typing import Sequence
+
+from PyPDF2 import PdfReader, PdfWriter
+from PyPDF2.errors import PdfReadError
+
+from ...config.settings import settings
+from .html import FragmentCache
+from .pool import PdfRenderError
+
+day_pdfs: FragmentCache[bytes] = FragmentCache(settings.PDF_DAY_PDF_CACHE_MB * 1024 * 1024)
+
+
+def merge_pdfs(parts: Sequence[bytes], *, title: str | None = None) -> bytes:
+    """Concatenate PDF documents page by page; synchronous, run it in a thread."""
+    writer = PdfWriter()
+    try:
+        for part in parts:
+            for page in PdfReader(io.BytesIO(part)).pages:
+                writer.add_page(page)
+    except PdfReadError as exc:
+        raise PdfRenderError("Failed to merge rendered PDF parts.") from exc
+    if title:
+        writer.add_metadata({"/Title": title})
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
@@ -0,0 +1,386 @@
+"""
+Self-healing Chromium pool for PDF rendering
+
+Each pooled browser keeps one pre-warmed context and page (primed with the
+itinerary stylesheet) that is reused across renders. The pool:
+
+* launches ``min_size`` browsers up front and grows on demand up to ``max_size``
+* replaces browsers that disconnected or crashed, on acquire and in a periodic
+  health check
+* recycles a browser after ``max_renders`` renders or once its process tree
+  grows past ``max_memory_mb``
+* closes browsers idle for ``idle_timeout`` seconds while above ``min_size``
+* fails an acquire after ``acquire_timeout`` seconds instead of queueing forever
+
+Pool size, waiters, acquire latency, timeouts and recycles are exported as
+Prometheus metrics.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable
+
+from playwright.async_api import Browser, BrowserContext, Page, Playwright, Route, async_playwright
+
+from ...metrics.ai_pipeline import (
+    observe_pdf_pool_acquire,
+    record_pdf_browser_recycle,
+    update_pdf_pool_size,
+)
+
+logger = logging.getLogger(__name__)
+
+BrowserLauncher = Callable[[], Awaitable[Browser]]
+RouteHandler = Callable[[Route], Awaitable[None]]
+
+_CHROMIUM_ARGS = [
+    "--no-sandbox",
+    "--disable-setuid-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-gpu",
+]
+# Reading process memory costs a CDP round-trip; sample every few renders.
+_MEMORY_CHECK_EVERY = 10
+
+
+class PdfRenderError(RuntimeError):
+    """Base error for PDF rendering operations."""
+
+
+class PdfBrowserStartupError(PdfRenderError):
+    """Raised when the headless browser could not be launched."""
+
+
+class PdfPoolTimeoutError(PdfRenderError):
+    """Raised when no browser became available within the acquire timeout."""
+
+
+@dataclass(slots=True, eq=False)
+class _PooledBrowser:
+    browser: Browser
+    context: BrowserContext | None = None
+    page: Page | None = None
+    renders: int = 0
+    last_used: float = field(default_factory=time.monotonic)
+    crashed: bool = False
+
+    @property
+    def alive(self) -> bool:
+        return not self.crashed and self.browser.is_connected()
+
+
+async def browser_rss_bytes(browser: Browser) -> int | None:
+    """Resident memory of a Chromium browser and its child processes (Linux only)."""
+    statm_root = Path("/proc")
+    if not statm_root.exists():
+        return None
+    try:
+        session = await browser.new_browser_cdp_session()
+        try:
+            info = await session.send("SystemInfo.getProcessInfo")
+        finally:
+            await session.detach()
+    except Exception:
+        return None
+
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    total = 0
+    for process in info.get("processInfo", []):
+        try:
+            fields = (statm_root / str(process["id"]) / "statm").read_text().split()
+            total += int(fields[1]) * page_size
+        except (KeyError, OSError, IndexError, ValueError):
+            continue
+    return total or None
+
+
+class BrowserPool:
+    """Autoscaling pool of Chromium browsers with warm pages."""
+
+    def __init__(
+        self,
+        *,
+        min_size: int,
+        max_size: int,
+        launch_timeout: int,
+        acquire_timeout: float,
+        max_renders: int,
+        max_memory_mb: int | None,
+        idle_timeout: float,
+        health_interval: float,
+        locale: str = "en-US",
+        warmup_html: str | None = None,
+        route_handler: RouteHandler | None = None,
+        launcher: BrowserLauncher | None = None,
+    ) -> None:
+        self._max_size = max(1, max_size)
+        self._min_size = min(max(0, min_size), self._max_size)
+        self._launch_timeout = launch_timeout * 1000  # Playwright expects milliseconds
+        self._acquire_timeout = acquire_timeout
+        self._max_renders = max_renders
+        self._max_memory = max_memory_mb * 1024 * 1024 if max_memory_mb else None
+        self._idle_timeout = idle_timeout
+        self._health_interval = health_interval
+        self._locale = locale
+        self._warmup_html = warmup_html
+        self._route_handler = route_handler
+        self._launcher = launcher
+
+        self._playwright: Playwright | None = None
+        self._idle: list[_PooledBrowser] = []
+        self._busy: set[_PooledBrowser] = set()
+        self._total = 0  # idle + busy + launches in progress
+        self._waiters = 0
+        self._cond = asyncio.Condition()
+        self._start_lock = asyncio.Lock()
+        self._is_started = False
+        self._health_task: asyncio.Task[None] | None = None
+        self._background: set[asyncio.Task[None]] = set()
+
+    @property
+    def size(self) -> int:
+        return self._total
+
+    async def _ensure_started(self) -> None:
+        if self._is_started:
+            return
+        async with self._start_lock:
+            if self._is_started:
+                return
+            try:
+                if self._launcher is None:
+                    self._playwright = await async_playwright().start()
+                entries = await asyncio.gather(*(self._launch() for _ in range(self._min_size)))
+            except Exception as exc:  # pragma: no cover - startup is environment specific
+                raise PdfBrowserStartupError("Failed to start headless browser for PDF rendering.") from exc
+            async with self._cond:
+                self._idle.extend(entries)
+                self._total += len(entries)
+            self._is_started = True
+            if self._health_interval > 0:
+                self._health_task = asyncio.create_task(self._health_loop())
+            self._publish()
+
+    async def _launch(self) -> _PooledBrowser:
+        if self._launcher is not None:
+            browser = await self._launcher()
+        else:
+            assert self._playwright is not None
+            browser = await self._playwright.chromium.launch(
+                headless=True,
+                timeout=self._launch_timeout,
+                args=_CHROMIUM_ARGS,
+            )
+        entry = _PooledBrowser(browser=browser)
+
+        def on_disconnected(*_args: object) -> None:
+            entry.crashed = True
+
+        browser.on("disconnected", on_disconnected)
+        await self._warm(entry)
+        return entry
+
+    async def _warm(self, entry: _PooledBrowser) -> None:
+        entry.context = await entry.browser.new_context(locale=self._locale)
+        if self._route_handler is not None:
+            await entry.context.route("**/*", self._route_handler)
+        entry.page = await entry.context.new_page()
+        if self._warmup_html:
+            await entry.page.set_content(self._warmup_html, wait_until="load")
+
+    async def _close(self, entry: _PooledBrowser, reason: str) -> None:
+        record_pdf_browser_recycle(reason)
+        try:
+            await entry.browser.close()
+        except Exception as exc:  # pragma: no cover - closing a crashed browser may fail
+            logger.debug("Ignoring error while closing browser: %s", exc)
+
+    async def _acquire(self) -> _PooledBrowser:
+        await self._ensure_started()
+        started = time.perf_counter()
+        deadline = time.monotonic() + self._acquire_timeout
+        dead: list[_PooledBrowser] = []
+        launch = False
+        async with self._cond:
+            self._waiters += 1
+            self._publish()
+            try:
+                while True:
+                    entry = None
+                    while self._idle:
+                        candidate = self._idle.pop()
+                        if candidate.alive:
+                            entry = candidate
+                            break
+                        dead.append(candidate)
+                        self._total -= 1
+                    if entry is not None:
+                        break
+                    if self._total < self._max_size:
+                        self._total += 1  # reserve the slot before launching outside the lock
+                        launch = True
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        observe_pdf_pool_acquire(time.perf_counter() - started, timed_out=True)
+                        raise PdfPoolTimeoutError("No browser available for PDF rendering.")
+                    try:
+                        await asyncio.wait_for(self._cond.wait(), remaining)
+                    except asyncio.TimeoutError:
+                        continue
+            finally:
+                self._waiters -= 1
+
+        for entry_to_close in dead:
+            await self._close(entry_to_close, "dead")
+        if launch:
+            try:
+                entry = await self._launch()
+            except Exception as exc:
+                async with self._cond:
+                    self._total -= 1
+                    self._cond.notify()
+                self._publish()
+                raise PdfBrowserStartupError("Failed to launch headless browser.") from exc
+
+        self._busy.add(entry)
+        observe_pdf_pool_acquire(time.perf_counter() - started, timed_out=False)
+        self._publish()
+        return entry
+
+    async def _recycle_reason(self, entry: _PooledBrowser) -> str | None:
+        if not entry.alive:
+            return "dead"
+        if self._max_renders and entry.renders >= self._max_renders:
+            return "renders"
+        if self._max_memory and entry.renders % _MEMORY_CHECK_EVERY == 0:
+            rss = await browser_rss_bytes(entry.browser)
+            if rss is not None and rss > self._max_memory:
+                return "memory"
+        return None
+
+    async def _release(self, entry: _PooledBrowser, healthy: bool) -> None:
+        self._busy.discard(entry)
+        entry.renders += 1
+        entry.last_used = time.monotonic()
+
+        reason = await self._recycle_reason(entry)
+        if reason is None and not healthy:
+            # A failed render may leave the page in an odd state; start from a fresh context.
+            try:
+                if entry.context is not None:
+                    await entry.context.close()
+                await self._warm(entry)
+            except Exception:
+                reason = "dead"
+
+        if reason is not None:
+            await self._close(entry, reason)
+            async with self._cond:
+                self._total -= 1
+                self._cond.notify()
+            if self._total < self._min_size:
+                task = asyncio.create_task(self._replenish())
+                self._background.add(task)
+                task.add_done_callback(self._background.discard)
+        else:
+            async with self._cond:
+                self._idle.append(entry)
+                self._cond.notify()
+        self._publish()
+
+    async def _replenish(self) -> None:
+        """Launch browsers until the pool is back at ``min_size``."""
+        while True:
+            async with self._cond:
+                if not self._is_started or self._total >= self._min_size:
+                    return
+                self._total += 1
+            try:
+                entry = await self._launch()
+            except Exception as exc:  # pragma: no cover - launch failures are environment specific
+                logger.warning("Failed to replace PDF browser: %s", exc)
+                async with self._cond:
+                    self._total -= 1
+                return
+            async with self._cond:
+                self._idle.append(entry)
+                self._cond.notify()
+            self._publish()
+
+    async def check_health(self) -> None:
+        """Drop dead browsers, shrink idle capacity above ``min_size`` and refill to it."""
+        now = time.monotonic()
+        to_close: list[tuple[_PooledBrowser, str]] = []
+        async with self._cond:
+            keep: list[_PooledBrowser] = []
+            # Oldest-used first so the warmest browsers survive scale-down.
+            for entry in sorted(self._idle, key=lambda item: item.last_used):
+                if not entry.alive:
+                    to_close.append((entry, "dead"))
+                    self._total -= 1
+                elif now - entry.last_used > self._idle_timeout and self._total > self._min_size:
+                    to_close.append((entry, "idle"))
+                    self._total -= 1
+                else:
+                    keep.append(entry)
+            self._idle = keep
+        for entry, reason in to_close:
+            await self._close(entry, reason)
+        await self._replenish()
+        self._publish()
+
+    async def _health_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._health_interval)
+            try:
+                await self.check_health()
+            except Exception as exc:  # pragma: no cover - defensive
+                logger.warning("PDF browser pool health check failed: %s", exc)
+
+    def _publish(self) -> None:
+        update_pdf_pool_size(idle=len(self._idle), busy=len(self._busy), waiters=self._waiters)
+
+    async def shutdown(self) -> None:
+        if not self._is_started:
+            return
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
+        async with self._cond:
+            entries = [*self._idle, *self._busy]
+            self._idle = []
+            self._busy = set()
+            self._total = 0
+            self._is_started = False
+        for entry in entries:
+            try:
+                await entry.browser.close()
+            except Exception:  # pragma: no cover - best effort on shutdown
+                pass
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+        self._publish()
+
+    @asynccontextmanager
+    async def page(self) -> AsyncIterator[Page]:
+        entry = await self._acquire()
+        healthy = True
+        try:
+            if entry.page is None:
+                await self._warm(entry)
+            assert entry.page is not None
+            yield entry.page
+        except BaseException:
+            healthy = False
+            raise
+        finally:
+            await self._release(entry, healthy)
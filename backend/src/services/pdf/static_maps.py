@@ -0,0 +1,312 @@
+"""
+Static map images for PDF day pages
+
+Every exported day embeds a Mapbox Static Images map as a data URI. This
+module keeps those images cheap to obtain and to render:
+
+* ``StaticMapFetcher`` bounds concurrent Mapbox requests with a semaphore
+  (``PDF_STATIC_MAP_CONCURRENCY``) instead of firing one request per day at once
+* processed images are cached under a content address of style, markers, path,
+  size and output variant, in Redis or on local disk (``PDF_STATIC_MAP_CACHE``)
+* with Pillow installed (the ``images`` extra), the 2x PNG from Mapbox is downscaled to
+  ``PDF_STATIC_MAP_MAX_WIDTH`` and recompressed as JPEG or WebP; smaller data
+  URIs shrink the HTML handed to Chromium and the memory it spends decoding it
+
+Pillow is optional: without it images are embedded as delivered by Mapbox.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import hashlib
+import io
+import json
+import logging
+import os
+import tempfile
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Literal, Protocol, Sequence
+
+from ...config.settings import settings
+from ...core.cache import cache_static_map, get_cached_static_map
+from ...core.geo_utils import Coordinate
+from ...integrations.mapbox import MapboxError, MapboxStaticClient, get_mapbox_static_client
+from ...metrics.ai_pipeline import record_pdf_static_map
+
+try:  # Optional ``images`` extra: only needed to downscale and recompress images
+    from PIL import Image
+except ImportError:  # pragma: no cover - depends on the installed extras
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+ImageFormat = Literal["png", "jpeg", "webp"]
+
+_MEDIA_TYPES: dict[str, str] = {"png": "image/png", "jpeg": "image/jpeg", "webp": "image/webp"}
+_COORDINATE_PRECISION = 5  # same precision as the static map URL
+
+
+@dataclass(frozen=True, slots=True)
+class StaticMapRequest:
+    """Inputs of one static map; everything that changes the Mapbox image"""
+
+    markers: tuple[Coordinate, ...]
+    path: tuple[Coordinate, ...] | None = None
+    style: str = "light-v11"
+    width: int = 1280
+    height: int = 720
+
+    @classmethod
+    def from_day(cls, map_request: dict[str, Any]) -> "StaticMapRequest":
+        """Build a request from the ``map_request`` of a serialized PDF day."""
+        path = map_request.get("path")
+        return cls(
+            markers=tuple((float(lat), float(lng)) for lat, lng in map_request["markers"]),
+            path=tuple((float(lat), float(lng)) for lat, lng in path) if path else None,
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class ImageVariant:
+    """How fetched images are post-processed before embedding"""
+
+    format: ImageFormat = "png"
+    quality: int = 80
+    max_width: int | None = None
+
+    @classmethod
+    def from_settings(cls) -> "ImageVariant":
+        image_format = settings.PDF_STATIC_MAP_FORMAT.lower()
+        if image_format not in _MEDIA_TYPES:
+            logger.warning("Unsupported PDF_STATIC_MAP_FORMAT %r; keeping PNG", image_format)
+            image_format = "png"
+        return cls(
+            format=image_format,  # type: ignore[arg-type]
+            quality=settings.PDF_STATIC_MAP_QUALITY,
+            max_width=settings.PDF_STATIC_MAP_MAX_WIDTH or None,
+        )
+
+    @property
+    def is_passthrough(self) -> bool:
+        return self.format == "png" and self.max_width is None
+
+
+@dataclass(frozen=True, slots=True)
+class StaticMapImage:
+    """Processed image ready to be embedded"""
+
+    content: bytes
+    media_type: str
+
+    @property
+    def data_uri(self) -> str:
+        return f"data:{self.media_type};base64,{base64.b64encode(self.content).decode('ascii')}"
+
+
+def _round(points: Sequence[Coordinate] | None) -> list[list[float]] | None:
+    if points is None:
+        return None
+    return [[round(lat, _COORDINATE_PRECISION), round(lng, _COORDINATE_PRECISION)] for lat, lng in points]
+
+
+def static_map_key(request: StaticMapRequest, variant: ImageVariant) -> str:
+    """Content address of a processed static map image."""
+    payload = json.dumps(
+        {
+            "style": request.style,
+            "size": [request.width, request.height],
+            "markers": _round(request.markers),
+            "path": _round(request.path),
+            "variant": asdict(variant),
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def sniff_media_type(content: bytes) -> str:
+    """Media type of PNG, JPEG or WebP bytes; PNG when unrecognised."""
+    if content[:3] == b"\xff\xd8\xff":
+        return "image/jpeg"
+    if content[:4] == b"RIFF" and content[8:12] == b"WEBP":
+        return "image/webp"
+    return "image/png"
+
+
+def transcode_image(content: bytes, variant: ImageVariant) -> StaticMapImage:
+    """Downscale and recompress ``content``; returns it unchanged when Pillow is unavailable."""
+    if variant.is_passthrough or Image is None:
+        return StaticMapImage(content=content, media_type=sniff_media_type(content))
+
+    try:
+        with Image.open(io.BytesIO(content)) as source:
+            image = source
+            if variant.max_width and image.width > variant.max_width:
+                height = round(image.height * variant.max_width / image.width)
+                image = image.resize((variant.max_width, height), Image.Resampling.LANCZOS)
+            buffer = io.BytesIO()
+            if variant.format == "jpeg":
+                image.convert("RGB").save(
+                    buffer, "JPEG", quality=variant.quality, optimize=True, progressive=True
+                )
+            elif variant.format == "webp":
+                image.save(buffer, "WEBP", quality=variant.quality, method=4)
+            else:
+                image.save(buffer, "PNG", optimize=True)
+    except (OSError, ValueError) as exc:
+        logger.warning("Could not process static map image, embedding original: %s", exc)
+        return StaticMapImage(content=content, media_type=sniff_media_type(content))
+
+    processed = buffer.getvalue()
+    if len(processed) >= len(content):
+        return StaticMapImage(content=content, media_type=sniff_media_type(content))
+    return StaticMapImage(content=processed, media_type=_MEDIA_TYPES[variant.format])
+
+
+class StaticMapCache(Protocol):
+    async def get(self, key: str) -> StaticMapImage | None: ...
+
+    async def set(self, key: str, image: StaticMapImage) -> None: ...
+
+
+class RedisStaticMapCache:
+    """Processed images stored base64-encoded in Redis, shared by every worker"""
+
+    async def get(self, key: str) -> StaticMapImage | None:
+        payload = await get_cached_static_map(key)
+        if not payload or not payload.get("data"):
+            return None
+        return StaticMapImage(
+            content=base64.b64decode(payload["data"]),
+            media_type=payload.get("media_type") or "image/png",
+        )
+
+    async def set(self, key: str, image: StaticMapImage) -> None:
+        await cache_static_map(
+            key,
+            {"media_type": image.media_type, "data": base64.b64encode(image.content).decode("ascii")},
+        )
+
+
+class DiskStaticMapCache:
+    """Processed images stored as files, for single-host deployments and benchmarks"""
+
+    def __init__(self, directory: Path) -> None:
+        self._directory = directory
+
+    def _path(self, key: str) -> Path:
+        return self._directory / key[:2] / key
+
+    def _read(self, key: str) -> bytes | None:
+        try:
+            return self._path(key).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def _write(self, key: str, content: bytes) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write then rename so concurrent readers never see a partial image.
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(content)
+            os.replace(tmp_name, path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+    async def get(self, key: str) -> StaticMapImage | None:
+        content = await asyncio.to_thread(self._read, key)
+        if not content:
+            return None
+        return StaticMapImage(content=content, media_type=sniff_media_type(content))
+
+    async def set(self, key: str, image: StaticMapImage) -> None:
+        await asyncio.to_thread(self._write, key, image.content)
+
+
+def build_static_map_cache() -> StaticMapCache | None:
+    """Cache backend selected by ``PDF_STATIC_MAP_CACHE``."""
+    backend = settings.PDF_STATIC_MAP_CACHE.lower()
+    if backend == "redis":
+        return RedisStaticMapCache()
+    if backend == "disk":
+        return DiskStaticMapCache(Path(settings.PDF_STATIC_MAP_CACHE_DIR))
+    return None
+
+
+class StaticMapFetcher:
+    """Bounded-concurrency, cached access to Mapbox static map images"""
+
+    def __init__(
+        self,
+        client: MapboxStaticClient,
+        *,
+        cache: StaticMapCache | None = None,
+        concurrency: int | None = None,
+        variant: ImageVariant | None = None,
+    ) -> None:
+        self._client = client
+        self._cache = cache
+        self._semaphore = asyncio.Semaphore(max(1, concurrency or settings.PDF_STATIC_MAP_CONCURRENCY))
+        self._variant = variant or ImageVariant.from_settings()
+
+    @property
+    def variant(self) -> ImageVariant:
+        return self._variant
+
+    async def fetch(self, request: StaticMapRequest) -> StaticMapImage | None:
+        """Return the processed map image, or ``None`` if Mapbox could not provide one."""
+        key = static_map_key(request, self._variant)
+        if self._cache is not None:
+            try:
+                cached = await self._cache.get(key)
+            except Exception as exc:  # pragma: no cover - cache availability is environment specific
+                logger.warning("Static map cache lookup failed: %s", exc)
+                cached = None
+            if cached is not None:
+                record_pdf_static_map("hit", len(cached.content))
+                return cached
+
+        try:
+            async with self._semaphore:
+                content = await self._client.get_static_map(
+                    markers=list(request.markers),
+                    path=list(request.path) if request.path else None,
+                    style=request.style,
+                    width=request.width,
+                    height=request.height,
+                )
+        except (MapboxError, ValueError, RuntimeError, TypeError, AttributeError) as exc:
+            logger.info("Static map unavailable: %s", exc)
+            record_pdf_static_map("error")
+            return None
+        if not content:
+            record_pdf_static_map("error")
+            return None
+
+        image = await asyncio.to_thread(transcode_image, content, self._variant)
+        record_pdf_static_map("miss", len(image.content))
+        if self._cache is not None:
+            try:
+                await self._cache.set(key, image)
+            except Exception as exc:  # pragma: no cover - cache availability is environment specific
+                logger.warning("Failed to cache static map: %s", exc)
+        return image
+
+
+_static_map_fetcher: StaticMapFetcher | None = None
+
+
+def get_static_map_fetcher() -> StaticMapFetcher:
+    """Return the process-wide fetcher; raises if Mapbox is not configured."""
+    global _static_map_fetcher
+    if _static_map_fetcher is None:
+        _static_map_fetcher = StaticMapFetcher(
+            get_mapbox_static_client(),
+            cache=build_static_map_cache(),
+        )
+    return _static_map_fetcher
@@ -1,20 +1,39 @@
 """
-Supabase Storage integration for PDF exports.
+Storage backends for PDF exports.
+
+``SupabasePdfStorage`` talks to the Supabase Storage REST API over a pooled
+``httpx.AsyncClient`` instead of the synchronous SDK, so uploads and URL
+signing never occupy executor threads. PDF bodies are streamed in chunks with
+an explicit ``Content-Length`` and signed URLs are reused until shortly before
+they expire.
+
+``LocalPdfStorage`` writes to a directory and returns ``file://`` (or
+``PDF_PUBLIC_BASE_URL``) links for local development and tests; select it with
+``PDF_STORAGE_BACKEND=local``.
 """
 
 from __future__ import annotations
 
 import asyncio
 import datetime as dt
+import os
+import tempfile
+from collections import OrderedDict
 from dataclasses import dataclass
-from pathlib import PurePosixPath
-from typing import Optional
+from pathlib import Path, PurePosixPath
+from typing import AsyncIterator, Optional, Protocol
+from urllib.parse import quote
 from uuid import UUID
 
-from supabase import Client, create_client
+import httpx
 
 from ...config.settings import settings
 
+_UPLOAD_CHUNK_SIZE = 256 * 1024
+_SIGNED_URL_CACHE_SIZE = 1024
+# Cached signed URLs are replaced once less than this share of their lifetime remains.
+_SIGNED_URL_REFRESH_RATIO = 0.2
+
 
 class PdfStorageError(RuntimeError):
     """Raised when storing the generated PDF fails."""
@@ -29,64 +48,244 @@ class StoredPdf:
     expires_at: Optional[dt.datetime]
 
 
+class PdfStorage(Protocol):
+    async def upload_pdf(
+        self,
+        plan_id: UUID,
+        file_name: str,
+        content: bytes,
+        *,
+        version: Optional[str] = None,
+    ) -> StoredPdf: ...
+
+    async def signed_url(self, path: str) -> StoredPdf: ...
+
+
+def object_path(folder: str, plan_id: UUID, file_name: str, version: Optional[str] = None) -> str:
+    """``{folder}/{plan_id}[/{version}]/{file_name}`` inside the bucket."""
+    base_path = PurePosixPath(folder.strip("/")) if folder else PurePosixPath()
+    plan_path = base_path / str(plan_id)
+    if version:
+        plan_path = plan_path / version
+    return str(plan_path / file_name)
+
+
+async def _iter_chunks(content: bytes) -> AsyncIterator[bytes]:
+    view = memoryview(content)
+    for offset in range(0, len(view), _UPLOAD_CHUNK_SIZE):
+        yield bytes(view[offset : offset + _UPLOAD_CHUNK_SIZE])
+
+
+class _SignedUrlCache:
+    """Process-wide LRU of signed URLs keyed by bucket and object path"""
+
+    def __init__(self, max_size: int = _SIGNED_URL_CACHE_SIZE) -> None:
+        self._max_size = max_size
+        self._items: OrderedDict[tuple[str, str], tuple[StoredPdf, dt.datetime]] = OrderedDict()
+
+    def get(self, bucket: str, path: str) -> StoredPdf | None:
+        item = self._items.get((bucket, path))
+        if item is None:
+            return None
+        stored, refresh_at = item
+        if dt.datetime.now(dt.timezone.utc) >= refresh_at:
+            del self._items[(bucket, path)]
+            return None
+        self._items.move_to_end((bucket, path))
+        return stored
+
+    def set(self, bucket: str, stored: StoredPdf, ttl: int) -> None:
+        if stored.expires_at is None:
+            return
+        refresh_at = stored.expires_at - dt.timedelta(seconds=ttl * _SIGNED_URL_REFRESH_RATIO)
+        self._items[(bucket, stored.path)] = (stored, refresh_at)
+        self._items.move_to_end((bucket, stored.path))
+        while len(self._items) > self._max_size:
+            self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        self._items.clear()
+
+
+_signed_urls = _SignedUrlCache()
+_http_client: httpx.AsyncClient | None = None
+
+
+def get_storage_http_client() -> httpx.AsyncClient:
+    """Return the shared, connection-pooled client for the Supabase Storage API."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            base_url=f"{settings.SUPABASE_URL.rstrip('/')}/storage/v1",
+            headers={
+                "Authorization": f"Bearer {settings.SUPABASE_SERVICE_KEY}",
+                "apikey": settings.SUPABASE_SERVICE_KEY,
+            },
+            timeout=httpx.Timeout(settings.PDF_STORAGE_TIMEOUT, connect=5.0),
+            limits=httpx.Limits(
+                max_connections=settings.PDF_STORAGE_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.PDF_STORAGE_MAX_CONNECTIONS,
+            ),
+        )
+    return _http_client
+
+
+async def close_pdf_storage() -> None:
+    """Close the shared Storage API client (application shutdown)."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+    _http_client = None
+    _signed_urls.clear()
+
+
 class SupabasePdfStorage:
     """Uploads generated PDFs to Supabase Storage and returns signed URLs."""
 
     def __init__(
         self,
         *,
-        client: Optional[Client] = None,
+        client: Optional[httpx.AsyncClient] = None,
         bucket_name: Optional[str] = None,
         folder: Optional[str] = None,
         signed_url_ttl: Optional[int] = None,
     ) -> None:
-        self._client = client or create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY)
+        self._client = client or get_storage_http_client()
         self._bucket = bucket_name or settings.PDF_BUCKET_NAME
         self._folder = folder or settings.PDF_STORAGE_FOLDER
         self._signed_url_ttl = max(60, signed_url_ttl or settings.PDF_SIGNED_URL_TTL)
 
-    def _object_path(self, plan_id: UUID, file_name: str) -> str:
-        base_path = PurePosixPath(self._folder.strip("/")) if self._folder else PurePosixPath()
-        return str(base_path / str(plan_id) / file_name)
-
-    async def upload_pdf(self, plan_id: UUID, file_name: str, content: bytes) -> StoredPdf:
-        """Persist the PDF in Storage and return an accessible URL."""
-        path = self._object_path(plan_id, file_name)
-        storage = self._client.storage.from_(self._bucket)
-
-        async def _upload() -> StoredPdf:
-            try:
-                storage.upload(
-                    path,
-                    content,
-                    {
-                        "content-type": "application/pdf",
-                        "cache-control": "public, max-age=3600",
-                        "upsert": True,
-                    },
-                )
-            except Exception as exc:  # pragma: no cover - depends on Supabase runtime
-                raise PdfStorageError(f"Failed to upload PDF to Supabase Storage: {exc}") from exc
-
-            url: Optional[str] = None
-            expires_at: Optional[dt.datetime] = None
-            try:
-                if settings.PDF_PUBLIC_BASE_URL:
-                    url = f"{settings.PDF_PUBLIC_BASE_URL.rstrip('/')}/{path}"
-                else:
-                    signed = storage.create_signed_url(path, self._signed_url_ttl)
-                    if isinstance(signed, dict):
-                        url = signed.get("signedURL") or signed.get("signed_url")
-                    else:
-                        url = getattr(signed, "signed_url", None) or getattr(signed, "signedURL", None)
-                    expires_at = dt.datetime.now(dt.timezone.utc) + dt.timedelta(seconds=self._signed_url_ttl)
-
-                if not url:
-                    url = storage.get_public_url(path)
-                    expires_at = None
-            except Exception as exc:  # pragma: no cover - thin wrapper around SDK behaviour
-                raise PdfStorageError(f"Failed to generate public URL for PDF: {exc}") from exc
-
-            return StoredPdf(url=url, path=path, expires_at=expires_at)
-
-        return await asyncio.to_thread(_upload)
+    def _object_path(self, plan_id: UUID, file_name: str, version: Optional[str] = None) -> str:
+        return object_path(self._folder, plan_id, file_name, version)
+
+    def _object_url(self, path: str, kind: Optional[str] = None) -> str:
+        prefix = f"/object/{kind}" if kind else "/object"
+        return f"{prefix}/{self._bucket}/{quote(path)}"
+
+    def _absolute(self, url: str) -> str:
+        return f"{str(self._client.base_url).rstrip('/')}{url}"
+
+    async def signed_url(self, path: str) -> StoredPdf:
+        """Return a URL for an already uploaded PDF, reusing a recent signature."""
+        if settings.PDF_PUBLIC_BASE_URL:
+            url = f"{settings.PDF_PUBLIC_BASE_URL.rstrip('/')}/{path}"
+            return StoredPdf(url=url, path=path, expires_at=None)
+
+        cached = _signed_urls.get(self._bucket, path)
+        if cached is not None:
+            return cached
+
+        try:
+            response = await self._client.post(
+                self._object_url(path, "sign"),
+                json={"expiresIn": self._signed_url_ttl},
+            )
+            response.raise_for_status()
+            payload = response.json()
+            signed = payload.get("signedURL") or payload.get("signedUrl")
+        except httpx.HTTPStatusError as exc:
+            raise PdfStorageError(f"Failed to sign PDF URL: {exc.response.status_code}") from exc
+        except (httpx.RequestError, ValueError) as exc:
+            raise PdfStorageError(f"Failed to sign PDF URL: {exc}") from exc
+        if not signed:
+            raise PdfStorageError("Supabase Storage returned no signed URL.")
+
+        stored = StoredPdf(
+            url=signed if signed.startswith("http") else self._absolute(signed),
+            path=path,
+            expires_at=dt.datetime.now(dt.timezone.utc) + dt.timedelta(seconds=self._signed_url_ttl),
+        )
+        _signed_urls.set(self._bucket, stored, self._signed_url_ttl)
+        return stored
+
+    async def upload_pdf(
+        self,
+        plan_id: UUID,
+        file_name: str,
+        content: bytes,
+        *,
+        version: Optional[str] = None,
+    ) -> StoredPdf:
+        """Stream the PDF into Storage and return an accessible URL.
+
+        ``version`` (the artifact content hash) becomes a path segment so each
+        distinct rendering gets its own immutable object.
+        """
+        path = self._object_path(plan_id, file_name, version)
+        try:
+            response = await self._client.post(
+                self._object_url(path),
+                content=_iter_chunks(content),
+                headers={
+                    "Content-Type": "application/pdf",
+                    # Known length: httpx streams the chunks without chunked encoding.
+                    "Content-Length": str(len(content)),
+                    "Cache-Control": "max-age=3600",
+                    "x-upsert": "true",
+                },
+            )
+            response.raise_for_status()
+        except httpx.HTTPStatusError as exc:
+            raise PdfStorageError(
+                f"Failed to upload PDF to Supabase Storage: {exc.response.status_code} {exc.response.text}"
+            ) from exc
+        except httpx.RequestError as exc:
+            raise PdfStorageError(f"Failed to upload PDF to Supabase Storage: {exc}") from exc
+        return await self.signed_url(path)
+
+
+class LocalPdfStorage:
+    """Filesystem stand-in for Supabase Storage used in development and tests."""
+
+    def __init__(self, root: Optional[Path] = None, *, folder: Optional[str] = None) -> None:
+        self._root = root or Path(settings.PDF_LOCAL_STORAGE_DIR)
+        self._folder = folder or settings.PDF_STORAGE_FOLDER
+
+    def _file(self, path: str) -> Path:
+        return self._root / PurePosixPath(path)
+
+    def _write(self, path: str, content: bytes) -> None:
+        target = self._file(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=target.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                view = memoryview(content)
+                for offset in range(0, len(view), _UPLOAD_CHUNK_SIZE):
+                    handle.write(view[offset : offset + _UPLOAD_CHUNK_SIZE])
+            os.replace(tmp_name, target)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+    async def signed_url(self, path: str) -> StoredPdf:
+        target = self._file(path)
+        if not await asyncio.to_thread(target.is_file):
+            raise PdfStorageError(f"PDF {path} does not exist.")
+        if settings.PDF_PUBLIC_BASE_URL:
+            url = f"{settings.PDF_PUBLIC_BASE_URL.rstrip('/')}/{path}"
+        else:
+            url = target.resolve().as_uri()
+        return StoredPdf(url=url, path=path, expires_at=None)
+
+    async def upload_pdf(
+        self,
+        plan_id: UUID,
+        file_name: str,
+        content: bytes,
+        *,
+        version: Optional[str] = None,
+    ) -> StoredPdf:
+        path = object_path(self._folder, plan_id, file_name, version)
+        try:
+            await asyncio.to_thread(self._write, path, content)
+        except OSError as exc:
+            raise PdfStorageError(f"Failed to write PDF to {self._root}: {exc}") from exc
+        return await self.signed_url(path)
+
+
+def get_pdf_storage() -> PdfStorage:
+    """Storage backend selected by ``PDF_STORAGE_BACKEND``."""
+    if settings.PDF_STORAGE_BACKEND.lower() == "local":
+        return LocalPdfStorage()
+    return SupabasePdfStorage()
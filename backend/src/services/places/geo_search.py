@@ -5,10 +5,25 @@ from __future__ import annotations
 from dataclasses import dataclass, replace
 from typing import Sequence
 
-from sqlalchemy import Float, Select, func, select
+from sqlalchemy import (
+    Float,
+    Integer,
+    Select,
+    String,
+    cast,
+    column,
+    func,
+    or_,
+    select,
+    true,
+    values,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 
 from ...models.place import Place
+from ...models.types import Geography
+from .spatial_index import get_spatial_index_registry
 
 
 @dataclass(slots=True)
@@ -18,36 +33,29 @@ class GeoSearchParams:
     radius_km: float = 5.0
     limit: int = 20
     category: str | None = None
+    city: str | None = None  # answered from the in-memory index when allowlisted
+
+
+def _target_point(latitude, longitude):
+    return cast(func.ST_SetSRID(func.ST_MakePoint(longitude, latitude), 4326), Geography())
 
 
 class GeoSearchService:
-    """Provide distance ordered place search leveraging PostGIS functions."""
+    """Provide distance ordered place search over the indexed ``places.location`` column."""
 
     def __init__(self, session: AsyncSession) -> None:
         self.session = session
 
     def _base_query(self, params: GeoSearchParams) -> Select:
-        target_point = func.ST_SetSRID(func.ST_MakePoint(params.longitude, params.latitude), 4326)
-        place_point = func.ST_SetSRID(
-            func.ST_MakePoint(
-                func.cast(Place.longitude, Float),
-                func.cast(Place.latitude, Float),
-            ),
-            4326,
-        )
+        target = _target_point(params.latitude, params.longitude)
 
-        distance = func.ST_DistanceSphere(place_point, target_point).label("distance")
+        # Sphere distance matches the `<->` KNN operator on geography columns.
+        distance = func.ST_Distance(Place.location, target, False).label("distance")
 
         query = (
             select(Place, distance)
-            .where(
-                func.ST_DWithin(
-                    place_point.cast("geography"),
-                    target_point.cast("geography"),
-                    params.radius_km * 1000,
-                )
-            )
-            .order_by(distance)
+            .where(func.ST_DWithin(Place.location, target, params.radius_km * 1000))
+            .order_by(Place.location.op("<->")(target))
             .limit(params.limit)
         )
 
@@ -59,10 +67,97 @@ class GeoSearchService:
     async def search(self, params: GeoSearchParams) -> list[tuple[Place, float]]:
         """Return places ordered by distance from the provided coordinate."""
 
+        index = await get_spatial_index_registry().get(params.city)
+        if index is not None:
+            return index.search(
+                params.latitude,
+                params.longitude,
+                radius_km=params.radius_km,
+                limit=params.limit,
+                category=params.category,
+            )
+
         result = await self.session.execute(self._base_query(params))
         rows: Sequence[tuple[Place, float]] = result.all()
         return list(rows)
 
+    def _batch_query(self, params_list: Sequence[GeoSearchParams]) -> Select:
+        anchors = values(
+            column("anchor", Integer),
+            column("latitude", Float),
+            column("longitude", Float),
+            column("radius_m", Float),
+            column("max_results", Integer),
+            column("category", String),
+            name="anchors",
+        ).data(
+            [
+                (
+                    index,
+                    params.latitude,
+                    params.longitude,
+                    params.radius_km * 1000,
+                    params.limit,
+                    params.category,
+                )
+                for index, params in enumerate(params_list)
+            ]
+        )
+        target = _target_point(anchors.c.latitude, anchors.c.longitude)
+        # The generated geography column is only needed for filtering, not in the result rows.
+        place_columns = [col for col in Place.__table__.c if col.key != "location"]
+
+        nearby = (
+            select(*place_columns, func.ST_Distance(Place.location, target, False).label("distance"))
+            .where(func.ST_DWithin(Place.location, target, anchors.c.radius_m))
+            .where(or_(anchors.c.category.is_(None), Place.category == anchors.c.category))
+            .order_by(Place.location.op("<->")(target))
+            .limit(anchors.c.max_results)
+            .lateral("nearby")
+        )
+        place = aliased(Place, nearby)
+        return (
+            select(anchors.c.anchor, place, nearby.c.distance)
+            .select_from(anchors)
+            .join(nearby, true())
+            .order_by(anchors.c.anchor, nearby.c.distance)
+        )
+
+    async def search_many(
+        self,
+        params_list: Sequence[GeoSearchParams],
+    ) -> list[list[tuple[Place, float]]]:
+        """Run several searches in one round-trip, returning results per input anchor.
+
+        Each anchor keeps its own radius, limit and category filter; the query is a
+        ``LATERAL`` KNN subquery joined against a ``VALUES`` list of anchors.
+        """
+
+        grouped: list[list[tuple[Place, float]]] = [[] for _ in params_list]
+        registry = get_spatial_index_registry()
+        remote: list[int] = []
+        for position, params in enumerate(params_list):
+            index = await registry.get(params.city)
+            if index is None:
+                remote.append(position)
+                continue
+            grouped[position] = index.search(
+                params.latitude,
+                params.longitude,
+                radius_km=params.radius_km,
+                limit=params.limit,
+                category=params.category,
+            )
+        if not remote:
+            return grouped
+
+        result = await self.session.execute(
+            self._batch_query([params_list[position] for position in remote])
+        )
+        for anchor, place, distance in result.all():
+            grouped[remote[anchor]].append((place, distance))
+        return grouped
+
     async def nearby_activities(self, params: GeoSearchParams) -> list[tuple[Place, float]]:
         return await self.search(replace(params, category="attraction"))
 
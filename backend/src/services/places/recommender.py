@@ -3,15 +3,30 @@
 from __future__ import annotations
 
 import asyncio
+import logging
 from dataclasses import dataclass, field
-from typing import Iterable
+from typing import Any, Awaitable, Iterable, TypeVar
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from ...config.settings import settings
 from ...integrations.google_maps import get_google_maps_client
-from ...core.cache import cache_place, get_cached_place
-from ...schemas.place import PlaceCreate
+from ...core.cache import (
+    cache_place,
+    cache_place_search,
+    get_cached_place,
+    get_cached_place_search,
+)
+from ...models.place import Place
+from ...schemas.place import PlaceCategory, PlaceCreate
 from ...schemas.travel_plan import TravelPlanCreate
 from ..ai.preference_analyzer import AnalyzedPreferences
+from .geo_search import GeoSearchParams, GeoSearchService
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
 
 
 @dataclass
@@ -237,6 +252,67 @@ SAMPLE_DATA = {
 }
 
 
+async def _best_effort(awaitable: Awaitable[T]) -> T | None:
+    """Await a cache operation, treating Redis failures as a cache miss."""
+    try:
+        return await awaitable
+    except Exception as exc:
+        logger.debug("Place cache unavailable: %s", exc)
+        return None
+
+
+def _local_score(
+    place: Place,
+    distance_m: float | None,
+    radius_km: float,
+    interests: set[str],
+) -> float:
+    radius_m = radius_km * 1000
+    proximity = 1 - min(float(distance_m or 0.0), radius_m) / radius_m if radius_m else 0.0
+    rating = float(place.rating or 0) / 5
+    tag_match = 1.0 if interests.intersection(place.tags or ()) else 0.0
+    return _DISTANCE_WEIGHT * proximity + _RATING_WEIGHT * rating + _TAG_WEIGHT * tag_match
+
+
+def _from_model(place: Place) -> PlaceCreate:
+    return PlaceCreate(
+        name=place.name,
+        category=place.category,
+        latitude=float(place.latitude),
+        longitude=float(place.longitude),
+        address=place.address,
+        city=place.city,
+        country=place.country,
+        subcategory=place.subcategory,
+        description=place.description,
+        phone=place.phone,
+        website=place.website,
+        rating=float(place.rating) if place.rating is not None else None,
+        price_level=place.price_level,
+        opening_hours=place.opening_hours,
+        photos=place.photos,
+        tags=place.tags,
+        external_id=place.external_id,
+        external_source=place.external_source,
+    )
+
+
+def _merge_local(target: list[PlaceCreate], places: list[PlaceCreate]) -> None:
+    """Put stored places ahead of curated ones, dropping curated duplicates."""
+    stored_ids = {place.external_id for place in places}
+    target[:] = places + [place for place in target if place.external_id not in stored_ids]
+
+
+def _bundle_list(bundle: RecommendationBundle, category: PlaceCategory) -> list[PlaceCreate]:
+    if category == "accommodation":
+        return bundle.accommodations
+    if category == "restaurant":
+        return bundle.restaurants
+    if category == "cafe":
+        return bundle.cafes
+    return bundle.activities
+
+
 def _fallback_bundle(destination: str, country: str) -> RecommendationBundle:
     return RecommendationBundle(
         accommodations=[
@@ -302,10 +378,38 @@ def _fallback_bundle(destination: str, country: str) -> RecommendationBundle:
     )
 
 
+@dataclass(frozen=True, slots=True)
+class _SearchSpec:
+    """Single Places text search issued during enrichment"""
+
+    query: str
+    place_type: str
+    category: PlaceCategory
+    tag: str | None = None
+
+
+# (query term, Google place type, bundle category) searched for every destination
+_CATEGORY_SEARCHES: tuple[tuple[str, str, PlaceCategory], ...] = (
+    ("restaurants", "restaurant", "restaurant"),
+    ("cafes", "cafe", "cafe"),
+    ("hotels", "lodging", "accommodation"),
+)
+
+_SEARCH_LANGUAGE = "en"
+
+_BUNDLE_CATEGORIES: tuple[PlaceCategory, ...] = ("accommodation", "attraction", "restaurant", "cafe")
+
+# Relative weights of the local store ranking signals (each normalised to 0..1)
+_DISTANCE_WEIGHT = 0.4
+_RATING_WEIGHT = 0.35
+_TAG_WEIGHT = 0.25
+
+
 class PlacesRecommender:
     """Return curated place suggestions, optionally enriched via Google Places"""
 
-    def __init__(self) -> None:
+    def __init__(self, session: AsyncSession | None = None) -> None:
+        self._session = session
         self._maps_client = None
         if settings.GOOGLE_MAPS_API_KEY:
             try:
@@ -313,63 +417,257 @@ class PlacesRecommender:
             except Exception:
                 self._maps_client = None
 
-    async def _augment_with_google(
+    async def _search_anchor(
+        self,
+        plan: TravelPlanCreate,
+        template: RecommendationBundle | None,
+    ) -> tuple[float, float] | None:
+        """Return the coordinate the local store search is centred on."""
+        if template is not None:
+            points = [(place.latitude, place.longitude) for place in template.all_places()]
+            if points:
+                return (
+                    sum(lat for lat, _ in points) / len(points),
+                    sum(lng for _, lng in points) / len(points),
+                )
+
+        # Seed placeholders sit on null island and would drag the centroid away.
+        result = await self._session.execute(
+            select(func.avg(Place.latitude), func.avg(Place.longitude)).where(
+                func.lower(Place.city) == plan.destination.lower(),
+                Place.external_source.is_distinct_from("seed"),
+            )
+        )
+        latitude, longitude = result.one()
+        if latitude is None or longitude is None:
+            return None
+        return (float(latitude), float(longitude))
+
+    async def _local_places(
         self,
-        bundle: RecommendationBundle,
         plan: TravelPlanCreate,
         preferences: AnalyzedPreferences,
-    ) -> None:
-        if not self._maps_client:
-            return
+        template: RecommendationBundle | None,
+    ) -> dict[PlaceCategory, list[PlaceCreate]]:
+        """Query the places table around the destination, best candidates first per category."""
+        anchor = await self._search_anchor(plan, template)
+        if anchor is None:
+            return {}
 
-        try:
-            tasks = [
-                self._maps_client.search_places(
+        radius_km = settings.PLACES_LOCAL_SEARCH_RADIUS_KM
+        quota = settings.PLACES_CATEGORY_QUOTA
+        interests = set(preferences.interests)
+        results = await GeoSearchService(self._session).search_many(
+            [
+                GeoSearchParams(
+                    latitude=anchor[0],
+                    longitude=anchor[1],
+                    radius_km=radius_km,
+                    limit=quota * 3,
+                    category=category,
+                    city=plan.destination,
+                )
+                for category in _BUNDLE_CATEGORIES
+            ]
+        )
+        local: dict[PlaceCategory, list[PlaceCreate]] = {}
+        for category, rows in zip(_BUNDLE_CATEGORIES, results, strict=True):
+            # Places without an external id cannot be matched back to their row by the planner.
+            candidates = [
+                (place, distance)
+                for place, distance in rows
+                if place.external_id and place.external_source != "seed"
+            ]
+            candidates.sort(
+                key=lambda row: _local_score(row[0], row[1], radius_km, interests),
+                reverse=True,
+            )
+            local[category] = [_from_model(place) for place, _ in candidates[:quota]]
+        return local
+
+    def _build_search_specs(
+        self,
+        plan: TravelPlanCreate,
+        preferences: AnalyzedPreferences,
+        categories: set[PlaceCategory],
+    ) -> list[_SearchSpec]:
+        specs: list[_SearchSpec] = []
+        if "attraction" in categories:
+            specs.extend(
+                _SearchSpec(
                     query=f"best {interest} {plan.destination}",
                     place_type="tourist_attraction",
-                    language="en",
+                    category="attraction",
+                    tag=interest,
                 )
-                for interest in preferences.interests[:2]
-            ]
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-        except Exception:
-            bundle.warnings.append("Google Places 데이터를 가져오지 못했습니다. 로컬 추천을 사용합니다.")
+                for interest in dict.fromkeys(preferences.interests)
+            )
+        specs.extend(
+            _SearchSpec(query=f"best {term} {plan.destination}", place_type=place_type, category=category)
+            for term, place_type, category in _CATEGORY_SEARCHES
+            if category in categories
+        )
+        return specs
+
+    async def _search(self, spec: _SearchSpec, semaphore: asyncio.Semaphore) -> list[dict[str, Any]]:
+        cached = await _best_effort(
+            get_cached_place_search(spec.query, language=_SEARCH_LANGUAGE, place_type=spec.place_type)
+        )
+        if cached is not None:
+            return cached
+
+        async with semaphore:
+            results = await self._maps_client.search_places(
+                query=spec.query,
+                place_type=spec.place_type,
+                language=_SEARCH_LANGUAGE,
+            )
+        await _best_effort(
+            cache_place_search(
+                spec.query,
+                results,
+                language=_SEARCH_LANGUAGE,
+                place_type=spec.place_type,
+            )
+        )
+        return results
+
+    async def _stored_place_ids(self, place_ids: Iterable[str]) -> set[str]:
+        ids = list(place_ids)
+        if self._session is None or not ids:
+            return set()
+        # Savepoint: a failed lookup must not abort the planner's transaction.
+        async with self._session.begin_nested():
+            result = await self._session.execute(
+                select(Place.external_id).where(Place.external_id.in_(ids))
+            )
+        return {row for row in result.scalars().all() if row}
+
+    async def _resolve_payload(
+        self,
+        place_id: str,
+        item: dict[str, Any],
+        semaphore: asyncio.Semaphore,
+    ) -> dict[str, Any]:
+        cached = await _best_effort(get_cached_place(place_id))
+        if cached:
+            return cached
+
+        try:
+            async with semaphore:
+                details = await self._maps_client.get_place_details(
+                    place_id,
+                    language=_SEARCH_LANGUAGE,
+                )
+        except Exception as exc:
+            # The search summary is enough for this plan but must not stand in for details.
+            logger.debug("Place details lookup failed for %s: %s", place_id, exc)
+            return item
+        payload = {**item, **details}
+        await _best_effort(cache_place(place_id, payload))
+        return payload
+
+    async def _augment_with_google(
+        self,
+        bundle: RecommendationBundle,
+        plan: TravelPlanCreate,
+        preferences: AnalyzedPreferences,
+        categories: set[PlaceCategory] | None = None,
+    ) -> None:
+        if categories is None:
+            categories = set(_BUNDLE_CATEGORIES)
+        if not self._maps_client or not categories:
             return
 
-        for result in results:
-            if isinstance(result, Exception):
-                bundle.warnings.append("일부 장소 데이터를 가져오지 못했습니다.")
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.GOOGLE_PLACES_ENRICHMENT_TIMEOUT
+        semaphore = asyncio.Semaphore(max(1, settings.GOOGLE_PLACES_MAX_CONCURRENCY))
+
+        specs = self._build_search_specs(plan, preferences, categories)
+        search_tasks = [asyncio.create_task(self._search(spec, semaphore)) for spec in specs]
+        _, pending = await asyncio.wait(search_tasks, timeout=max(deadline - loop.time(), 0))
+        for task in pending:
+            task.cancel()
+        if pending:
+            bundle.warnings.append("일부 장소 데이터를 제한 시간 내에 가져오지 못했습니다.")
+
+        # De-duplicate across queries and against places already in the bundle.
+        known_ids = {place.external_id for place in bundle.all_places() if place.external_id}
+        candidates: dict[str, tuple[_SearchSpec, dict[str, Any]]] = {}
+        failed = False
+        for spec, task in zip(specs, search_tasks, strict=True):
+            if task in pending:
+                continue
+            if task.exception() is not None:
+                failed = True
                 continue
-            for item in result[:2]:
+            for item in task.result()[: settings.GOOGLE_PLACES_RESULTS_PER_QUERY]:
                 place_id = item.get("place_id")
-                cached = await get_cached_place(place_id) if place_id else None
-                payload = cached or item
-                if not cached and place_id:
-                    await cache_place(place_id, payload)
-
-                bundle.activities.append(
-                    PlaceCreate(
-                        name=payload.get("name", "Curated Spot"),
-                        category="attraction",
-                        latitude=payload.get("geometry", {})
-                        .get("location", {})
-                        .get("lat", 0.0),
-                        longitude=payload.get("geometry", {})
-                        .get("location", {})
-                        .get("lng", 0.0),
-                        address=payload.get("formatted_address"),
-                        city=plan.destination,
-                        country=plan.country,
-                        rating=payload.get("rating"),
-                        price_level=payload.get("price_level"),
-                        photos=[photo.get("photo_reference") for photo in payload.get("photos", [])]
-                        if payload.get("photos")
-                        else None,
-                        tags=["google"],
-                        external_id=place_id,
-                        external_source="google_places",
-                    )
-                )
+                if not place_id or place_id in known_ids or place_id in candidates:
+                    continue
+                candidates[place_id] = (spec, item)
+        if failed:
+            bundle.warnings.append("일부 장소 데이터를 가져오지 못했습니다.")
+        if not candidates:
+            return
+
+        # Places already persisted need no detail lookup; the planner reuses their rows.
+        try:
+            stored_ids = await self._stored_place_ids(candidates)
+        except Exception as exc:
+            logger.warning("Stored place lookup failed for %s: %s", plan.destination, exc)
+            stored_ids = set()
+
+        payloads = {place_id: item for place_id, (_, item) in candidates.items()}
+        detail_tasks = {
+            asyncio.create_task(self._resolve_payload(place_id, item, semaphore)): place_id
+            for place_id, (_, item) in candidates.items()
+            if place_id not in stored_ids
+        }
+        if detail_tasks:
+            done, pending = await asyncio.wait(
+                detail_tasks, timeout=max(deadline - loop.time(), 0)
+            )
+            for task in pending:
+                task.cancel()
+            for task in done:
+                if task.exception() is None:
+                    payloads[detail_tasks[task]] = task.result()
+
+        for place_id, (spec, _) in candidates.items():
+            place = self._to_place(payloads[place_id], place_id, spec, plan)
+            if place is not None:
+                _bundle_list(bundle, spec.category).append(place)
+
+    def _to_place(
+        self,
+        payload: dict[str, Any],
+        place_id: str,
+        spec: _SearchSpec,
+        plan: TravelPlanCreate,
+    ) -> PlaceCreate | None:
+        location = payload.get("geometry", {}).get("location", {})
+        if "lat" not in location or "lng" not in location:
+            return None
+        photos = payload.get("photos")
+        return PlaceCreate(
+            name=payload.get("name", "Curated Spot"),
+            category=spec.category,
+            latitude=location["lat"],
+            longitude=location["lng"],
+            address=payload.get("formatted_address"),
+            city=plan.destination,
+            country=plan.country,
+            rating=payload.get("rating"),
+            price_level=payload.get("price_level") or None,
+            phone=payload.get("formatted_phone_number"),
+            website=payload.get("website"),
+            opening_hours=payload.get("opening_hours"),
+            photos=[photo.get("photo_reference") for photo in photos] if photos else None,
+            tags=["google", spec.tag] if spec.tag else ["google"],
+            external_id=place_id,
+            external_source="google_places",
+        )
 
     async def recommend(
         self,
@@ -404,7 +702,23 @@ class PlacesRecommender:
                 key=lambda p: ("food" not in (p.tags or []), -(p.rating or 0)),
             )
 
-        await self._augment_with_google(bundle, plan, preferences)
+        # Previously stored places answer first; Google only fills categories below quota.
+        gaps = set(_BUNDLE_CATEGORIES)
+        if self._session is not None:
+            try:
+                # Savepoint: on PostgreSQL a failed statement would otherwise abort the
+                # planner's transaction and every later write in generate_plan with it.
+                async with self._session.begin_nested():
+                    local = await self._local_places(plan, preferences, template)
+            except Exception as exc:
+                logger.warning("Local place search failed for %s: %s", plan.destination, exc)
+                local = {}
+            for category, places in local.items():
+                _merge_local(_bundle_list(bundle, category), places)
+                if len(places) >= settings.PLACES_CATEGORY_QUOTA:
+                    gaps.discard(category)
+
+        await self._augment_with_google(bundle, plan, preferences, gaps)
         if not bundle.activities:
             bundle.warnings.append("활동 추천을 찾지 못했습니다. 선호도를 조정해 보세요.")
         return bundle
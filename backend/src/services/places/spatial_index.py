@@ -0,0 +1,307 @@
+"""
+In-process spatial index over stored places for high-traffic cities
+
+Places for each allowlisted city (``PLACES_SPATIAL_INDEX_CITIES``) are kept in
+memory as array-backed coordinates bucketed into a fixed lat/lng grid. Radius
+and k-nearest queries return the same ``(Place, distance_m)`` tuples as
+:class:`GeoSearchService` without a PostGIS round-trip.
+
+Indexes are refreshed incrementally from ``places.updated_at`` and rebuilt from
+scratch periodically so deleted rows eventually disappear.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import sys
+import time
+from array import array
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from typing import Iterable, Iterator
+from uuid import UUID
+
+from sqlalchemy import func, select
+
+from ...config.database import AsyncSessionLocal
+from ...config.settings import settings
+from ...core.geo_utils import haversine_distance_meters
+from ...metrics.ai_pipeline import update_spatial_index_size
+from ...models.place import Place
+
+logger = logging.getLogger(__name__)
+
+_CELL_DEGREES = 0.02  # ~2.2 km tall cells
+_KM_PER_DEGREE = 111.32
+
+
+def _cell(latitude: float, longitude: float) -> tuple[int, int]:
+    return (math.floor(latitude / _CELL_DEGREES), math.floor(longitude / _CELL_DEGREES))
+
+
+def _cell_width_km(latitude: float) -> float:
+    return _KM_PER_DEGREE * _CELL_DEGREES * max(math.cos(math.radians(min(abs(latitude), 89.0))), 0.05)
+
+
+@dataclass(slots=True)
+class SpatialIndexStats:
+    city: str
+    places: int
+    cells: int
+    memory_bytes: int
+    refreshed_at: float
+
+
+class CitySpatialIndex:
+    """Grid-bucketed coordinates and detached ``Place`` rows for one city"""
+
+    __slots__ = (
+        "city",
+        "_latitudes",
+        "_longitudes",
+        "_places",
+        "_slots",
+        "_cells",
+        "_watermark",
+        "refreshed_at",
+        "rebuilt_at",
+    )
+
+    def __init__(self, city: str) -> None:
+        self.city = city
+        self._latitudes = array("d")
+        self._longitudes = array("d")
+        self._places: list[Place] = []
+        self._slots: dict[UUID, int] = {}
+        self._cells: dict[tuple[int, int], list[int]] = {}
+        self._watermark: datetime | None = None
+        self.refreshed_at = 0.0
+        self.rebuilt_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self._places)
+
+    def upsert(self, place: Place) -> None:
+        """Insert a place or move an existing one to its new coordinates."""
+        latitude = float(place.latitude)
+        longitude = float(place.longitude)
+        slot = self._slots.get(place.id)
+        if slot is None:
+            slot = len(self._places)
+            self._slots[place.id] = slot
+            self._places.append(place)
+            self._latitudes.append(latitude)
+            self._longitudes.append(longitude)
+        else:
+            old_cell = _cell(self._latitudes[slot], self._longitudes[slot])
+            self._cells[old_cell].remove(slot)
+            if not self._cells[old_cell]:
+                del self._cells[old_cell]
+            self._places[slot] = place
+            self._latitudes[slot] = latitude
+            self._longitudes[slot] = longitude
+        self._cells.setdefault(_cell(latitude, longitude), []).append(slot)
+
+        updated_at = place.updated_at
+        if updated_at is not None and (self._watermark is None or updated_at > self._watermark):
+            self._watermark = updated_at
+
+    async def refresh(self, *, full: bool = False) -> int:
+        """Load places changed since the last refresh; returns the number of rows applied."""
+        query = select(Place).where(func.lower(Place.city) == self.city)
+        if self._watermark is not None and not full:
+            # >= so rows sharing the watermark timestamp but committed later are not missed.
+            query = query.where(Place.updated_at >= self._watermark)
+
+        # A dedicated session keeps the caller's identity map untouched; closing it
+        # leaves the cached rows detached with their attributes loaded.
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(query)
+            places = list(result.scalars().all())
+        for place in places:
+            self.upsert(place)
+
+        self.refreshed_at = time.monotonic()
+        if full:
+            self.rebuilt_at = self.refreshed_at
+        return len(places)
+
+    def _cells_within(self, latitude: float, longitude: float, radius_km: float) -> Iterator[int]:
+        row, col = _cell(latitude, longitude)
+        rows = int(math.ceil(radius_km / (_KM_PER_DEGREE * _CELL_DEGREES)))
+        cols = int(math.ceil(radius_km / _cell_width_km(latitude)))
+        for d_row in range(-rows, rows + 1):
+            for d_col in range(-cols, cols + 1):
+                yield from self._cells.get((row + d_row, col + d_col), ())
+
+    def _matches(self, slot: int, category: str | None) -> bool:
+        return category is None or self._places[slot].category == category
+
+    def search(
+        self,
+        latitude: float,
+        longitude: float,
+        *,
+        radius_km: float,
+        limit: int,
+        category: str | None = None,
+    ) -> list[tuple[Place, float]]:
+        """Places within ``radius_km`` ordered by distance, like ``GeoSearchService.search``."""
+        origin = (latitude, longitude)
+        radius_m = radius_km * 1000
+        # Cheap equirectangular pre-filter (1% slack) before the exact haversine distance.
+        lat_m = _KM_PER_DEGREE * 1000
+        lng_m = lat_m * math.cos(math.radians(latitude))
+        bound = (radius_m * 1.01) ** 2
+        latitudes, longitudes = self._latitudes, self._longitudes
+        hits: list[tuple[float, int]] = []
+        for slot in self._cells_within(latitude, longitude, radius_km):
+            d_lat = (latitudes[slot] - latitude) * lat_m
+            d_lng = (longitudes[slot] - longitude) * lng_m
+            if d_lat * d_lat + d_lng * d_lng > bound or not self._matches(slot, category):
+                continue
+            distance = haversine_distance_meters(origin, (latitudes[slot], longitudes[slot]))
+            if distance <= radius_m:
+                hits.append((distance, slot))
+        hits.sort()
+        return [(self._places[slot], distance) for distance, slot in hits[:limit]]
+
+    def nearest(
+        self,
+        latitude: float,
+        longitude: float,
+        k: int,
+        *,
+        category: str | None = None,
+        max_radius_km: float | None = None,
+    ) -> list[tuple[Place, float]]:
+        """The ``k`` closest places, expanding grid rings until the result is exact."""
+        if not self._cells or k <= 0:
+            return []
+        origin = (latitude, longitude)
+        row, col = _cell(latitude, longitude)
+        ring_km = min(_KM_PER_DEGREE * _CELL_DEGREES, _cell_width_km(latitude))
+        min_row, min_col = min(self._cells)
+        max_row, max_col = max(self._cells)
+        span = max(abs(row - min_row), abs(row - max_row), abs(col - min_col), abs(col - max_col))
+        if max_radius_km is not None:
+            span = min(span, int(math.ceil(max_radius_km / ring_km)) + 1)
+        max_distance = max_radius_km * 1000 if max_radius_km is not None else math.inf
+
+        hits: list[tuple[float, int]] = []
+        for ring in range(span + 1):
+            for d_row in range(-ring, ring + 1):
+                for d_col in range(-ring, ring + 1):
+                    if max(abs(d_row), abs(d_col)) != ring:
+                        continue
+                    for slot in self._cells.get((row + d_row, col + d_col), ()):
+                        if not self._matches(slot, category):
+                            continue
+                        distance = haversine_distance_meters(
+                            origin, (self._latitudes[slot], self._longitudes[slot])
+                        )
+                        if distance <= max_distance:
+                            hits.append((distance, slot))
+            if len(hits) >= k:
+                hits.sort()
+                del hits[k:]
+                # Anything in a further ring is at least `ring` cell widths away.
+                if hits[-1][0] <= ring * ring_km * 1000:
+                    break
+        hits.sort()
+        return [(self._places[slot], distance) for distance, slot in hits[:k]]
+
+    def memory_bytes(self) -> int:
+        """Approximate resident size of the index, including the cached rows."""
+        total = sys.getsizeof(self._latitudes) + sys.getsizeof(self._longitudes)
+        total += sys.getsizeof(self._places) + sys.getsizeof(self._slots)
+        total += sys.getsizeof(self._cells)
+        total += sum(sys.getsizeof(slots) for slots in self._cells.values())
+        for place in self._places:
+            total += sys.getsizeof(place) + sys.getsizeof(place.__dict__)
+            total += sum(sys.getsizeof(value) for value in place.__dict__.values())
+        return total
+
+    def stats(self) -> SpatialIndexStats:
+        return SpatialIndexStats(
+            city=self.city,
+            places=len(self._places),
+            cells=len(self._cells),
+            memory_bytes=self.memory_bytes(),
+            refreshed_at=self.refreshed_at,
+        )
+
+
+class SpatialIndexRegistry:
+    """Process-wide set of city indexes limited to an allowlist"""
+
+    def __init__(
+        self,
+        cities: Iterable[str],
+        *,
+        refresh_interval: float,
+        rebuild_interval: float,
+    ) -> None:
+        self._cities = frozenset(city.strip().lower() for city in cities if city.strip())
+        self._refresh_interval = refresh_interval
+        self._rebuild_interval = rebuild_interval
+        self._indexes: dict[str, CitySpatialIndex] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+
+    def is_indexed(self, city: str | None) -> bool:
+        return bool(city) and city.strip().lower() in self._cities
+
+    async def get(self, city: str | None) -> CitySpatialIndex | None:
+        """Return a fresh index for ``city``, or ``None`` when it is not allowlisted."""
+        if not self.is_indexed(city):
+            return None
+        key = city.strip().lower()
+        index = self._indexes.get(key)
+        now = time.monotonic()
+        if index is not None and now - index.refreshed_at < self._refresh_interval:
+            return index
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            index = self._indexes.get(key)
+            now = time.monotonic()
+            if index is not None and now - index.refreshed_at < self._refresh_interval:
+                return index
+
+            if index is None or now - index.rebuilt_at >= self._rebuild_interval:
+                # Build the replacement off to the side so readers keep the old one meanwhile.
+                rebuilt = CitySpatialIndex(key)
+                await rebuilt.refresh(full=True)
+                self._indexes[key] = index = rebuilt
+            else:
+                await index.refresh()
+
+            stats = index.stats()
+            update_spatial_index_size(key, stats.places, stats.memory_bytes)
+            logger.debug(
+                "Spatial index for %s: %d places, %d cells, %d bytes",
+                key,
+                stats.places,
+                stats.cells,
+                stats.memory_bytes,
+            )
+            return index
+
+    def stats(self) -> list[SpatialIndexStats]:
+        return [index.stats() for index in self._indexes.values()]
+
+    def memory_bytes(self) -> int:
+        return sum(index.memory_bytes() for index in self._indexes.values())
+
+
+@lru_cache(maxsize=1)
+def get_spatial_index_registry() -> SpatialIndexRegistry:
+    """Return the process-wide registry configured from settings."""
+    return SpatialIndexRegistry(
+        settings.PLACES_SPATIAL_INDEX_CITIES,
+        refresh_interval=settings.PLACES_SPATIAL_INDEX_REFRESH_SECONDS,
+        rebuild_interval=settings.PLACES_SPATIAL_INDEX_REBUILD_SECONDS,
+    )
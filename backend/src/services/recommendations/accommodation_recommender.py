@@ -7,10 +7,11 @@ from __future__ import annotations
 import logging
 from dataclasses import dataclass
 from datetime import date, timedelta
+from typing import Any
 from urllib.parse import urlencode
 from uuid import UUID
 
-from sqlalchemy import delete, select
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ...core.affiliate_tracker import affiliate_tracker
@@ -18,6 +19,7 @@ from ...integrations.agoda import get_agoda_client
 from ...integrations.booking import booking_affiliate
 from ...models.accommodation_option import AccommodationOption
 from ...models.travel_plan import TravelPlan
+from .persistence import bulk_insert_options, lock_plan_options, sync_plan_options
 
 logger = logging.getLogger(__name__)
 
@@ -31,6 +33,10 @@ class AccommodationRecommendationResult:
     options: list[AccommodationOption]
 
 
+# Natural key used to match refreshed offers against stored rows
+ACCOMMODATION_OFFER_KEY = ("provider", "name", "check_in_date", "check_out_date", "room_type")
+
+
 class AccommodationRecommender:
     """Persist accommodation options for a travel plan"""
 
@@ -45,12 +51,10 @@ class AccommodationRecommender:
         force_refresh: bool = False,
     ) -> AccommodationRecommendationResult:
         """Return accommodation recommendations for a travel plan"""
-        if force_refresh:
-            await self._delete_existing(plan.id)
-
-        existing = await self._fetch_existing(plan.id)
-        if existing:
-            return AccommodationRecommendationResult(plan.start_date, plan.end_date, existing)
+        if not force_refresh:
+            existing = await self._fetch_existing(plan.id)
+            if existing:
+                return AccommodationRecommendationResult(plan.start_date, plan.end_date, existing)
 
         nights = max((plan.end_date - plan.start_date).days, 1)
         hotels = await self.agoda_client.search_hotels(
@@ -73,7 +77,7 @@ class AccommodationRecommender:
                 currency,
             )
 
-        options: list[AccommodationOption] = []
+        rows: list[dict[str, Any]] = []
         for index, hotel in enumerate(hotels):
             provider = hotel.get("provider", "Agoda")
             booking_url = hotel.get("booking_url")
@@ -89,38 +93,53 @@ class AccommodationRecommender:
                     price_currency,
                 )
 
-            option = AccommodationOption(
-                travel_plan_id=plan.id,
-                provider=provider,
-                name=hotel.get("name", f"Option {index + 1}"),
-                description=hotel.get("description"),
-                address=hotel.get("address"),
-                city=hotel.get("city") or plan.destination,
-                country=hotel.get("country") or plan.country,
-                latitude=hotel.get("latitude"),
-                longitude=hotel.get("longitude"),
-                rating=hotel.get("rating"),
-                review_count=hotel.get("review_count"),
-                star_rating=hotel.get("star_rating"),
-                price_currency=price_currency,
-                price_per_night=hotel.get("price_per_night"),
-                total_price=hotel.get("total_price", 0),
-                check_in_date=plan.start_date,
-                check_out_date=plan.end_date,
-                nights=nights,
-                room_type=hotel.get("room_type"),
-                booking_url=booking_url,
-                image_url=hotel.get("image_url"),
-                amenities=hotel.get("amenities"),
-                tags=hotel.get("tags"),
-                policies=hotel.get("policies"),
+            rows.append(
+                {
+                    "travel_plan_id": plan.id,
+                    "provider": provider,
+                    "name": hotel.get("name", f"Option {index + 1}"),
+                    "description": hotel.get("description"),
+                    "address": hotel.get("address"),
+                    "city": hotel.get("city") or plan.destination,
+                    "country": hotel.get("country") or plan.country,
+                    "latitude": hotel.get("latitude"),
+                    "longitude": hotel.get("longitude"),
+                    "rating": hotel.get("rating"),
+                    "review_count": hotel.get("review_count"),
+                    "star_rating": hotel.get("star_rating"),
+                    "price_currency": price_currency,
+                    "price_per_night": hotel.get("price_per_night"),
+                    "total_price": hotel.get("total_price", 0),
+                    "check_in_date": plan.start_date,
+                    "check_out_date": plan.end_date,
+                    "nights": nights,
+                    "room_type": hotel.get("room_type"),
+                    "booking_url": booking_url,
+                    "image_url": hotel.get("image_url"),
+                    "amenities": hotel.get("amenities"),
+                    "tags": hotel.get("tags"),
+                    "policies": hotel.get("policies"),
+                }
             )
-            self.session.add(option)
-            options.append(option)
 
+        await lock_plan_options(self.session, AccommodationOption, plan.id)
+        if force_refresh:
+            options = await sync_plan_options(
+                self.session,
+                AccommodationOption,
+                plan.id,
+                rows,
+                key_fields=ACCOMMODATION_OFFER_KEY,
+                order_by=AccommodationOption.total_price,
+            )
+        else:
+            existing = await self._fetch_existing(plan.id)
+            if existing:
+                # Another writer (e.g. background prefetch) stored offers while we searched.
+                await self.session.commit()
+                return AccommodationRecommendationResult(plan.start_date, plan.end_date, existing)
+            options = await bulk_insert_options(self.session, AccommodationOption, rows)
         await self.session.commit()
-        for option in options:
-            await self.session.refresh(option)
 
         return AccommodationRecommendationResult(plan.start_date, plan.end_date, options)
 
@@ -132,12 +151,6 @@ class AccommodationRecommender:
         )
         return list(result.scalars().all())
 
-    async def _delete_existing(self, plan_id: UUID) -> None:
-        await self.session.execute(
-            delete(AccommodationOption).where(AccommodationOption.travel_plan_id == plan_id)
-        )
-        await self.session.commit()
-
     def _determine_currency(self, plan: TravelPlan) -> str:
         prefs = plan.preferences or {}
         currency = None
@@ -0,0 +1,238 @@
+"""
+Airport and city resolution index used by the flight recommender
+
+The bundled ``data/airports.csv`` lists IATA codes with English/Korean city and
+country names, aliases and coordinates. It is compiled once per process into
+flat lookup tables:
+
+* normalised name -> airport (exact match on city names, aliases and IATA codes)
+* sorted name keys for unambiguous prefix matches ("sappo" -> CTS)
+* a 1-degree grid of airports for nearest-airport search by coordinates
+
+Unresolvable destinations yield ``None`` instead of a guessed code so callers
+can skip upstream searches that would only return empty or mock results.
+"""
+
+from __future__ import annotations
+
+import csv
+import math
+import re
+import unicodedata
+from bisect import bisect_left
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, Literal
+
+from ...core.geo_utils import Coordinate, haversine_distance_meters
+
+DATA_PATH = Path(__file__).resolve().parent / "data" / "airports.csv"
+
+AirportRole = Literal["country", "city", "alt"]
+
+_GRID_DEGREES = 1.0
+_MIN_PREFIX_LENGTH = 2
+_NON_WORD = re.compile(r"[\s\-_.,'’()/]+")
+_DESTINATION_SEPARATORS = re.compile(r"[,(/]")
+
+
+@dataclass(frozen=True, slots=True)
+class Airport:
+    """Single airport entry"""
+
+    iata: str
+    city_en: str
+    city_ko: str
+    country_en: str
+    country_ko: str
+    latitude: float
+    longitude: float
+    role: AirportRole
+
+    @property
+    def coordinate(self) -> Coordinate:
+        return (self.latitude, self.longitude)
+
+
+def normalize_name(value: str) -> str:
+    """Case-fold, NFKC-normalise and strip separators so "New York" == "newyork"."""
+    folded = unicodedata.normalize("NFKC", value).casefold()
+    return _NON_WORD.sub("", folded)
+
+
+def _grid_cell(latitude: float, longitude: float) -> tuple[int, int]:
+    return (math.floor(latitude / _GRID_DEGREES), math.floor(longitude / _GRID_DEGREES))
+
+
+class AirportIndex:
+    """Immutable lookup tables over a list of airports"""
+
+    __slots__ = ("_airports", "_by_code", "_by_name", "_by_country", "_prefix_keys", "_grid")
+
+    def __init__(
+        self,
+        airports: Iterable[Airport],
+        aliases: dict[str, list[str]] | None = None,
+    ) -> None:
+        self._airports: tuple[Airport, ...] = tuple(airports)
+        self._by_code: dict[str, Airport] = {airport.iata: airport for airport in self._airports}
+        self._by_name: dict[str, Airport] = {}
+        self._by_country: dict[str, Airport] = {}
+        self._grid: dict[tuple[int, int], list[Airport]] = {}
+
+        # Primary airports claim city names first; alternates only own their aliases.
+        ranked = sorted(self._airports, key=lambda airport: airport.role == "alt")
+        for airport in ranked:
+            for name in (airport.city_en, airport.city_ko):
+                self._by_name.setdefault(normalize_name(name), airport)
+            if airport.role == "country":
+                for name in (airport.country_en, airport.country_ko):
+                    self._by_country.setdefault(normalize_name(name), airport)
+            self._grid.setdefault(_grid_cell(airport.latitude, airport.longitude), []).append(airport)
+
+        # Aliases are curated, so they override derived city names ("서울" -> GMP).
+        for code, names in (aliases or {}).items():
+            airport = self._by_code[code]
+            for name in names:
+                self._by_name[normalize_name(name)] = airport
+
+        self._prefix_keys: tuple[str, ...] = tuple(sorted(self._by_name))
+
+    @classmethod
+    def from_csv(cls, path: Path = DATA_PATH) -> "AirportIndex":
+        airports: list[Airport] = []
+        aliases: dict[str, list[str]] = {}
+        with path.open(encoding="utf-8", newline="") as handle:
+            for row in csv.DictReader(handle):
+                code = row["iata"].strip().upper()
+                airports.append(
+                    Airport(
+                        iata=code,
+                        city_en=row["city_en"].strip(),
+                        city_ko=row["city_ko"].strip(),
+                        country_en=row["country_en"].strip(),
+                        country_ko=row["country_ko"].strip(),
+                        latitude=float(row["latitude"]),
+                        longitude=float(row["longitude"]),
+                        role=row["role"].strip(),  # type: ignore[arg-type]
+                    )
+                )
+                aliases[code] = [alias for alias in (row.get("aliases") or "").split("|") if alias]
+        return cls(airports, aliases)
+
+    def __len__(self) -> int:
+        return len(self._airports)
+
+    def get(self, code: str) -> Airport | None:
+        """Return the airport for an IATA code."""
+        return self._by_code.get(code.strip().upper())
+
+    def lookup(self, name: str) -> Airport | None:
+        """Exact match on a normalised city name, alias or IATA code."""
+        key = normalize_name(name)
+        if not key:
+            return None
+        airport = self._by_name.get(key)
+        if airport is None and len(key) == 3 and key.isascii():
+            airport = self._by_code.get(key.upper())
+        return airport
+
+    def lookup_prefix(self, name: str) -> Airport | None:
+        """Return the airport whose names start with ``name`` if it is unambiguous."""
+        key = normalize_name(name)
+        if len(key) < _MIN_PREFIX_LENGTH:
+            return None
+        index = bisect_left(self._prefix_keys, key)
+        match: Airport | None = None
+        while index < len(self._prefix_keys) and self._prefix_keys[index].startswith(key):
+            candidate = self._by_name[self._prefix_keys[index]]
+            if match is not None and candidate.iata != match.iata:
+                return None
+            match = candidate
+            index += 1
+        return match
+
+    def lookup_country(self, country: str) -> Airport | None:
+        """Return the main international gateway for a country name."""
+        return self._by_country.get(normalize_name(country))
+
+    def nearest(self, coordinate: Coordinate, *, max_distance_km: float = 300.0) -> Airport | None:
+        """Return the closest airport within ``max_distance_km`` using the grid buckets."""
+        latitude, longitude = coordinate
+        row, col = _grid_cell(latitude, longitude)
+        # A cell is ~111 km tall but only ~111·cos(lat) km wide; size rings by the narrower side.
+        cell_km = 111.0 * _GRID_DEGREES * max(math.cos(math.radians(min(abs(latitude), 89.0))), 0.05)
+        max_ring = int(math.ceil(max_distance_km / cell_km)) + 1
+
+        best: Airport | None = None
+        best_distance = max_distance_km * 1000
+        for ring in range(max_ring + 1):
+            for d_row in range(-ring, ring + 1):
+                for d_col in range(-ring, ring + 1):
+                    if max(abs(d_row), abs(d_col)) != ring:
+                        continue
+                    for airport in self._grid.get((row + d_row, col + d_col), ()):
+                        distance = haversine_distance_meters(coordinate, airport.coordinate)
+                        if distance <= best_distance:
+                            best, best_distance = airport, distance
+            # Anything in further rings is at least `ring` cells away.
+            if best is not None and best_distance <= ring * cell_km * 1000:
+                break
+        return best
+
+    def resolve(
+        self,
+        destination: str,
+        *,
+        country: str | None = None,
+        near: Coordinate | None = None,
+    ) -> Airport | None:
+        """Resolve a free-form destination to an airport.
+
+        Tries, in order: the full string, its leading segment ("Tokyo, Japan"),
+        an unambiguous prefix, the country gateway (from the destination itself
+        or ``country``), then the nearest airport to ``near``.
+        """
+        return _resolve_cached(self, destination, country, near)
+
+
+@lru_cache(maxsize=4096)
+def _resolve_cached(
+    index: AirportIndex,
+    destination: str,
+    country: str | None,
+    near: Coordinate | None,
+) -> Airport | None:
+    candidates = [destination]
+    head = _DESTINATION_SEPARATORS.split(destination, maxsplit=1)[0]
+    if head != destination:
+        candidates.append(head)
+
+    for candidate in candidates:
+        airport = index.lookup(candidate)
+        if airport is not None:
+            return airport
+    for candidate in candidates:
+        airport = index.lookup_prefix(candidate)
+        if airport is not None:
+            return airport
+
+    for candidate in (*candidates, country):
+        airport = index.lookup_country(candidate) if candidate else None
+        if airport is not None:
+            return airport
+    if country:
+        airport = index.lookup(country)
+        if airport is not None:
+            return airport
+
+    if near is not None:
+        return index.nearest(near)
+    return None
+
+
+@lru_cache(maxsize=1)
+def get_airport_index() -> AirportIndex:
+    """Return the process-wide airport index, compiling it on first use."""
+    return AirportIndex.from_csv()
@@ -7,9 +7,10 @@ from __future__ import annotations
 import logging
 from dataclasses import dataclass
 from datetime import date
+from typing import Any
 from uuid import UUID
 
-from sqlalchemy import delete, select
+from sqlalchemy import inspect, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ...core.affiliate_tracker import affiliate_tracker
@@ -17,6 +18,8 @@ from ...core.cache import cache_flight_quote, get_cached_flight_quote
 from ...integrations.amadeus import get_amadeus_client
 from ...models.flight_option import FlightOption
 from ...models.travel_plan import TravelPlan
+from .airports import get_airport_index
+from .persistence import bulk_insert_options, lock_plan_options, sync_plan_options
 
 logger = logging.getLogger(__name__)
 
@@ -30,36 +33,8 @@ class FlightRecommendationResult:
     options: list[FlightOption]
 
 
-_AIRPORT_MAP: dict[str, str] = {
-    "tokyo": "HND",
-    "도쿄": "HND",
-    "osaka": "KIX",
-    "오사카": "KIX",
-    "fukuoka": "FUK",
-    "후쿠오카": "FUK",
-    "sapporo": "CTS",
-    "삿포로": "CTS",
-    "hong kong": "HKG",
-    "홍콩": "HKG",
-    "singapore": "SIN",
-    "싱가포르": "SIN",
-    "seoul": "ICN",
-    "서울": "GMP",
-    "busan": "PUS",
-    "부산": "PUS",
-    "jeju": "CJU",
-    "제주": "CJU",
-    "new york": "JFK",
-    "뉴욕": "JFK",
-    "los angeles": "LAX",
-    "la": "LAX",
-    "paris": "CDG",
-    "파리": "CDG",
-    "london": "LHR",
-    "런던": "LHR",
-    "bangkok": "BKK",
-    "방콕": "BKK",
-}
+# Natural key used to match refreshed offers against stored rows
+FLIGHT_OFFER_KEY = ("provider", "carrier", "flight_number", "departure_time")
 
 
 class FlightRecommender:
@@ -78,14 +53,20 @@ class FlightRecommender:
         """Return flight options, generating them if needed"""
         origin = self._determine_origin(plan)
         destination = self._determine_destination(plan)
+        if destination is None:
+            logger.info(
+                "Skipping flight search for plan %s: no airport matches %r",
+                plan.id,
+                plan.destination,
+            )
+            return FlightRecommendationResult(origin, "", [])
+
         cache_key = (
             f"{origin}:{destination}:{plan.start_date.isoformat()}:"
             f"{plan.end_date.isoformat()}:{plan.traveler_count}"
         )
 
-        if force_refresh:
-            await self._delete_existing(plan.id)
-        else:
+        if not force_refresh:
             cached_quote = await get_cached_flight_quote(cache_key)
             if cached_quote:
                 existing = await self._fetch_existing(plan.id)
@@ -93,9 +74,9 @@ class FlightRecommender:
                     logger.info("Returning cached flight quote for %s", cache_key)
                     return FlightRecommendationResult(origin, destination, existing)
 
-        existing = await self._fetch_existing(plan.id)
-        if existing:
-            return FlightRecommendationResult(origin, destination, existing)
+            existing = await self._fetch_existing(plan.id)
+            if existing:
+                return FlightRecommendationResult(origin, destination, existing)
 
         flights = await self.client.search_round_trip(
             origin=origin,
@@ -113,9 +94,11 @@ class FlightRecommender:
                 origin,
                 destination,
             )
-            return FlightRecommendationResult(origin, destination, [])
+            # A refresh that finds nothing keeps the previous offers rather than emptying the plan.
+            existing = await self._fetch_existing(plan.id) if force_refresh else []
+            return FlightRecommendationResult(origin, destination, existing)
 
-        options: list[FlightOption] = []
+        rows: list[dict[str, Any]] = []
         for item in flights:
             booking_url = item.get("booking_url") or self._fallback_booking_url(
                 origin,
@@ -128,30 +111,45 @@ class FlightRecommender:
                 booking_url,
                 extra={"provider": "amadeus"},
             )
-            option = FlightOption(
-                travel_plan_id=plan.id,
-                provider=item.get("provider", "Amadeus"),
-                carrier=item.get("carrier", "Unknown Carrier"),
-                flight_number=item.get("flight_number", "XX000"),
-                departure_airport=item.get("departure_airport", origin),
-                arrival_airport=item.get("arrival_airport", destination),
-                departure_time=item.get("departure_time"),
-                arrival_time=item.get("arrival_time"),
-                duration_minutes=int(item.get("duration_minutes") or 0) or 1,
-                stops=int(item.get("stops") or 0),
-                seat_class=item.get("seat_class"),
-                baggage_info=item.get("baggage_info"),
-                price_currency=item.get("price_currency", "KRW"),
-                price_amount=int(item.get("price_amount") or 0),
-                booking_url=tracked_url,
-                affiliate_code=item.get("affiliate_code"),
+            rows.append(
+                {
+                    "travel_plan_id": plan.id,
+                    "provider": item.get("provider", "Amadeus"),
+                    "carrier": item.get("carrier", "Unknown Carrier"),
+                    "flight_number": item.get("flight_number", "XX000"),
+                    "departure_airport": item.get("departure_airport", origin),
+                    "arrival_airport": item.get("arrival_airport", destination),
+                    "departure_time": item.get("departure_time"),
+                    "arrival_time": item.get("arrival_time"),
+                    "duration_minutes": int(item.get("duration_minutes") or 0) or 1,
+                    "stops": int(item.get("stops") or 0),
+                    "seat_class": item.get("seat_class"),
+                    "baggage_info": item.get("baggage_info"),
+                    "price_currency": item.get("price_currency", "KRW"),
+                    "price_amount": int(item.get("price_amount") or 0),
+                    "booking_url": tracked_url,
+                    "affiliate_code": item.get("affiliate_code"),
+                }
             )
-            self.session.add(option)
-            options.append(option)
 
+        await lock_plan_options(self.session, FlightOption, plan.id)
+        if force_refresh:
+            options = await sync_plan_options(
+                self.session,
+                FlightOption,
+                plan.id,
+                rows,
+                key_fields=FLIGHT_OFFER_KEY,
+                order_by=FlightOption.price_amount,
+            )
+        else:
+            existing = await self._fetch_existing(plan.id)
+            if existing:
+                # Another writer (e.g. background prefetch) stored offers while we searched.
+                await self.session.commit()
+                return FlightRecommendationResult(origin, destination, existing)
+            options = await bulk_insert_options(self.session, FlightOption, rows)
         await self.session.commit()
-        for option in options:
-            await self.session.refresh(option)
 
         cheapest = min(options, key=lambda opt: opt.price_amount, default=None)
         if cheapest:
@@ -179,12 +177,6 @@ class FlightRecommender:
         )
         return list(result.scalars().all())
 
-    async def _delete_existing(self, plan_id: UUID) -> None:
-        await self.session.execute(
-            delete(FlightOption).where(FlightOption.travel_plan_id == plan_id)
-        )
-        await self.session.commit()
-
     def _determine_origin(self, plan: TravelPlan) -> str:
         prefs = plan.preferences or {}
         origin = None
@@ -193,24 +185,37 @@ class FlightRecommender:
             if isinstance(request, dict):
                 origin = request.get("origin_airport") or request.get("home_airport")
 
-        if not origin:
-            origin = "ICN"
-        return str(origin).upper()[:3]
-
-    def _determine_destination(self, plan: TravelPlan) -> str:
-        destination = plan.destination
-        key = destination.lower()
-        if key in _AIRPORT_MAP:
-            return _AIRPORT_MAP[key]
-
-        if plan.country:
-            country_key = plan.country.lower()
-            if country_key in _AIRPORT_MAP:
-                return _AIRPORT_MAP[country_key]
-
-        if len(destination) >= 3:
-            return destination[:3].upper()
-        return "NRT"
+        if origin:
+            airport = get_airport_index().resolve(str(origin))
+            if airport is not None:
+                return airport.iata
+            return str(origin).upper()[:3]
+        return "ICN"
+
+    def _determine_destination(self, plan: TravelPlan) -> str | None:
+        airport = get_airport_index().resolve(
+            plan.destination,
+            country=plan.country,
+            near=self._plan_centroid(plan),
+        )
+        return airport.iata if airport else None
+
+    def _plan_centroid(self, plan: TravelPlan) -> tuple[float, float] | None:
+        # Only use itinerary places that are already loaded; never trigger lazy IO here.
+        if "daily_itineraries" in inspect(plan).unloaded:
+            return None
+        coordinates = [
+            (float(visit.place.latitude), float(visit.place.longitude))
+            for daily in plan.daily_itineraries
+            if "itinerary_places" not in inspect(daily).unloaded
+            for visit in daily.itinerary_places
+            if visit.place is not None
+        ]
+        if not coordinates:
+            return None
+        latitude = sum(lat for lat, _ in coordinates) / len(coordinates)
+        longitude = sum(lng for _, lng in coordinates) / len(coordinates)
+        return (round(latitude, 2), round(longitude, 2))
 
     def _fallback_booking_url(
         self,
@@ -0,0 +1,188 @@
+"""
+Set-based persistence helpers shared by the recommendation services
+
+Offers returned by upstream providers are written with a single
+``INSERT ... RETURNING`` statement instead of adding ORM objects one by one and
+refreshing each row afterwards. Forced refreshes reconcile the new offers with
+the rows already stored for the plan (update changed, insert new, delete stale)
+inside one transaction so readers never observe an empty plan mid-refresh.
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Any, Mapping, Sequence, TypeVar
+from uuid import UUID
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute
+
+TOption = TypeVar("TOption")
+
+OfferKey = tuple[Any, ...]
+
+
+@dataclass(slots=True)
+class OfferDiff:
+    """Changes required to bring stored offers in line with a fresh search"""
+
+    inserts: list[dict[str, Any]] = field(default_factory=list)
+    updates: list[dict[str, Any]] = field(default_factory=list)
+    unchanged_ids: list[UUID] = field(default_factory=list)
+    stale_ids: list[UUID] = field(default_factory=list)
+
+
+def _normalise(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, dt.datetime) and value.tzinfo is not None:
+        return value.astimezone(dt.timezone.utc)
+    if isinstance(value, (list, tuple)):
+        return [_normalise(item) for item in value]
+    return value
+
+
+def offer_key(row: Mapping[str, Any], key_fields: Sequence[str]) -> OfferKey:
+    """Build the natural key identifying an offer across searches"""
+    return tuple(_normalise(row.get(name)) for name in key_fields)
+
+
+def _stored_key(option: Any, key_fields: Sequence[str]) -> OfferKey:
+    return tuple(_normalise(getattr(option, name)) for name in key_fields)
+
+
+def diff_offers(
+    existing: Sequence[Any],
+    rows: Sequence[Mapping[str, Any]],
+    key_fields: Sequence[str],
+) -> OfferDiff:
+    """Compare stored options with freshly fetched rows keyed by ``key_fields``.
+
+    Rows sharing a key with a stored option become primary-key updates when any
+    of their values differ; stored options that no longer appear are stale.
+    Duplicate keys within ``rows`` keep the first occurrence.
+    """
+    stored: dict[OfferKey, Any] = {}
+    for option in existing:
+        stored.setdefault(_stored_key(option, key_fields), option)
+
+    diff = OfferDiff()
+    seen: set[OfferKey] = set()
+    for row in rows:
+        key = offer_key(row, key_fields)
+        if key in seen:
+            continue
+        seen.add(key)
+
+        option = stored.get(key)
+        if option is None:
+            diff.inserts.append(dict(row))
+            continue
+
+        changed = {
+            name: value
+            for name, value in row.items()
+            if _normalise(getattr(option, name, None)) != _normalise(value)
+        }
+        if changed:
+            diff.updates.append({"id": option.id, **changed})
+        else:
+            diff.unchanged_ids.append(option.id)
+
+    for option in existing:
+        key = _stored_key(option, key_fields)
+        # Options missing from the new search, or duplicates of a kept key, are stale.
+        if key not in seen or stored[key] is not option:
+            diff.stale_ids.append(option.id)
+    return diff
+
+
+async def lock_plan_options(
+    session: AsyncSession,
+    model: type[TOption],
+    plan_id: UUID,
+) -> None:
+    """Serialise writers of ``model`` rows for one plan until the transaction ends.
+
+    Background prefetch and interactive requests may search the same plan at the
+    same time; taking this lock before re-checking stored rows keeps the second
+    writer from inserting a duplicate set of offers.
+    """
+    table_name = model.__tablename__  # type: ignore[attr-defined]
+    lock_key = func.hashtext(f"{table_name}:{plan_id}")
+    await session.execute(select(func.pg_advisory_xact_lock(lock_key)))
+
+
+async def bulk_insert_options(
+    session: AsyncSession,
+    model: type[TOption],
+    rows: Sequence[Mapping[str, Any]],
+) -> list[TOption]:
+    """Insert all rows with one ``INSERT ... RETURNING`` and return ORM instances"""
+    if not rows:
+        return []
+    result = await session.scalars(
+        insert(model).returning(model, sort_by_parameter_order=True),
+        [dict(row) for row in rows],
+    )
+    return list(result.all())
+
+
+async def sync_plan_options(
+    session: AsyncSession,
+    model: type[TOption],
+    plan_id: UUID,
+    rows: Sequence[Mapping[str, Any]],
+    *,
+    key_fields: Sequence[str],
+    order_by: InstrumentedAttribute[Any],
+) -> list[TOption]:
+    """Reconcile stored options for ``plan_id`` with ``rows`` without emptying the plan.
+
+    The caller owns the transaction; nothing is committed here so the update,
+    insert and delete statements become visible atomically on commit.
+    """
+    plan_column = model.travel_plan_id  # type: ignore[attr-defined]
+    id_column = model.id  # type: ignore[attr-defined]
+
+    existing = await session.execute(
+        select(model).where(plan_column == plan_id).with_for_update()
+    )
+    diff = diff_offers(list(existing.scalars().all()), rows, key_fields)
+    synced_at = dt.datetime.now(dt.timezone.utc)
+
+    if diff.stale_ids:
+        await session.execute(
+            delete(model)
+            .where(id_column.in_(diff.stale_ids))
+            .execution_options(synchronize_session=False)
+        )
+    if diff.updates:
+        await session.execute(
+            update(model),
+            [{**values, "last_synced_at": synced_at} for values in diff.updates],
+        )
+    if diff.unchanged_ids:
+        await session.execute(
+            update(model)
+            .where(id_column.in_(diff.unchanged_ids))
+            .values(last_synced_at=synced_at)
+            .execution_options(synchronize_session=False)
+        )
+    if diff.inserts:
+        await bulk_insert_options(
+            session,
+            model,
+            [{**values, "last_synced_at": synced_at} for values in diff.inserts],
+        )
+
+    result = await session.execute(
+        select(model)
+        .where(plan_column == plan_id)
+        .order_by(order_by.asc())
+        .execution_options(populate_existing=True)
+    )
+    return list(result.scalars().all())
@@ -0,0 +1,126 @@
+"""
+Background warm-up of flight and accommodation recommendations
+
+Once a travel plan has been generated, low-priority Celery jobs fetch its flight
+and accommodation offers so the recommendations tab opens without waiting on the
+Amadeus/Agoda round-trips. Each (plan, part) pair is claimed with a Redis
+idempotency key before enqueuing, and prefetching is skipped entirely while the
+queue backlog exceeds ``RECOMMENDATION_PREFETCH_MAX_QUEUE_DEPTH``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Literal
+from uuid import UUID
+
+from sqlalchemy import select
+
+from ...config.database import AsyncSessionLocal, engine
+from ...config.settings import settings
+from ...core.cache import acquire_idempotency_key, close_redis_client, release_idempotency_key
+from ...core.tasks import get_queue_depth, register_task
+from ...models.travel_plan import TravelPlan
+from .accommodation_recommender import AccommodationRecommender
+from .flight_recommender import FlightRecommender
+
+logger = logging.getLogger(__name__)
+
+PrefetchPart = Literal["flights", "accommodations"]
+
+PREFETCH_PARTS: tuple[PrefetchPart, ...] = ("flights", "accommodations")
+PREFETCH_TASK_NAME = "recommendations.prefetch"
+_IDEMPOTENCY_NAMESPACE = "recommendation-prefetch"
+
+
+async def prefetch_recommendations(plan_id: str, part: str) -> int:
+    """Celery entry point: persist recommendations for one part of a plan.
+
+    Returns the number of stored options. Recommenders return existing rows
+    untouched, so re-running the job for an already warmed plan is harmless.
+    """
+    try:
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(select(TravelPlan).where(TravelPlan.id == UUID(plan_id)))
+            plan = result.scalar_one_or_none()
+            if plan is None:
+                logger.info("Skipping %s prefetch for missing plan %s", part, plan_id)
+                return 0
+
+            if part == "flights":
+                flights = await FlightRecommender(session).get_recommendations(plan)
+                return len(flights.options)
+            if part == "accommodations":
+                stays = await AccommodationRecommender(session).get_recommendations(plan)
+                return len(stays.options)
+            raise ValueError(f"Unknown recommendation part: {part}")
+    finally:
+        # Each Celery invocation runs on a fresh event loop; drop loop-bound connections.
+        await engine.dispose()
+        await close_redis_client()
+
+
+prefetch_task = register_task(
+    prefetch_recommendations,
+    name=PREFETCH_TASK_NAME,
+    queue=settings.RECOMMENDATION_PREFETCH_QUEUE,
+    max_retries=2,
+    retry_backoff=30,
+)
+
+
+def _idempotency_id(plan_id: UUID, part: PrefetchPart) -> str:
+    return f"{part}:{plan_id}"
+
+
+async def schedule_recommendation_prefetch(plan_id: UUID) -> list[PrefetchPart]:
+    """Enqueue prefetch jobs for a freshly generated plan.
+
+    Never raises: prefetching is an optimisation and must not fail plan creation.
+    Returns the parts that were actually enqueued.
+    """
+    if not settings.RECOMMENDATION_PREFETCH_ENABLED:
+        return []
+
+    queue = settings.RECOMMENDATION_PREFETCH_QUEUE
+    try:
+        depth = await asyncio.to_thread(get_queue_depth, queue)
+    except Exception as exc:  # pragma: no cover - broker availability is environment specific
+        logger.warning("Skipping recommendation prefetch, broker unavailable: %s", exc)
+        return []
+
+    if depth >= settings.RECOMMENDATION_PREFETCH_MAX_QUEUE_DEPTH:
+        logger.info(
+            "Skipping recommendation prefetch for plan %s: queue %s depth %d",
+            plan_id,
+            queue,
+            depth,
+        )
+        return []
+
+    enqueued: list[PrefetchPart] = []
+    for part in PREFETCH_PARTS:
+        identifier = _idempotency_id(plan_id, part)
+        try:
+            claimed = await acquire_idempotency_key(
+                _IDEMPOTENCY_NAMESPACE,
+                identifier,
+                ttl=settings.RECOMMENDATION_PREFETCH_DEDUP_TTL,
+            )
+            if not claimed:
+                continue
+            await asyncio.to_thread(
+                prefetch_task.apply_async,
+                args=(str(plan_id), part),
+                queue=queue,
+                retry=False,
+            )
+            enqueued.append(part)
+        except Exception as exc:  # pragma: no cover - network failures
+            logger.warning("Failed to enqueue %s prefetch for plan %s: %s", part, plan_id, exc)
+            try:
+                await release_idempotency_key(_IDEMPOTENCY_NAMESPACE, identifier)
+            except Exception:
+                pass
+    return enqueued
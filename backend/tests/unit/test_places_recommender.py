@@ -17,11 +17,149 @@ sys.modules.setdefault('langchain.schema', SimpleNamespace(
     AIMessage=SimpleNamespace,
 ))
 
+from src.config.settings import settings
 from src.schemas.travel_plan import TravelPlanCreate, TravelPreferences
+from src.services.places import recommender as recommender_module
 from src.services.places.recommender import PlacesRecommender, RecommendationBundle
 from src.services.ai.preference_analyzer import AnalyzedPreferences
 
 
+class FakeSession:
+    """Mimics PostgreSQL: after a failed statement only a savepoint rollback recovers."""
+
+    def __init__(self, stored_ids=()):
+        self.aborted = False
+        self.savepoints = []
+        self.stored_ids = list(stored_ids)
+
+    async def execute(self, statement):
+        if self.aborted:
+            raise RuntimeError('InFailedSQLTransactionError')
+        if statement == 'broken':
+            self.aborted = True
+            raise RuntimeError('syntax error')
+        if isinstance(statement, str):
+            return statement
+        # Stored place lookup: SELECT external_id ... WHERE external_id IN (...)
+        return SimpleNamespace(scalars=lambda: SimpleNamespace(all=lambda: self.stored_ids))
+
+    def begin_nested(self):
+        session = self
+
+        class Savepoint:
+            async def __aenter__(self):
+                session.savepoints.append('open')
+
+            async def __aexit__(self, exc_type, exc, tb):
+                if exc_type is not None:
+                    session.aborted = False
+                    session.savepoints[-1] = 'rolled back'
+                else:
+                    session.savepoints[-1] = 'released'
+                return False
+
+        return Savepoint()
+
+
+class FakeMapsClient:
+    """Counts Places calls; each query returns the place ids listed for its place type."""
+
+    def __init__(self, results, *, delay=0.01, hang=(), failing_details=()):
+        self.results = results
+        self.delay = delay
+        self.hang = set(hang)
+        self.failing_details = set(failing_details)
+        self.searches = []
+        self.details = []
+        self.cancelled = []
+        self.active = 0
+        self.max_active = 0
+
+    async def search_places(self, *, query, place_type, language):
+        self.searches.append(query)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            if place_type in self.hang:
+                await asyncio.Event().wait()
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled.append(place_type)
+            raise
+        finally:
+            self.active -= 1
+        return [_summary(place_id) for place_id in self.results.get(place_type, [])]
+
+    async def get_place_details(self, place_id, *, language):
+        self.details.append(place_id)
+        if place_id in self.failing_details:
+            raise RuntimeError('OVER_QUERY_LIMIT')
+        return {'website': f'https://example.com/{place_id}'}
+
+
+def _summary(place_id):
+    return {
+        'name': place_id,
+        'geometry': {'location': {'lat': 35.68, 'lng': 139.76}},
+        'place_id': place_id,
+    }
+
+
+@pytest.fixture
+def place_cache(monkeypatch):
+    """In-memory stand-in for the Redis place and place-search caches."""
+    cache = {'places': {}, 'searches': {}}
+
+    async def get_cached_place(place_id):
+        return cache['places'].get(place_id)
+
+    async def cache_place(place_id, payload, ttl=None):
+        cache['places'][place_id] = payload
+
+    async def get_cached_place_search(query, *, language, place_type):
+        return cache['searches'].get((query, place_type))
+
+    async def cache_place_search(query, results, *, language, place_type, ttl=None):
+        cache['searches'][(query, place_type)] = results
+
+    for name, fake in [
+        ('get_cached_place', get_cached_place),
+        ('cache_place', cache_place),
+        ('get_cached_place_search', get_cached_place_search),
+        ('cache_place_search', cache_place_search),
+    ]:
+        monkeypatch.setattr(recommender_module, name, fake)
+    return cache
+
+
+def _empty_bundle():
+    return RecommendationBundle(accommodations=[], activities=[], restaurants=[], cafes=[])
+
+
+def _plan():
+    return TravelPlanCreate(
+        destination='Tokyo',
+        country='Japan',
+        start_date='2024-12-01',
+        end_date='2024-12-05',
+        budget_total=1000000,
+        traveler_type='couple',
+        traveler_count=2,
+        preferences=TravelPreferences(),
+    )
+
+
+def _preferences():
+    return AnalyzedPreferences(
+        interests=['culture'],
+        pace='normal',
+        dietary_restrictions=[],
+        traveler_persona='couple',
+        themes=['culture'],
+        focus_budget='moderate',
+    )
+
+
 async def test_google_results_cached(monkeypatch):
     recommender = PlacesRecommender()
     mock_client = type('Client', (), {})()
@@ -40,7 +178,11 @@ async def test_google_results_cached(monkeypatch):
             }
         ]
 
+    async def fake_place_details(place_id, **_kwargs):
+        return {'website': 'https://www.tokyotower.co.jp'}
+
     mock_client.search_places = fake_search_places
+    mock_client.get_place_details = fake_place_details
     monkeypatch.setattr(recommender, '_maps_client', mock_client)
 
     cached_payloads = {}
@@ -74,3 +216,136 @@ async def test_google_results_cached(monkeypatch):
 
     assert any(place.external_id == 'tokyo_tower' for place in bundle.activities)
     assert 'tokyo_tower' in cached_payloads
+
+
+async def test_local_store_quota_skips_google(monkeypatch):
+    recommender = PlacesRecommender(session=FakeSession())
+    searched = []
+
+    async def fake_search_places(**kwargs):
+        searched.append(kwargs['place_type'])
+        return []
+
+    mock_client = type('Client', (), {})()
+    mock_client.search_places = fake_search_places
+    monkeypatch.setattr(recommender, '_maps_client', mock_client)
+
+    async def fake_local_places(plan, preferences, template):
+        stored = [
+            place.model_copy(update={'external_id': f'stored_{index}'})
+            for index, place in enumerate(template.activities * 5)
+        ]
+        return {'attraction': stored[:5]}
+
+    monkeypatch.setattr(recommender, '_local_places', fake_local_places)
+
+    bundle = await recommender.recommend(_plan(), _preferences())
+
+    assert [place.external_id for place in bundle.activities[:5]] == [f'stored_{i}' for i in range(5)]
+    assert 'tourist_attraction' not in searched
+    assert set(searched) == {'restaurant', 'cafe', 'lodging'}
+
+
+async def test_failed_local_search_leaves_session_usable(monkeypatch):
+    session = FakeSession()
+    recommender = PlacesRecommender(session=session)
+
+    async def no_google(bundle, plan, preferences, gaps=None):
+        return None
+
+    async def failing_local_places(plan, preferences, template):
+        await session.execute('broken')
+
+    monkeypatch.setattr(recommender, '_augment_with_google', no_google)
+    monkeypatch.setattr(recommender, '_local_places', failing_local_places)
+
+    bundle = await recommender.recommend(_plan(), _preferences())
+
+    assert bundle.activities
+    assert session.savepoints == ['rolled back']
+    assert await session.execute('INSERT INTO travel_plans') == 'INSERT INTO travel_plans'
+
+
+async def test_searches_fan_out_under_the_semaphore(monkeypatch, place_cache):
+    monkeypatch.setattr(settings, 'GOOGLE_PLACES_MAX_CONCURRENCY', 2)
+    recommender = PlacesRecommender()
+    client = FakeMapsClient({'restaurant': ['r1'], 'cafe': ['c1'], 'lodging': ['h1']})
+    monkeypatch.setattr(recommender, '_maps_client', client)
+    bundle = _empty_bundle()
+
+    await recommender._augment_with_google(bundle, _plan(), _preferences())
+
+    # One interest search plus the three category searches, never more than two in flight.
+    assert len(client.searches) == 4
+    assert client.max_active == 2
+    assert [place.external_id for place in bundle.restaurants] == ['r1']
+    assert not bundle.warnings
+
+
+async def test_enrichment_timeout_cancels_pending_searches(monkeypatch, place_cache):
+    monkeypatch.setattr(settings, 'GOOGLE_PLACES_ENRICHMENT_TIMEOUT', 0.05)
+    recommender = PlacesRecommender()
+    client = FakeMapsClient({'restaurant': ['r1']}, hang={'lodging'})
+    monkeypatch.setattr(recommender, '_maps_client', client)
+    bundle = _empty_bundle()
+
+    await recommender._augment_with_google(bundle, _plan(), _preferences())
+    await asyncio.sleep(0)
+
+    assert client.cancelled == ['lodging']
+    assert '일부 장소 데이터를 제한 시간 내에 가져오지 못했습니다.' in bundle.warnings
+    assert [place.external_id for place in bundle.restaurants] == ['r1']
+    assert not bundle.accommodations
+
+
+async def test_details_skip_duplicate_cached_and_stored_places(monkeypatch, place_cache):
+    session = FakeSession(stored_ids=['stored'])
+    recommender = PlacesRecommender(session=session)
+    client = FakeMapsClient(
+        {
+            'tourist_attraction': ['shared', 'cached', 'stored'],
+            'restaurant': ['shared', 'fresh'],
+        }
+    )
+    monkeypatch.setattr(recommender, '_maps_client', client)
+    place_cache['places']['cached'] = {**_summary('cached'), 'website': 'https://cached'}
+    bundle = _empty_bundle()
+
+    await recommender._augment_with_google(bundle, _plan(), _preferences())
+
+    assert sorted(client.details) == ['fresh', 'shared']
+    ids = [place.external_id for place in bundle.all_places()]
+    assert sorted(ids) == ['cached', 'fresh', 'shared', 'stored']
+    assert session.savepoints == ['released']
+
+
+async def test_failed_details_are_not_cached(monkeypatch, place_cache):
+    recommender = PlacesRecommender()
+    client = FakeMapsClient({'restaurant': ['r1', 'r2']}, failing_details={'r1'})
+    monkeypatch.setattr(recommender, '_maps_client', client)
+    bundle = _empty_bundle()
+
+    await recommender._augment_with_google(bundle, _plan(), _preferences())
+
+    assert sorted(client.details) == ['r1', 'r2']
+    assert set(place_cache['places']) == {'r2'}
+    assert [place.external_id for place in bundle.restaurants] == ['r1', 'r2']
+
+
+async def test_failed_stored_lookup_leaves_session_usable(monkeypatch, place_cache):
+    session = FakeSession()
+    recommender = PlacesRecommender(session=session)
+    client = FakeMapsClient({'restaurant': ['r1']})
+    monkeypatch.setattr(recommender, '_maps_client', client)
+
+    async def broken_lookup(statement):
+        return await FakeSession.execute(session, 'broken')
+
+    monkeypatch.setattr(session, 'execute', broken_lookup)
+    bundle = _empty_bundle()
+
+    await recommender._augment_with_google(bundle, _plan(), _preferences())
+
+    assert session.savepoints == ['rolled back']
+    assert not session.aborted
+    assert [place.external_id for place in bundle.restaurants] == ['r1']